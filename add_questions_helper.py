@@ -1,48 +1,104 @@
 """
 Helper script to add questions from the Google Docs document.
 This script helps identify duplicates and organize questions by role.
+
+Duplicates include paraphrases, found with MinHash LSH (see
+data/near_duplicates.py).
+
+Usage:
+    python add_questions_helper.py --scan                # near-duplicate pairs in the whole bank
+    python add_questions_helper.py new_questions.txt     # check new questions, one per line
+    python add_questions_helper.py --threshold 0.5 ...   # looser matching (default 0.6)
 """
+import argparse
+
+from data.near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex, find_near_duplicates
 
 def normalize_question(question):
     """Normalize question text for duplicate detection."""
     return question.strip().lower()
 
-def find_duplicates(existing_questions, new_questions):
-    """Find duplicate questions."""
-    existing_normalized = {normalize_question(q): q for q in existing_questions}
+def find_duplicates(existing_questions, new_questions, threshold=DEFAULT_THRESHOLD):
+    """
+    Find duplicate questions, including near-duplicate paraphrases.
+
+    New questions are checked against the existing ones and against the new
+    questions accepted before them, so repeats within the batch are caught.
+
+    Returns:
+        tuple: ``(duplicates, unique_new)`` where each duplicate is
+        ``(question, matching_question, similarity)``
+    """
+    seen = {}
+    index = NearDuplicateIndex(threshold=threshold)
+    for question in existing_questions:
+        normalized = normalize_question(question)
+        if normalized not in seen:
+            seen[normalized] = question
+            index.add(question, question)
+
     duplicates = []
     unique_new = []
-    
+
     for question in new_questions:
         normalized = normalize_question(question)
-        if normalized in existing_normalized:
-            duplicates.append(question)
+        if normalized in seen:
+            duplicates.append((question, seen[normalized], 1.0))
+            continue
+        matches = index.query(question)
+        if matches:
+            duplicates.append((question, matches[0][0], matches[0][1]))
         else:
             unique_new.append(question)
-    
+            seen[normalized] = question
+            index.add(question, question)
+
     return duplicates, unique_new
 
+def load_bank():
+    """All questions in the bank, general and role-specific."""
+    from data.static_data import QUESTIONS_BY_ROLE, GENERAL_QUESTIONS
+    questions = list(GENERAL_QUESTIONS)
+    for role_questions in QUESTIONS_BY_ROLE.values():
+        questions.extend(role_questions)
+    return list(dict.fromkeys(questions))
+
 # Example usage:
 if __name__ == "__main__":
-    # Example: Questions from Google Docs (replace with actual questions)
-    new_questions_from_doc = [
-        # Add questions from the document here
-        # Example:
-        # 'Tell me about a time when...',
-    ]
-    
-    # Load existing questions
-    from data.static_data import get_questions
-    existing_general = get_questions(None)
-    
+    parser = argparse.ArgumentParser(description='Find duplicate and near-duplicate interview questions.')
+    parser.add_argument('file', nargs='?', help='Text file with new questions, one per line')
+    parser.add_argument('--scan', action='store_true', help='Report near-duplicate pairs within the existing bank')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Minimum Jaccard similarity of the questions\' word sets')
+    args = parser.parse_args()
+
+    existing = load_bank()
+
+    if args.scan:
+        pairs = find_near_duplicates(existing, threshold=args.threshold)
+        print(f"Found {len(pairs)} near-duplicate pairs among {len(existing)} questions:")
+        for question_a, question_b, similarity in pairs:
+            print(f"  [{similarity:.2f}] {question_a}\n         {question_b}")
+        raise SystemExit(0)
+
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            new_questions_from_doc = [line.strip() for line in f if line.strip()]
+    else:
+        # Example: Questions from Google Docs (replace with actual questions)
+        new_questions_from_doc = [
+            # Add questions from the document here
+            # Example:
+            # 'Tell me about a time when...',
+        ]
+
     # Find duplicates
-    duplicates, unique = find_duplicates(existing_general, new_questions_from_doc)
-    
+    duplicates, unique = find_duplicates(existing, new_questions_from_doc, threshold=args.threshold)
+
     print(f"Found {len(duplicates)} duplicates:")
-    for dup in duplicates:
-        print(f"  - {dup}")
-    
+    for dup, match, similarity in duplicates:
+        print(f"  - {dup}\n    [{similarity:.2f}] {match}")
+
     print(f"\n{len(unique)} unique new questions:")
     for q in unique:
         print(f"  - {q}")
-
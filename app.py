@@ -1,8 +1,7 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, g, Response
 from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 import os
+import time
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -25,8 +24,11 @@ if not os.getenv('OPENAI_API_KEY'):
 
 # Import routes
 from routes.evaluation import evaluation_bp
-from routes.data import data_bp
+from routes.data import data_bp, bootstrap_script_json
 from routes.generate import generate_bp
+from services.metrics import metrics, current_blueprint
+from services.rate_limit import rate_limiter
+from services.admission import admission
 
 app = Flask(__name__, 
             template_folder='templates',
@@ -36,16 +38,35 @@ app = Flask(__name__,
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max file size
 
+# Rate limiting can be switched off for local load tests (see benchmarks/load_test.py)
+app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
 # CORS configuration - Not strictly needed for same-origin, but kept for API flexibility
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-# Rate limiting
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=["200 per day", "100 per hour"],
-    storage_uri="memory://"
-)
+# Per-request latency and status counts for /api/metrics
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        blueprint = current_blueprint()
+        metrics.observe('request_seconds', time.perf_counter() - started, blueprint=blueprint)
+        metrics.increment('requests_total', blueprint=blueprint, status=response.status_code)
+    return response
+
+# Rate limiting: flask-limiter with per-IP token buckets shared by all workers
+# (see services/rate_limit.py).
+# Job status polling is exempt, so it does not eat into the budget for real work.
+rate_limiter.init_app(app)
+
+# Admission control: concurrency caps and a bounded queue for the endpoints that
+# call OpenAI, checked after the rate limiter (see services/admission.py). Data
+# and health endpoints are never held back.
+admission.init_app(app)
 
 # Register blueprints
 app.register_blueprint(evaluation_bp, url_prefix='/api/evaluate')
@@ -55,7 +76,7 @@ app.register_blueprint(generate_bp, url_prefix='/api/generate-answer')
 # Main route - serve the application
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', bootstrap_json=bootstrap_script_json())
 
 # Health check
 @app.route('/api/health')
@@ -65,6 +86,12 @@ def health():
         'timestamp': datetime.utcnow().isoformat()
     })
 
+# Prometheus metrics, summed across all worker processes
+@app.route('/api/metrics')
+@rate_limiter.exempt
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -76,10 +103,26 @@ def internal_error(error):
 
 @app.errorhandler(429)
 def ratelimit_handler(e):
+    metrics.increment('rate_limited_total', blueprint=current_blueprint())
+    retry_after = getattr(e, 'retry_after', None) or rate_limiter.retry_after()
     return jsonify({
         'error': 'Rate limit exceeded',
         'message': str(e.description)
-    }), 429
+    }), 429, {'Retry-After': str(retry_after)} if retry_after else {}
+
+@app.errorhandler(413)
+def too_large_handler(e):
+    return jsonify({
+        'error': 'Request too large',
+        'message': str(e.description)
+    }), 413
+
+@app.errorhandler(503)
+def overloaded_handler(e):
+    return jsonify({
+        'error': 'Server busy',
+        'message': str(e.description)
+    }), 503, {'Retry-After': str(e.retry_after)} if getattr(e, 'retry_after', None) else {}
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 7860))
@@ -0,0 +1,113 @@
+"""
+Measure the tokens saved by principle selection and output budgets.
+
+Builds evaluation and generation prompts for every company and a sample
+of bank questions twice: once listing all of the company's principles
+with the old fixed ``max_tokens`` (4000 and 1500), and once with the
+``PRINCIPLES_TOP_K`` most relevant principles and the budgets from
+``services.token_budget``. Reports prompt tokens, reserved output tokens
+and the local time to build each prompt.
+
+Usage:
+    python benchmarks/bench_prompt_budget.py [--questions 200] [--top-k 4]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from data.static_data import COMPANIES, GENERAL_QUESTIONS, QUESTIONS_BY_ROLE, get_company_values  # noqa: E402
+from services import prompt_templates  # noqa: E402
+from services.evaluation_service import FANOUT_PARTS, _output_budget as evaluation_budget  # noqa: E402
+from services.generate_service import _output_budget as generation_budget  # noqa: E402
+
+# Old fixed budgets, for comparison
+OLD_EVALUATION_TOKENS = 4000
+OLD_FANOUT_TOKENS = {'scoring': 1200, 'star': 1000, 'rewrite': 800, 'questions': 700, 'culture': 800,
+                     'readiness': 800}
+OLD_GENERATION_TOKENS = 1500
+
+ANSWERS = (
+    'Situation: Our checkout service had weekly outages during peak traffic. Task: I owned the '
+    'reliability work for the quarter. Action: I dug into the metrics and logs, found a connection '
+    'pool leak, pushed back on a quick patch and convinced my manager to fund a redesign. '
+    'Result: Outages fell by 90% and support costs dropped $200K a year.',
+    'Situation: A key customer was about to churn because reports were late. Task: I had to win '
+    'back their trust within a month. Action: I met them weekly, listened to their needs, simplified '
+    'the report pipeline and automated the checks. Result: Reports arrived on time and the customer '
+    'renewed a $1.2M contract.',
+    'Situation: I joined a team using a framework I had never used. Task: I needed to deliver a '
+    'feature in three weeks. Action: I took an online course, paired with a senior engineer and '
+    'mentored a new hire on what I learned. Result: We shipped on time and the new hire ramped up '
+    'twice as fast.'
+)
+
+
+def prompt_tokens(messages):
+    return prompt_templates.estimate_tokens(''.join(message['content'] for message in messages))
+
+
+def measure(cases, top_k):
+    """Average prompt tokens and build time per prompt kind for one top-k setting."""
+    prompt_templates.PRINCIPLES_TOP_K = top_k
+    prompt_templates.compile_company_block.cache_clear()
+    totals = {'evaluation': [0, 0.0], 'generate': [0, 0.0]}
+    for company, question, answer in cases:
+        started = time.perf_counter()
+        messages = prompt_templates.build_evaluation_messages('Software Engineer', company, 'Mid-level',
+                                                              question, answer)
+        totals['evaluation'][1] += time.perf_counter() - started
+        totals['evaluation'][0] += prompt_tokens(messages)
+
+        started = time.perf_counter()
+        messages = prompt_templates.build_generate_messages('Software Engineer', company, 'Mid-level', question)
+        totals['generate'][1] += time.perf_counter() - started
+        totals['generate'][0] += prompt_tokens(messages)
+    return {kind: (tokens / len(cases), seconds / len(cases) * 1e6) for kind, (tokens, seconds) in totals.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--questions', type=int, default=200, help='Bank questions sampled')
+    parser.add_argument('--top-k', type=int, default=prompt_templates.PRINCIPLES_TOP_K)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    bank = list(dict.fromkeys(q for qs in QUESTIONS_BY_ROLE.values() for q in qs)) + list(GENERAL_QUESTIONS)
+    questions = rng.sample(bank, min(args.questions, len(bank)))
+    cases = [(company, question, rng.choice(ANSWERS)) for company in COMPANIES for question in questions]
+
+    before = measure(cases, 0)
+    after = measure(cases, args.top_k)
+    # Companies with no more principles than top-k get the same prompt as before
+    ranked = [case for case in cases if len((get_company_values(case[0]) or {}).get('principles', ())) > args.top_k]
+    ranked_before = measure(ranked, 0) if ranked else before
+    ranked_after = measure(ranked, args.top_k) if ranked else after
+
+    fanout_before = sum(OLD_FANOUT_TOKENS.values())
+    fanout_after = sum(evaluation_budget(part, config['sections']) for part, config in FANOUT_PARTS.items())
+    rows = (
+        ('evaluation prompt', before['evaluation'][0], after['evaluation'][0]),
+        ('  ranked companies', ranked_before['evaluation'][0], ranked_after['evaluation'][0]),
+        ('evaluation max_tokens', OLD_EVALUATION_TOKENS, evaluation_budget('monolithic')),
+        ('fan-out prompts (x6)', before['evaluation'][0] * 6, after['evaluation'][0] * 6),
+        ('fan-out max_tokens', fanout_before, fanout_after),
+        ('generation prompt', before['generate'][0], after['generate'][0]),
+        ('  ranked companies', ranked_before['generate'][0], ranked_after['generate'][0]),
+        ('generation max_tokens', OLD_GENERATION_TOKENS, generation_budget())
+    )
+
+    print(f'{len(cases)} prompts ({len(COMPANIES)} companies x {len(questions)} questions), top-k {args.top_k}; '
+          f'"ranked companies" have more than {args.top_k} principles')
+    print(f'{"tokens per request":<24}{"before":>10}{"after":>10}{"saved":>10}')
+    for label, old, new in rows:
+        print(f'{label:<24}{old:>10.0f}{new:>10.0f}{old - new:>10.0f}')
+    for kind in ('evaluation', 'generate'):
+        print(f'{kind} prompt build: {before[kind][1]:.1f} us before, {after[kind][1]:.1f} us after')
+
+
+if __name__ == '__main__':
+    main()
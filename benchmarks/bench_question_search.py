@@ -0,0 +1,112 @@
+"""
+Benchmark question search on a synthetic 10k-question bank.
+
+The bank is grown from the real questions by splicing the opening of one
+question onto the ending of another and mixing in extra vocabulary, so
+term frequencies stay close to the real data. Queries mix exact words,
+typos and role filters.
+
+Usage:
+    python benchmarks/bench_question_search.py [--questions 10000] [--queries 2000] [--budget-ms 1.0]
+
+Exits with status 1 if the p99 query time is over budget.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from data.question_search import QuestionIndex, tokenize  # noqa: E402
+from data.static_data import QUESTIONS_BY_ROLE, GENERAL_QUESTIONS  # noqa: E402
+
+EXTRA_WORDS = (
+    'migration', 'latency', 'budget', 'vendor', 'roadmap', 'incident', 'onboarding', 'compliance',
+    'forecast', 'experiment', 'pipeline', 'outage', 'hiring', 'negotiation', 'churn', 'pricing',
+    'accessibility', 'security', 'refactor', 'dashboard', 'escalation', 'partnership', 'launch',
+    'retention', 'automation', 'audit', 'scalability', 'customer', 'deadline', 'ambiguity'
+)
+
+
+def build_bank(size, rng):
+    """Synthesize ``size`` distinct questions and a role mapping for them."""
+    seeds = list(dict.fromkeys(q for qs in QUESTIONS_BY_ROLE.values() for q in qs))
+    bank = dict.fromkeys(seeds)
+    while len(bank) < size:
+        head = rng.choice(seeds).rstrip('?.').split()
+        tail = rng.choice(seeds).rstrip('?.').split()
+        words = head[:max(3, len(head) // 2)] + rng.sample(EXTRA_WORDS, 2) + tail[len(tail) // 2:]
+        bank[' '.join(words) + '?'] = None
+    questions = list(bank)
+
+    role_questions = {None: GENERAL_QUESTIONS}
+    for role_key in QUESTIONS_BY_ROLE:
+        role_questions[role_key] = GENERAL_QUESTIONS + tuple(rng.sample(questions, size // 8))
+    return questions, role_questions
+
+
+def make_typo(word, rng):
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def build_queries(questions, count, rng):
+    roles = [None] + list(QUESTIONS_BY_ROLE)
+    queries = []
+    for _ in range(count):
+        words = [w for w in tokenize(rng.choice(questions)) if len(w) > 3]
+        terms = rng.sample(words, min(len(words), rng.randint(1, 3)))
+        if rng.random() < 0.3:
+            terms = [make_typo(term, rng) for term in terms]
+        role = rng.choice(roles) if rng.random() < 0.5 else None
+        queries.append((' '.join(terms), role))
+    return queries
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--questions', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--budget-ms', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    questions, role_questions = build_bank(args.questions, rng)
+
+    started = time.perf_counter()
+    index = QuestionIndex(questions, role_questions)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f'Indexed {len(index.questions)} questions, {len(index.postings)} terms in {build_ms:.0f} ms')
+
+    queries = build_queries(questions, args.queries, rng)
+    for query, role in queries[:200]:
+        index.search(query, role=role)
+
+    timings = []
+    for query, role in queries:
+        started = time.perf_counter()
+        index.search(query, role=role)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    p50, p95, p99 = (percentile(timings, f) for f in (0.50, 0.95, 0.99))
+    print(f'{len(timings)} queries: mean {sum(timings) / len(timings):.3f} ms, '
+          f'p50 {p50:.3f} ms, p95 {p95:.3f} ms, p99 {p99:.3f} ms, max {timings[-1]:.3f} ms')
+
+    if p99 > args.budget_ms:
+        print(f'FAIL: p99 above the {args.budget_ms} ms budget')
+        sys.exit(1)
+    print(f'OK: p99 within the {args.budget_ms} ms budget')
+
+
+if __name__ == '__main__':
+    main()
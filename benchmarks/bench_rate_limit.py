@@ -0,0 +1,81 @@
+"""
+Benchmark the shared rate limiter check under multi-process contention.
+
+Each process charges the request and LLM token limits for a random client
+IP through the token-bucket strategy, against one SQLite storage: one hit
+per request limit like flask-limiter does, then all token limits at once
+like the LLM token check does.
+
+Usage:
+    python benchmarks/bench_rate_limit.py [--processes N] [--checks 5000] [--clients 1000] [--budget-ms 1.0]
+
+Exits with status 1 if the p99 check time is over budget.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from limits import parse_many  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import STRATEGIES  # noqa: E402
+
+from services.rate_limit import DEFAULT_LIMITS, DEFAULT_LLM_TOKEN_LIMITS, TOKEN_BUCKET  # noqa: E402
+
+
+def run_checks(args):
+    uri, checks, clients, seed = args
+    rng = random.Random(seed)
+    strategy = STRATEGIES[TOKEN_BUCKET](storage_from_string(uri))
+    request_limits = parse_many(DEFAULT_LIMITS)
+    token_limits = parse_many(DEFAULT_LLM_TOKEN_LIMITS)
+    timings = []
+    for _ in range(checks):
+        client = f'10.0.{rng.randrange(clients) // 256}.{rng.randrange(256)}'
+        cost = rng.randint(2000, 6000)
+        started = time.perf_counter()
+        all(strategy.hit(limit, client, 'default') for limit in request_limits)
+        strategy.hit_all(token_limits, client, 'llm', cost=cost)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--processes', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--checks', type=int, default=5000, help='Checks per process')
+    parser.add_argument('--clients', type=int, default=1000, help='Distinct client IPs')
+    parser.add_argument('--storage', default=None, help='Storage URI (default: a temporary SQLite file)')
+    parser.add_argument('--budget-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    uri = args.storage or 'sqlite:///' + str(Path(tempfile.mkdtemp(prefix='bench-rate-limit-')) / 'ratelimit.sqlite3')
+    # Create the schema before the processes race for it
+    storage_from_string(uri).check()
+
+    with Pool(args.processes) as pool:
+        results = pool.map(run_checks, [(uri, args.checks, args.clients, seed) for seed in range(args.processes)])
+    timings = sorted(t for result in results for t in result)
+
+    p50, p95, p99 = (percentile(timings, f) for f in (0.50, 0.95, 0.99))
+    print(f'{len(timings)} checks from {args.processes} processes: mean {sum(timings) / len(timings):.3f} ms, '
+          f'p50 {p50:.3f} ms, p95 {p95:.3f} ms, p99 {p99:.3f} ms, max {timings[-1]:.3f} ms')
+
+    if p99 > args.budget_ms:
+        print(f'FAIL: p99 above the {args.budget_ms} ms budget')
+        sys.exit(1)
+    print(f'OK: p99 within the {args.budget_ms} ms budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark similarity cache lookups at 100k stored answers.
+
+Fills a temporary index with synthetic STAR answers built from shared
+sentence templates, so stored answers overlap heavily like real ones do,
+then times ``find`` for near-duplicates of stored answers (a word other
+than a number changed, punctuation and case changed) and for fresh answers that should miss, then
+times them again right after an IDF reload, while partitions are
+re-weighted. Runs two layouts: every answer in one partition (the worst
+case for a scan) and answers spread over many questions.
+
+Usage:
+    python benchmarks/bench_similarity_cache.py [--entries 100000] [--partitions 500] [--lookups 2000] [--budget-ms 5]
+
+Exits with status 1 if the p99 lookup time is over budget.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from services.similarity_cache import IDF_REFRESH_INTERVAL, SimilarityIndex  # noqa: E402
+
+SITUATIONS = ('our checkout service had {n} outages during peak traffic', 'a key customer with {n} seats was about '
+              'to churn', 'the team missed {n} release dates in a row', 'our data pipeline dropped {n}% of events',
+              'a vendor migration was {n} weeks behind', 'two teams disagreed about {n} API changes')
+TASKS = ('I owned the reliability work for the quarter', 'I had to win back their trust within {n} weeks',
+         'I was asked to lead the recovery plan', 'I needed to deliver a fix before the {n}th',
+         'my manager asked me to unblock the project')
+ACTIONS = ('I dug into the metrics and found a connection pool leak', 'I met them weekly and simplified the '
+           'report pipeline', 'I mentored {n} new hires and paired on the hardest parts', 'I pushed back on a '
+           'quick patch and proposed a redesign', 'I automated {n} manual checks', 'I wrote a design doc and '
+           'got sign-off from {n} stakeholders')
+RESULTS = ('outages fell by {n}%', 'the customer renewed a ${n}K contract', 'we shipped {n} days early',
+           'support costs dropped by {n}%', 'the new hires ramped up {n}x faster')
+
+
+def make_answer(rng):
+    parts = [rng.choice(SITUATIONS), rng.choice(TASKS)] + rng.sample(ACTIONS, 2) + [rng.choice(RESULTS)]
+    return 'Situation: {}. Task: {}. Action: {}, and {}. Result: {}.'.format(
+        *(part.format(n=rng.randint(2, 99)) for part in parts)
+    )
+
+
+def near_duplicate(rng, answer):
+    # Numbers are left alone: answers quoting other figures are not duplicates
+    words = answer.split()
+    position = rng.choice([i for i, word in enumerate(words) if not any(c.isdigit() for c in word)])
+    words[position] = rng.choice(('really', 'quickly', 'carefully', 'then'))
+    return ' '.join(words).replace(',', ';').upper() if rng.random() < 0.5 else ' '.join(words)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def time_lookups(index, names, stored, rng, lookups):
+    """Time ``lookups`` finds, alternating near-duplicates of stored answers and fresh answers."""
+    timings, hits, false_hits, misses_checked = [], 0, 0, 0
+    for i in range(lookups):
+        if i % 2 == 0:
+            partition, key, answer = rng.choice(stored)
+            query, expected = near_duplicate(rng, answer), key
+        else:
+            partition, query, expected = rng.choice(names), make_answer(rng), None
+        started = time.perf_counter()
+        found = index.find(partition, query)
+        timings.append((time.perf_counter() - started) * 1000)
+        if expected is not None:
+            hits += found == expected
+        else:
+            misses_checked += 1
+            false_hits += found is not None
+    timings.sort()
+    return timings, hits, lookups - misses_checked, false_hits, misses_checked
+
+
+def run(label, entries, partitions, lookups, threshold):
+    rng = random.Random(0)
+    path = str(Path(tempfile.mkdtemp(prefix='bench-similarity-')) / 'cache.sqlite3')
+    index = SimilarityIndex('bench', 'v1', path=path, threshold=threshold, max_partitions=partitions, enabled=True)
+    names = [index.partition_key(f'question {p}') for p in range(partitions)]
+
+    started = time.perf_counter()
+    stored = []
+    for start in range(0, entries, 5000):
+        batch = []
+        for i in range(start, min(entries, start + 5000)):
+            answer = make_answer(rng)
+            batch.append((names[i % partitions], f'key{i}', answer))
+        index.add_many(batch)
+        stored.extend(batch)
+    load_seconds = time.perf_counter() - started
+    # Load every partition into memory before timing lookups
+    for name in names:
+        index.find(name, '')
+
+    timings, hits, near_duplicates, false_hits, misses_checked = time_lookups(index, names, stored, rng, lookups)
+    p50, p99 = percentile(timings, 0.50), percentile(timings, 0.99)
+    print(f'{label}: {entries} answers in {partitions} partition(s), loaded in {load_seconds:.1f} s')
+    print(f'  lookup p50 {p50:.3f} ms, p99 {p99:.3f} ms, max {timings[-1]:.3f} ms')
+    print(f'  near-duplicates found {hits}/{near_duplicates}, fresh answers matched {false_hits}/{misses_checked} '
+          f'(threshold {threshold})')
+
+    # The same lookups right after the IDF is reloaded, which re-weights
+    # each partition in the background on its next lookup
+    index.idf_refresh_interval = 0
+    index.find(names[0], '')
+    index.idf_refresh_interval = IDF_REFRESH_INTERVAL
+    timings, hits, near_duplicates, false_hits, misses_checked = time_lookups(index, names, stored, rng, lookups)
+    refresh_p99 = percentile(timings, 0.99)
+    print(f'  across an IDF reload: p50 {percentile(timings, 0.50):.3f} ms, p99 {refresh_p99:.3f} ms, '
+          f'max {timings[-1]:.3f} ms, near-duplicates found {hits}/{near_duplicates}, '
+          f'fresh answers matched {false_hits}/{misses_checked}')
+    return max(p99, refresh_p99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--partitions', type=int, default=500, help='Partitions of the spread layout')
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--threshold', type=float, default=0.95)
+    parser.add_argument('--budget-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    p99 = max(run('one partition', args.entries, 1, args.lookups, args.threshold),
+              run('spread', args.entries, args.partitions, args.lookups, args.threshold))
+
+    if p99 > args.budget_ms:
+        print(f'FAIL: p99 above the {args.budget_ms} ms budget')
+        sys.exit(1)
+    print(f'OK: p99 within the {args.budget_ms} ms budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+"""
+Load test the evaluation and generation endpoints against the stub LLM.
+
+By default this starts benchmarks/stub_llm_server.py in-process and the app
+through run_production.py, so gunicorn runs with the same worker settings
+as production (SERVER_MODE, WORKERS, THREADS, ...), including the
+admission limits run_production.py sizes from them; --no-admission switches
+admission control off to measure the server without it. The rate limiter,
+result cache and answer pool are switched off so every request reaches the
+upstream. Use --target to drive a server that is already running instead.
+
+Reports throughput, p50/p95/p99 latency (and time to first event for
+streaming scenarios) and error rates. With --probe-data, a separate client
+also polls a data endpoint throughout, to check that it stays fast while
+the LLM endpoints are saturated or shedding load.
+
+Usage:
+    python benchmarks/load_test.py --scenario evaluate --concurrency 32 --requests 500
+    SERVER_MODE=gevent python benchmarks/load_test.py --scenario mixed --duration 60
+    python benchmarks/load_test.py --target http://127.0.0.1:7860 --scenario generate-stream
+    WORKERS=4 python benchmarks/load_test.py --concurrency 32 --duration 30 --ttft-ms 5000 --probe-data
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+app_dir = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(app_dir))
+
+from benchmarks.stub_llm_server import StubConfig, serve  # noqa: E402
+from data.static_data import ROLES, COMPANIES, EXPERIENCE_LEVELS, get_questions  # noqa: E402
+
+SCENARIOS = {
+    'evaluate': ('/api/evaluate/', False),
+    'evaluate-stream': ('/api/evaluate/stream', True),
+    'generate': ('/api/generate-answer/', False),
+    'generate-stream': ('/api/generate-answer/stream', True)
+}
+
+
+def build_payload(scenario, rng):
+    role = rng.choice(ROLES)
+    payload = {
+        'targetRole': role,
+        'targetCompany': rng.choice(COMPANIES),
+        'experienceLevel': rng.choice(EXPERIENCE_LEVELS),
+        'question': rng.choice(get_questions(role))
+    }
+    if scenario.startswith('evaluate'):
+        # A unique answer per request, so nothing could be served from a cache
+        payload['answer'] = (
+            f'Situation: our service missed its SLO for the {rng.randint(1, 10 ** 6)}th time. '
+            'Task: I owned the fix. Action: I profiled, found the hot path and rewrote it. '
+            'Result: p99 latency dropped by 40% and pages stopped.'
+        )
+    return payload
+
+
+class Recorder:
+    """Thread-safe collection of per-request results."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.results = []
+
+    def add(self, scenario, status, latency, first_event, error):
+        with self._lock:
+            self.results.append({
+                'scenario': scenario,
+                'status': status,
+                'latency': latency,
+                'firstEvent': first_event,
+                'error': error
+            })
+
+
+def run_request(conn, scenario, payload):
+    """Send one request; returns ``(status, latency, first_event_latency, error)``."""
+    path, streaming = SCENARIOS[scenario]
+    body = json.dumps(payload)
+    started = time.perf_counter()
+    conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+
+    if not streaming or response.status != 200:
+        data = response.read()
+        latency = time.perf_counter() - started
+        error = None if response.status == 200 else data[:200].decode('utf-8', 'replace')
+        return response.status, latency, None, error
+
+    first_event = None
+    error = None
+    event = None
+    while True:
+        line = response.readline()
+        if not line:
+            break
+        line = line.decode('utf-8').rstrip('\n')
+        if line.startswith('event: '):
+            event = line[7:]
+            if first_event is None:
+                first_event = time.perf_counter() - started
+        elif line.startswith('data: ') and event == 'error':
+            error = line[6:200]
+    return response.status, time.perf_counter() - started, first_event, error
+
+
+def worker(base_url, scenarios, recorder, deadline, remaining, seed):
+    rng = random.Random(seed)
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=300)
+    while time.perf_counter() < deadline:
+        with remaining['lock']:
+            if remaining['count'] <= 0:
+                break
+            remaining['count'] -= 1
+        scenario = rng.choice(scenarios)
+        try:
+            status, latency, first_event, error = run_request(conn, scenario, build_payload(scenario, rng))
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=300)
+            status, latency, first_event, error = 0, None, None, str(e)
+        recorder.add(scenario, status, latency, first_event, error)
+    conn.close()
+
+
+def probe(base_url, latencies, stop, interval=0.1):
+    """Poll a data endpoint until ``stop`` is set; failed requests are recorded as None."""
+    parts = urlsplit(base_url)
+    while not stop.is_set():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        started = time.perf_counter()
+        try:
+            conn.request('GET', '/api/data/roles')
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - started if response.status == 200 else None)
+        except (OSError, http.client.HTTPException):
+            latencies.append(None)
+        finally:
+            conn.close()
+        stop.wait(interval)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(results, elapsed):
+    """Aggregate results into a report dict."""
+    ok = [r for r in results if r['status'] == 200 and not r['error']]
+    latencies = sorted(r['latency'] for r in ok)
+    first_events = sorted(r['firstEvent'] for r in ok if r['firstEvent'] is not None)
+    statuses = {}
+    for r in results:
+        statuses[str(r['status'])] = statuses.get(str(r['status']), 0) + 1
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        'requests': len(results),
+        'succeeded': len(ok),
+        'errorRate': round(1 - len(ok) / len(results), 4) if results else 0.0,
+        'elapsedSeconds': round(elapsed, 2),
+        'throughputRps': round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        'latencyMs': {
+            'p50': ms(percentile(latencies, 0.50)),
+            'p95': ms(percentile(latencies, 0.95)),
+            'p99': ms(percentile(latencies, 0.99)),
+            'max': ms(latencies[-1]) if latencies else None
+        },
+        'firstEventMs': {
+            'p50': ms(percentile(first_events, 0.50)),
+            'p95': ms(percentile(first_events, 0.95)),
+            'p99': ms(percentile(first_events, 0.99))
+        } if first_events else None,
+        'statuses': statuses
+    }
+
+
+def wait_for(url, timeout=30):
+    parts = urlsplit(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.3)
+    return False
+
+
+def start_app(port, stub_url, state_dir, admission=True):
+    """
+    Start the app via run_production.py pointed at the stub, in its own process group.
+
+    All of its state lives in ``state_dir``, so a run neither reads nor
+    clears the ``instance/`` files of a server started from the checkout.
+    """
+    state_dir = Path(state_dir)
+    env = os.environ.copy()
+    env.update({
+        'PORT': str(port),
+        'OPENAI_BASE_URL': stub_url,
+        'OPENAI_API_KEY': env.get('OPENAI_API_KEY', 'stub-key'),
+        'RATELIMIT_ENABLED': 'false',
+        'CACHE_ENABLED': 'false',
+        'ANSWER_POOL_ENABLED': 'false',
+        'CACHE_PATH': str(state_dir / 'cache.sqlite3'),
+        'JOB_QUEUE_PATH': str(state_dir / 'jobs.sqlite3'),
+        'ADMISSION_PATH': str(state_dir / 'admission.sqlite3'),
+        'ANSWER_POOL_PATH': str(state_dir / 'answer_pool.sqlite3'),
+        'RATELIMIT_STORAGE_URI': f'sqlite:///{state_dir / "ratelimit.sqlite3"}',
+        'METRICS_DIR': str(state_dir / 'metrics')
+    })
+    if not admission:
+        env['ADMISSION_ENABLED'] = 'false'
+    return subprocess.Popen(
+        [sys.executable, 'run_production.py'],
+        cwd=str(app_dir),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the app against the stub LLM server')
+    parser.add_argument('--scenario', default='evaluate', choices=list(SCENARIOS) + ['mixed'])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='Stop after this many requests')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds')
+    parser.add_argument('--target', default=None, help='Base URL of a running app; skips starting one')
+    parser.add_argument('--port', type=int, default=7990, help='Port for the app started by this script')
+    parser.add_argument('--stub-port', type=int, default=8100)
+    parser.add_argument('--ttft-ms', type=float, default=400.0)
+    parser.add_argument('--tokens-per-sec', type=float, default=80.0)
+    parser.add_argument('--latency-sigma', type=float, default=0.3)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--no-admission', action='store_true', help='Start the app with admission control off')
+    parser.add_argument('--probe-data', action='store_true', help='Poll /api/data/roles during the test')
+    parser.add_argument('--json', default=None, help='Also write the report to this file')
+    args = parser.parse_args()
+
+    stub = app_process = None
+    state_dir = tempfile.mkdtemp(prefix='load-test-')
+    base_url = args.target
+    try:
+        if base_url is None:
+            config = StubConfig(ttft_ms=args.ttft_ms, tokens_per_sec=args.tokens_per_sec,
+                                latency_sigma=args.latency_sigma, error_rate=args.error_rate)
+            stub = serve('127.0.0.1', args.stub_port, config)
+            threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+            base_url = f'http://127.0.0.1:{args.port}'
+            app_process = start_app(args.port, f'http://127.0.0.1:{args.stub_port}/v1', state_dir,
+                                    admission=not args.no_admission)
+            if not wait_for(base_url):
+                print('App did not become healthy')
+                sys.exit(1)
+
+        scenarios = list(SCENARIOS) if args.scenario == 'mixed' else [args.scenario]
+        recorder = Recorder()
+        remaining = {'count': args.requests if args.duration is None else float('inf'),
+                     'lock': threading.Lock()}
+        started = time.perf_counter()
+        deadline = started + (args.duration if args.duration is not None else float('inf'))
+
+        threads = [
+            threading.Thread(target=worker, args=(base_url, scenarios, recorder, deadline, remaining, seed))
+            for seed in range(args.concurrency)
+        ]
+        probe_latencies, probe_stop = [], threading.Event()
+        if args.probe_data:
+            threads.append(threading.Thread(target=probe, args=(base_url, probe_latencies, probe_stop)))
+        for thread in threads:
+            thread.start()
+        for thread in threads[:args.concurrency]:
+            thread.join()
+        probe_stop.set()
+        for thread in threads[args.concurrency:]:
+            thread.join()
+        report = summarize(recorder.results, time.perf_counter() - started)
+        report.update({
+            'scenario': args.scenario,
+            'concurrency': args.concurrency,
+            'serverMode': os.getenv('SERVER_MODE', 'sync') if args.target is None else None
+        })
+        if args.probe_data:
+            ok = sorted(latency for latency in probe_latencies if latency is not None)
+            report['dataProbe'] = {
+                'requests': len(probe_latencies),
+                'failed': len(probe_latencies) - len(ok),
+                'p50Ms': round(percentile(ok, 0.50) * 1000, 1) if ok else None,
+                'p99Ms': round(percentile(ok, 0.99) * 1000, 1) if ok else None
+            }
+    finally:
+        if app_process is not None:
+            os.killpg(app_process.pid, signal.SIGTERM)
+            app_process.wait(timeout=30)
+        if stub is not None:
+            stub.shutdown()
+
+    print(f"{report['scenario']} x{report['concurrency']}: {report['succeeded']}/{report['requests']} ok "
+          f"in {report['elapsedSeconds']} s, {report['throughputRps']} req/s, "
+          f"error rate {report['errorRate']:.1%}")
+    latency = report['latencyMs']
+    print(f"  latency p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms")
+    if report['firstEventMs']:
+        first = report['firstEventMs']
+        print(f"  first event p50 {first['p50']} ms, p95 {first['p95']} ms, p99 {first['p99']} ms")
+    print(f"  statuses {report['statuses']}")
+    if 'dataProbe' in report:
+        data = report['dataProbe']
+        print(f"  /api/data/roles during the test: p50 {data['p50Ms']} ms, p99 {data['p99Ms']} ms, "
+              f"{data['failed']}/{data['requests']} failed")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
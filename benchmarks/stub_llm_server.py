@@ -0,0 +1,306 @@
+"""
+Local OpenAI-compatible stub for load testing without spending tokens.
+
+Serves ``POST /v1/chat/completions`` with realistic timing:
+
+- Evaluation requests (``response_format`` of ``json_object``) get
+  schema-valid evaluation JSON. It contains only the sections the prompt
+  asked for, so fan-out mode works too.
+- Other requests get a STAR-formatted answer.
+- Latency is time-to-first-token plus generated tokens at a token rate.
+  Both are drawn from log-normal distributions around the configured
+  medians.
+- ``stream: true`` is answered with server-sent chunks paced at that rate.
+- Errors can be injected as HTTP status codes or as malformed JSON content.
+
+Point the app at it with ``OPENAI_BASE_URL=http://127.0.0.1:8100/v1``.
+
+Usage:
+    python benchmarks/stub_llm_server.py [--port 8100] [--ttft-ms 400] [--tokens-per-sec 80]
+        [--latency-sigma 0.3] [--error-rate 0.0] [--error-statuses 429,500,503] [--malformed-rate 0.0]
+"""
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from services.prompt_templates import EVALUATION_SECTIONS, estimate_tokens  # noqa: E402
+
+_SECTIONS_RE = re.compile(r'Provide ONLY the following top-level keys of the evaluation JSON: ([^\n]+)\.')
+_COMPANY_RE = re.compile(r'Target Company: ([^\n]+)')
+
+# Characters per streamed token, matching estimate_tokens()
+CHARS_PER_TOKEN = 4
+
+DIMENSIONS = (
+    'Situation Clarity', 'Task Definition', 'Actions Taken', 'Results & Impact',
+    '{company} Leadership Principles', 'Technical Depth (Role-Relevant)', 'Communication & Structure'
+)
+
+
+def _items(label, count):
+    return [f'{label} {i + 1}: be specific about what you did and the measurable outcome.' for i in range(count)]
+
+
+def build_section(section, company, rng):
+    """Schema-valid value for one evaluation section."""
+    if section == 'scoredAssessment':
+        return {'dimensions': [
+            {
+                'dimension': dimension.format(company=company),
+                'score': rng.randint(2, 5),
+                'justification': 'The answer covers this dimension but could add concrete detail and metrics.'
+            }
+            for dimension in DIMENSIONS
+        ]}
+    if section == 'starAnalysis':
+        return {
+            part: {'strengths': _items('Strength', 2), 'opportunities': _items('Opportunity', 2)}
+            for part in ('situation', 'task', 'action', 'result')
+        }
+    if section == 'rewriteSuggestions':
+        return _items('Suggestion', 4)
+    if section == 'guidingQuestions':
+        return _items('Question', 4)
+    if section == 'companyCultureAlignment':
+        return {
+            'principles': [
+                {'principle': 'Ownership', 'alignment': 'The candidate took responsibility for the outcome.'},
+                {'principle': 'Deliver Results', 'alignment': 'The result is quantified and tied to the goal.'}
+            ],
+            'additionalAlignment': f'Connect the story more explicitly to {company} values.'
+        }
+    if section == 'followUpQuestions':
+        return _items('Follow-up', 5)
+    if section == 'alternativeFraming':
+        return _items('Framing', 3)
+    if section == 'interviewReadyAssessment':
+        return {
+            'overall': 'A solid answer that needs sharper results to be interview ready.',
+            'topPriorities': _items('Priority', 3),
+            'conclusion': 'Practice the action and result sections with concrete numbers.'
+        }
+    return {}
+
+
+def build_evaluation(prompt, rng):
+    """Evaluation JSON text for the sections requested in ``prompt``."""
+    match = _SECTIONS_RE.search(prompt)
+    sections = [s.strip() for s in match.group(1).split(',')] if match else list(EVALUATION_SECTIONS)
+    company_match = _COMPANY_RE.search(prompt)
+    company = company_match.group(1).strip() if company_match else 'Company'
+    return json.dumps({section: build_section(section, company, rng) for section in sections}, indent=2)
+
+
+def build_star_answer(rng):
+    """A STAR-formatted answer of roughly 350 words."""
+    filler = ('I worked with the team to break the problem down, agreed on clear owners and '
+              'checked progress against the plan every week. ')
+    return '\n\n'.join([
+        '**Situation:** ' + filler * 3,
+        '**Task:** ' + filler * 2,
+        '**Action:** ' + filler * 5,
+        f'**Result:** We cut latency by {rng.randint(20, 60)}% and saved ${rng.randint(50, 500)}K a year. ' + filler
+    ])
+
+
+class StubConfig:
+    """Latency and failure settings shared by all request handlers."""
+
+    def __init__(self, ttft_ms=400.0, tokens_per_sec=80.0, latency_sigma=0.3, error_rate=0.0,
+                 error_statuses=(429, 500, 503), malformed_rate=0.0, seed=None):
+        self.ttft_ms = ttft_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {'requests': 0, 'streamed': 0, 'errors': 0, 'malformed': 0}
+
+    def rng(self):
+        with self._lock:
+            return random.Random(self._rng.random())
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def sample(self, rng, median):
+        """Log-normal sample around ``median``."""
+        return median * math.exp(rng.gauss(0, self.latency_sigma)) if self.latency_sigma else median
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/') in ('', '/health'):
+            self._send_json(200, {'status': 'ok', 'counts': self.config.counts})
+        else:
+            self._send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found'}})
+            return
+
+        config = self.config
+        rng = config.rng()
+        config.count('requests')
+
+        if rng.random() < config.error_rate:
+            config.count('errors')
+            status = rng.choice(config.error_statuses)
+            time.sleep(config.sample(rng, config.ttft_ms) / 1000)
+            self._send_json(status, {'error': {'message': f'Injected error {status}', 'type': 'stub_error'}})
+            return
+
+        messages = body.get('messages', [])
+        prompt = '\n'.join(str(message.get('content', '')) for message in messages)
+        is_json = (body.get('response_format') or {}).get('type') == 'json_object'
+        content = build_evaluation(prompt, rng) if is_json else build_star_answer(rng)
+        if is_json and rng.random() < config.malformed_rate:
+            config.count('malformed')
+            content = content[:len(content) // 2]
+
+        max_tokens = body.get('max_tokens')
+        finish_reason = 'stop'
+        if max_tokens and len(content) > max_tokens * CHARS_PER_TOKEN:
+            content = content[:max_tokens * CHARS_PER_TOKEN]
+            finish_reason = 'length'
+
+        usage = {
+            'prompt_tokens': estimate_tokens(prompt),
+            'completion_tokens': estimate_tokens(content),
+            'total_tokens': estimate_tokens(prompt) + estimate_tokens(content)
+        }
+        ttft = config.sample(rng, config.ttft_ms) / 1000
+        rate = config.sample(rng, config.tokens_per_sec)
+        model = body.get('model', 'stub-model')
+
+        if body.get('stream'):
+            config.count('streamed')
+            self._stream(content, model, ttft, rate, finish_reason)
+            return
+
+        time.sleep(ttft + usage['completion_tokens'] / rate)
+        self._send_json(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': finish_reason
+            }],
+            'usage': usage
+        })
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, content, model, ttft, rate, finish_reason='stop'):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        chunk_id = f'chatcmpl-{uuid.uuid4().hex}'
+        created = int(time.time())
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                'id': chunk_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            }
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+            self.wfile.flush()
+
+        # Tokens are grouped so the stub writes about every 25 ms
+        tokens_per_write = max(1, int(rate / 40))
+        step = tokens_per_write * CHARS_PER_TOKEN
+        try:
+            time.sleep(ttft)
+            send({'role': 'assistant', 'content': ''})
+            for start in range(0, len(content), step):
+                send({'content': content[start:start + step]})
+                time.sleep(tokens_per_write / rate)
+            send({}, finish_reason=finish_reason)
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(host='127.0.0.1', port=8100, config=None):
+    """Create the stub server (not yet serving)."""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'config': config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OpenAI-compatible stub server for load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--ttft-ms', type=float, default=400.0, help='Median time to first token')
+    parser.add_argument('--tokens-per-sec', type=float, default=80.0, help='Median generation rate')
+    parser.add_argument('--latency-sigma', type=float, default=0.3, help='Log-normal spread, 0 for fixed timing')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with an HTTP error')
+    parser.add_argument('--error-statuses', default='429,500,503')
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help='Share of JSON responses truncated into invalid JSON')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        ttft_ms=args.ttft_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(',') if status],
+        malformed_rate=args.malformed_rate,
+        seed=args.seed
+    )
+    server = serve(args.host, args.port, config)
+    print(f'Stub LLM server on http://{args.host}:{args.port}/v1 '
+          f'(ttft ~{args.ttft_ms:.0f} ms, ~{args.tokens_per_sec:.0f} tokens/s, errors {args.error_rate:.0%})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
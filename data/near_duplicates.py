@@ -0,0 +1,180 @@
+"""
+Near-duplicate detection for interview questions.
+
+Questions are reduced to sets of word shingles with the same tokenizer and
+stemmer as question search (stop words removed), so "resolved a team
+conflict" and "resolve a conflict in a team" produce the same set. The
+framing words every behavioral question shares ("tell me about a time",
+"describe a situation") are dropped too, because they would make
+unrelated questions look similar.
+
+Comparing every pair is quadratic, so each set gets a MinHash signature.
+The signature is cut into LSH bands, and only questions that share a
+band bucket become candidates. Candidates are then checked with exact
+Jaccard similarity, so the banding only decides what gets compared. The
+final threshold is applied exactly.
+"""
+import hashlib
+import random
+
+from data.question_search import analyze, stem
+
+# Mersenne prime for the universal hash family, and a mask keeping values below it
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_NUM_PERM = 128
+
+FRAMING_TERMS = frozenset(stem(word) for word in (
+    'tell', 'time', 'describe', 'situation', 'example', 'give', 'share', 'walk', 'instance'
+))
+
+
+def shingles(text, size=1):
+    """
+    Set of word shingles of ``text`` after stop word removal and stemming.
+
+    Questions are short, so single words (``size=1``) work best: they are
+    insensitive to the word reordering typical of paraphrases.
+    """
+    terms = [term for term in analyze(text) if term not in FRAMING_TERMS]
+    if size <= 1 or len(terms) < size:
+        return frozenset(terms)
+    return frozenset(' '.join(terms[i:i + size]) for i in range(len(terms) - size + 1))
+
+
+def jaccard(a, b):
+    """Exact Jaccard similarity of two sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _hash_shingle(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def choose_bands(threshold, num_perm):
+    """
+    Pick ``(bands, rows)`` with ``bands * rows == num_perm`` for a threshold.
+
+    The LSH S-curve crosses 50% near ``(1 / bands) ** (1 / rows)``. The
+    split whose crossing is closest to, but not above, the threshold is
+    used. Banding then misses few true pairs, and the exact check
+    removes the extra candidates.
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        crossing = (1 / bands) ** (1 / rows)
+        if crossing <= threshold and (best is None or crossing > best[0]):
+            best = (crossing, bands, rows)
+    if best is None:
+        return num_perm, 1
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of texts, keyed by any hashable key."""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, shingle_size=1, seed=1):
+        if not 0 < threshold <= 1:
+            raise ValueError('threshold must be in (0, 1]')
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(threshold, num_perm)
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+        self._sets = {}
+        self._buckets = [{} for _ in range(self.bands)]
+
+    def __len__(self):
+        return len(self._sets)
+
+    def signature(self, shingle_set):
+        """MinHash signature of a shingle set."""
+        if not shingle_set:
+            return (_MAX_HASH,) * self.num_perm
+        hashes = [_hash_shingle(shingle) for shingle in shingle_set]
+        return tuple(
+            min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[i * rows:(i + 1) * rows] for i in range(self.bands)]
+
+    def _candidates(self, band_keys):
+        found = set()
+        for buckets, band_key in zip(self._buckets, band_keys):
+            found.update(buckets.get(band_key, ()))
+        return found
+
+    def add(self, key, text):
+        """Index ``text`` under ``key``."""
+        shingle_set = shingles(text, self.shingle_size)
+        self._sets[key] = shingle_set
+        for buckets, band_key in zip(self._buckets, self._band_keys(self.signature(shingle_set))):
+            buckets.setdefault(band_key, []).append(key)
+
+    def query(self, text):
+        """
+        Find indexed texts similar to ``text``.
+
+        Returns:
+            list: ``(key, similarity)`` at or above the threshold, most similar first
+        """
+        shingle_set = shingles(text, self.shingle_size)
+        matches = []
+        for key in self._candidates(self._band_keys(self.signature(shingle_set))):
+            similarity = jaccard(shingle_set, self._sets[key])
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def pairs(self):
+        """
+        All indexed pairs at or above the threshold.
+
+        Returns:
+            list: ``(key_a, key_b, similarity)``, most similar first
+        """
+        seen = set()
+        found = []
+        for buckets in self._buckets:
+            for keys in buckets.values():
+                if len(keys) < 2:
+                    continue
+                for i, key_a in enumerate(keys):
+                    for key_b in keys[i + 1:]:
+                        pair = (key_a, key_b)
+                        if pair in seen:
+                            continue
+                        seen.add(pair)
+                        similarity = jaccard(self._sets[key_a], self._sets[key_b])
+                        if similarity >= self.threshold:
+                            found.append((key_a, key_b, similarity))
+        found.sort(key=lambda pair: -pair[2])
+        return found
+
+
+def find_near_duplicates(questions, threshold=DEFAULT_THRESHOLD):
+    """
+    Near-duplicate pairs within one list of questions.
+
+    Returns:
+        list: ``(question_a, question_b, similarity)``, most similar first
+    """
+    index = NearDuplicateIndex(threshold=threshold)
+    unique = list(dict.fromkeys(questions))
+    for position, question in enumerate(unique):
+        index.add(position, question)
+    return [(unique[a], unique[b], similarity) for a, b, similarity in index.pairs()]
@@ -0,0 +1,187 @@
+"""
+Relevance ranking of company leadership principles.
+
+Prompts used to list every principle of the target company (16 for
+Amazon), although an answer usually demonstrates two or three of them.
+This index picks the principles most relevant to a question and answer so
+only those go into the prompt.
+
+Principle names alone are too short to match real answers ("Dive Deep"
+rarely appears in a story about root-causing an outage), so each name is
+expanded with keywords describing the behaviour it stands for
+(``PRINCIPLE_KEYWORDS``). The index is built once at import time:
+
+- Each principle's name and keywords are analyzed with the question
+  search tokenizer and stemmer, weighted by TF-IDF within the company and
+  normalized, so principles with long keyword lists are not favoured.
+- A query is analyzed once and scored against the company's posting
+  lists, which is a few dictionary lookups per query term.
+
+Ties keep the company's own order, and the selected principles are
+returned in that order too, so the prompt reads like the company's list.
+"""
+import math
+import hashlib
+from collections import Counter
+
+from data.question_search import analyze
+from data.static_data import COMPANY_VALUES
+
+# Behaviour each principle stands for; names are matched too
+PRINCIPLE_KEYWORDS = {
+    # Amazon
+    'Customer Obsession': 'customer user client feedback needs satisfaction trust experience complaint churn '
+                          'support empathy requirement',
+    'Ownership': 'owner own responsibility accountable initiative long term beyond scope stepped up '
+                 'took charge volunteered follow through',
+    'Invent and Simplify': 'invent innovate simplify new idea creative automate redesign prototype '
+                           'novel approach streamline',
+    'Are Right, A Lot': 'judgment decision correct instinct evaluate options tradeoff analysis '
+                        'perspective assumption validate',
+    'Learn and Be Curious': 'learn curious new skill explore study research self taught course '
+                            'unfamiliar technology question',
+    'Hire and Develop the Best': 'hire hiring interview recruit mentor coach develop grow team member '
+                                 'onboard feedback talent',
+    'Insist on the Highest Standards': 'quality standard bar excellence defect bug review testing '
+                                       'rigor polish reliability',
+    'Think Big': 'vision ambitious bold strategy scale long term roadmap transform large impact',
+    'Bias for Action': 'act quickly speed urgency fast deadline decisive calculated risk reversible '
+                       'moved fast',
+    'Frugality': 'cost budget save saving resource constraint limited frugal cheap efficient reduce '
+                 'spend',
+    'Earn Trust': 'trust credibility honest transparent listen respect relationship candid mistake '
+                  'admit integrity',
+    'Dive Deep': 'detail data metric root cause investigate debug analyze audit deep dive '
+                 'anomaly diagnose',
+    'Have Backbone; Disagree and Commit': 'disagree conflict push back challenge debate opinion '
+                                          'manager convince commit decision persuade',
+    'Deliver Results': 'result deliver outcome deadline goal achieve metric impact shipped launched '
+                       'on time exceeded',
+    "Strive to be Earth's Best Employer": 'employee wellbeing team morale inclusive environment '
+                                          'career growth support burnout culture',
+    'Success and Scale Bring Broad Responsibility': 'responsibility community society ethic impact '
+                                                    'sustainability consequence privacy safety',
+    # Google
+    'Focus on the user and all else will follow': 'user customer experience usability research '
+                                                  'feedback needs satisfaction',
+    "It's best to do one thing really, really well": 'focus priority depth quality excellence '
+                                                     'specialize scope simplify',
+    'Fast is better than slow': 'speed fast latency performance optimize quick deadline efficiency '
+                                'faster',
+    'Democracy on the web works': 'collaboration consensus community open input votes crowd '
+                                  'transparent',
+    "You don't need to be at your desk to need an answer": 'mobile remote access anywhere '
+                                                           'availability on the go',
+    'You can make money without doing evil': 'ethic integrity revenue business honest trust '
+                                             'privacy fair',
+    "There's always more information out there": 'information data research search discover '
+                                                 'learn curious explore',
+    'The need for information crosses all borders': 'global international language localization '
+                                                    'diverse region cross cultural',
+    'You can be serious without a suit': 'culture fun informal creative collaborative team',
+    "Great just isn't good enough": 'excellence quality ambitious exceed expectation innovate raise '
+                                    'bar improve',
+    # Microsoft
+    'Innovation': 'innovate new idea creative invent prototype experiment novel technology',
+    'Diversity and Inclusion': 'diverse inclusion inclusive background perspective equity belonging '
+                               'accessibility underrepresented',
+    'Corporate Social Responsibility': 'community society ethic volunteer nonprofit impact '
+                                       'responsibility',
+    'Environmental Sustainability': 'environment sustainability carbon energy green climate waste '
+                                    'efficiency',
+    'Trust and Integrity': 'trust integrity honest transparent ethic credibility mistake admit',
+    'Growth Mindset': 'learn growth feedback failure mistake improve curious develop mindset',
+    'One Microsoft': 'collaboration cross team partner alignment stakeholder together',
+    # Meta
+    'Move Fast': 'speed fast quick iterate ship deadline urgency bias action',
+    'Be Bold': 'bold risk ambitious courage challenge experiment big bet',
+    'Focus on Impact': 'impact priority result metric outcome value goal',
+    'Build Social Value': 'social community connect people value society mission',
+    'Be Open': 'open transparent share feedback communication honest information',
+    'Build Awesome Things': 'build quality craft product ship excellence launch',
+    # Apple
+    'Simplicity': 'simple simplify clean minimal complexity streamline intuitive',
+    'Attention to Detail': 'detail precision polish quality thorough careful accuracy',
+    'User Experience': 'user experience customer design usability interface intuitive feedback',
+    'Privacy': 'privacy data protection security user trust encryption compliance',
+    'Environmental Responsibility': 'environment sustainability carbon energy recycle green climate'
+}
+
+# Principles selected for a prompt when the caller does not say
+DEFAULT_TOP_K = 4
+
+# Changes whenever the keywords do, so cached prompts built from them expire
+RANKING_VERSION = hashlib.sha256(
+    '\x00'.join(f'{name}\x01{keywords}' for name, keywords in sorted(PRINCIPLE_KEYWORDS.items())).encode('utf-8')
+).hexdigest()[:12]
+
+
+class PrincipleIndex:
+    """TF-IDF index over the principles of one company."""
+
+    def __init__(self, principles, keywords=None):
+        self.principles = tuple(principles)
+        keywords = PRINCIPLE_KEYWORDS if keywords is None else keywords
+
+        # The name is repeated so its own words outweigh the expansion
+        doc_terms = [Counter(analyze(f'{name} {name} {keywords.get(name, "")}')) for name in self.principles]
+        total = len(doc_terms)
+        df = Counter(term for terms in doc_terms for term in terms)
+        self.idf = {term: math.log(1 + total / count) for term, count in df.items()}
+
+        self.postings = {}
+        for doc_id, terms in enumerate(doc_terms):
+            weights = {term: (1 + math.log(tf)) * self.idf[term] for term, tf in terms.items()}
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for term, weight in weights.items():
+                self.postings.setdefault(term, []).append((doc_id, weight / norm))
+
+    def scores(self, text):
+        """Relevance score per principle index; principles that do not match are left out."""
+        scores = {}
+        for term, tf in Counter(analyze(text)).items():
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            query_weight = (1 + math.log(tf)) * self.idf[term]
+            for doc_id, weight in postings:
+                scores[doc_id] = scores.get(doc_id, 0.0) + query_weight * weight
+        return scores
+
+    def top(self, text, k=DEFAULT_TOP_K):
+        """
+        The ``k`` principles most relevant to ``text``, in the company's order.
+
+        When fewer than ``k`` principles match, the rest are filled in from
+        the start of the company's list. Returns every principle when the
+        company has no more than ``k``, when ``k`` is 0 or less, or when
+        nothing in ``text`` matches any of them, so the model is never left
+        without principles to look for.
+        """
+        if k <= 0 or len(self.principles) <= k:
+            return self.principles
+        scores = self.scores(text)
+        if not scores:
+            return self.principles
+        ranked = sorted(range(len(self.principles)), key=lambda doc_id: (-scores.get(doc_id, 0.0), doc_id))[:k]
+        return tuple(self.principles[doc_id] for doc_id in sorted(ranked))
+
+
+def build_static_index():
+    """Build an index for every company in the static data, keyed by casefolded name."""
+    return {name.casefold(): PrincipleIndex(values['principles']) for name, values in COMPANY_VALUES.items()}
+
+
+_INDEXES = build_static_index()
+
+
+def rank_principles(company, text, k=DEFAULT_TOP_K):
+    """
+    Select the principles of ``company`` most relevant to ``text``.
+
+    Returns an empty tuple for companies without principles.
+    """
+    index = _INDEXES.get(company.strip().casefold()) if company else None
+    if index is None:
+        return ()
+    return index.top(text, k)
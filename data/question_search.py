@@ -0,0 +1,250 @@
+"""
+In-memory search over the interview question bank.
+
+The index is built once at import time:
+
+- Questions are tokenized, stop words dropped and the rest reduced with a
+  light suffix-stripping stemmer, so "resolved conflicts" matches
+  "resolve a conflict".
+- Each term has a posting list of ``(question_id, weight)`` pairs, with
+  BM25 weights computed up front. A query only sums precomputed numbers.
+- Query terms missing from the vocabulary fall back to vocabulary terms
+  that share enough character trigrams, which covers most typos.
+
+Terms that occur in most questions ("time", "tell") carry almost no
+ranking signal but have the longest posting lists. They are skipped while
+rarer query terms are present. A query made only of such terms matches
+the questions containing all of them, listed in bank order, which is a
+set intersection instead of a scoring pass. This keeps the work per
+query bounded as the bank grows.
+"""
+import math
+import re
+import heapq
+from functools import lru_cache
+
+from data.static_data import QUESTIONS_BY_ROLE, GENERAL_QUESTIONS, resolve_role_key
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no nor
+not of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these
+they this those through to too under until up very was we were what when where
+which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_VOWELS = set('aeiouy')
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Terms in more than this share of questions are skipped when rarer terms exist
+COMMON_TERM_RATIO = 0.2
+
+# Minimum trigram similarity for the typo fallback, and how many terms it may add
+FUZZY_THRESHOLD = 0.35
+FUZZY_MAX_TERMS = 3
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """Reduce an English word to a crude stem ("resolved" -> "resolv")."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+
+    if word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    elif word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+
+    for suffix in ('ingly', 'edly', 'ing', 'ed', 'ment', 'ness', 'ly'):
+        if word.endswith(suffix):
+            base = word[:-len(suffix)]
+            if len(base) >= 3 and _VOWELS & set(base):
+                word = base
+                # planned -> plan, stopping -> stop
+                if len(word) > 3 and word[-1] == word[-2] and word[-1] not in 'lsz':
+                    word = word[:-1]
+            break
+
+    if word.endswith('e') and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercase word tokens of ``text``, with possessives dropped."""
+    return [token.split("'")[0] for token in _TOKEN_RE.findall(text.lower())]
+
+
+def analyze(text):
+    """Stemmed tokens of ``text`` without stop words, in order."""
+    return [stem(token) for token in tokenize(text) if token not in STOPWORDS]
+
+
+def trigrams(term):
+    """Character trigrams of a term, padded so short terms still have some."""
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class QuestionIndex:
+    """Inverted index over a list of questions with optional role filtering."""
+
+    def __init__(self, questions, role_questions=None):
+        """
+        Args:
+            questions: All questions, in the order used to break score ties
+            role_questions: Optional mapping of role key to the questions
+                available for that role
+        """
+        self.questions = tuple(dict.fromkeys(questions))
+        ids = {question: doc_id for doc_id, question in enumerate(self.questions)}
+
+        self.role_ids = {
+            role_key: frozenset(ids[q] for q in role_qs if q in ids)
+            for role_key, role_qs in (role_questions or {}).items()
+        }
+        self.role_order = {role_key: tuple(sorted(doc_ids)) for role_key, doc_ids in self.role_ids.items()}
+
+        doc_terms = [analyze(question) for question in self.questions]
+        total = len(doc_terms)
+        avg_length = (sum(len(terms) for terms in doc_terms) / total) if total else 0.0
+
+        term_counts = {}
+        for doc_id, terms in enumerate(doc_terms):
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / avg_length) if avg_length else BM25_K1
+            for term, tf in counts.items():
+                term_counts.setdefault(term, []).append((doc_id, tf * (BM25_K1 + 1) / (tf + norm)))
+
+        self.postings = {}
+        self.common_terms = {}
+        for term, entries in term_counts.items():
+            df = len(entries)
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            self.postings[term] = {doc_id: idf * weight for doc_id, weight in entries}
+            if df > total * COMMON_TERM_RATIO:
+                self.common_terms[term] = frozenset(self.postings[term])
+
+        self.trigram_terms = {}
+        for term in self.postings:
+            for gram in trigrams(term):
+                self.trigram_terms.setdefault(gram, []).append(term)
+
+        self._expand = lru_cache(maxsize=4096)(self._expand_term)
+
+    def _expand_term(self, term):
+        """
+        Map a query term to ``(index_term, factor)`` pairs.
+
+        Known terms map to themselves; unknown terms map to the closest
+        vocabulary terms by trigram Jaccard similarity.
+        """
+        if term in self.postings:
+            return ((term, 1.0),)
+
+        grams = trigrams(term)
+        shared = {}
+        for gram in grams:
+            for candidate in self.trigram_terms.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        matches = []
+        for candidate, overlap in shared.items():
+            similarity = overlap / (len(grams) + len(trigrams(candidate)) - overlap)
+            if similarity >= FUZZY_THRESHOLD:
+                matches.append((similarity, candidate))
+        matches.sort(reverse=True)
+        return tuple((candidate, similarity) for similarity, candidate in matches[:FUZZY_MAX_TERMS])
+
+    def search(self, query, role=None, limit=DEFAULT_LIMIT, offset=0):
+        """
+        Rank questions against ``query``.
+
+        An empty query lists the role's questions in bank order.
+
+        Returns:
+            tuple: ``(total, results)`` where ``results`` is a list of
+            ``(question, score)`` for the requested page
+        """
+        allowed = None
+        role_key = resolve_role_key(role) if role else None
+        if role and role_key in self.role_ids:
+            allowed = self.role_ids[role_key]
+
+        terms = []
+        for term in dict.fromkeys(analyze(query or '')):
+            terms.extend(self._expand(term))
+
+        if not terms:
+            doc_ids = self.role_order[role_key] if allowed is not None else range(len(self.questions))
+            return len(doc_ids), [(self.questions[doc_id], None) for doc_id in doc_ids[offset:offset + limit]]
+
+        rare = [(term, factor) for term, factor in terms if term not in self.common_terms]
+        if not rare:
+            return self._search_common(terms, allowed, limit, offset)
+
+        # Copying the longest exact posting list is done in C, so start with it
+        rare.sort(key=lambda item: (item[1] != 1.0, -len(self.postings[item[0]])))
+        scores = {}
+        for term, factor in rare:
+            postings = self.postings[term]
+            if not scores and factor == 1.0:
+                scores = dict(postings)
+                continue
+            get = scores.get
+            for doc_id, weight in postings.items():
+                scores[doc_id] = get(doc_id, 0.0) + weight * factor
+
+        if allowed is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if doc_id in allowed}
+
+        wanted = offset + limit
+        if len(scores) > wanted:
+            # Cheap float-only selection first, then an exact sort of the few survivors
+            cutoff = heapq.nlargest(wanted, scores.values())[-1]
+            candidates = [(doc_id, score) for doc_id, score in scores.items() if score >= cutoff]
+        else:
+            candidates = list(scores.items())
+        top = sorted(candidates, key=lambda item: (-item[1], item[0]))[:wanted]
+        return len(scores), [
+            (self.questions[doc_id], round(score, 4)) for doc_id, score in top[offset:]
+        ]
+
+    def _search_common(self, terms, allowed, limit, offset):
+        """Questions containing every (common) query term, in bank order."""
+        first, *rest = (self.common_terms[term] for term, _ in terms)
+        matched = first.intersection(*rest)
+        if allowed is not None:
+            matched &= allowed
+        page = heapq.nsmallest(offset + limit, matched)[offset:]
+        return len(matched), [
+            (self.questions[doc_id],
+             round(sum(self.postings[term][doc_id] * factor for term, factor in terms), 4))
+            for doc_id in page
+        ]
+
+
+def build_static_index():
+    """Build the index over every question in ``data.static_data``."""
+    role_questions = dict(QUESTIONS_BY_ROLE)
+    # Unknown roles only see the general questions, like get_questions()
+    role_questions[None] = GENERAL_QUESTIONS
+    questions = [q for role_qs in role_questions.values() for q in role_qs]
+    return QuestionIndex(questions, role_questions)
+
+
+question_index = build_static_index()
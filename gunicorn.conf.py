@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration shared by run_production.py.
+
+Command-line flags passed by run_production.py take precedence over the
+values here; this file only holds server hooks.
+"""
+
+
+def post_worker_init(worker):
+    """
+    Give each worker its own pooled OpenAI client after the fork.
+
+    This runs after the worker has loaded the app, which for gevent
+    workers is also after monkey-patching, so the client's sockets are
+    cooperative.
+    """
+    from services.openai_client import init_worker
+    init_worker()
+
+
+def on_starting(server):
+    """Drop metrics snapshots left by a previous run of the server."""
+    from services.metrics import metrics
+    metrics.clear()
+
+
+def worker_exit(server, worker):
+    """Write the exiting worker's final metrics so its counts are not lost."""
+    from services.metrics import metrics
+    metrics.flush()
@@ -1,40 +1,162 @@
-from flask import Blueprint, request, jsonify
+import os
+import gzip
+import json
+import hashlib
+from functools import lru_cache
+from flask import Blueprint, request, jsonify, Response
+from markupsafe import Markup
 from data.static_data import (
     get_roles,
     get_companies,
     get_experience_levels,
-    get_questions,
-    get_company_values
+    get_question_tuple,
+    get_company_values,
+    get_bootstrap_data,
+    resolve_role_key
 )
+from data.question_search import question_index, DEFAULT_LIMIT, MAX_LIMIT
+from services.metrics import metrics
 
 data_bp = Blueprint('data', __name__)
 
+# Static data only changes on deploy, and the ETag changes with it
+CACHE_MAX_AGE = int(os.getenv('DATA_CACHE_MAX_AGE', 86400))
+
+
+class SerializedPayload:
+    """
+    JSON body encoded once, with a strong ETag derived from its bytes.
+
+    With ``compress=True`` a gzip copy is also built once, for payloads
+    large enough to be worth it.
+    """
+
+    def __init__(self, payload, compress=False):
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0) if compress else None
+
+
+def cached_json_response(serialized):
+    """Serve a pre-serialized payload, answering 304 when the client's copy is current."""
+    with metrics.timed('serialize'):
+        return _build_cached_response(serialized)
+
+
+def _build_cached_response(serialized):
+    use_gzip = serialized.gzip_body is not None and 'gzip' in request.accept_encodings
+    # Each encoding is a different representation and needs its own strong ETag
+    etag = serialized.etag + '-gz' if use_gzip else serialized.etag
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif use_gzip:
+        response = Response(serialized.gzip_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(serialized.body, mimetype='application/json')
+    if serialized.gzip_body is not None:
+        response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    return response
+
+
+@lru_cache(maxsize=None)
+def _serialized(name):
+    loaders = {
+        'roles': get_roles,
+        'companies': get_companies,
+        'experience-levels': get_experience_levels
+    }
+    return SerializedPayload(loaders[name]())
+
+
+@lru_cache(maxsize=None)
+def _serialized_questions(role_key):
+    return SerializedPayload(list(get_question_tuple(role_key)))
+
+
+@lru_cache(maxsize=256)
+def _serialized_company_values(company):
+    values = get_company_values(company)
+    return SerializedPayload(values) if values else None
+
+
+@lru_cache(maxsize=1)
+def _serialized_bootstrap():
+    return SerializedPayload(get_bootstrap_data(), compress=True)
+
+
+@lru_cache(maxsize=1)
+def bootstrap_script_json():
+    """
+    Bootstrap payload for embedding in a ``<script type="application/json">`` tag.
+
+    ``<``, ``>`` and ``&`` are escaped so the data cannot close the tag.
+    """
+    text = _serialized_bootstrap().body.decode('utf-8')
+    text = text.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+    return Markup(text)
+
+@data_bp.route('/bootstrap', methods=['GET'])
+def bootstrap():
+    """Get roles, companies, levels, questions and company values in one response."""
+    return cached_json_response(_serialized_bootstrap())
+
 @data_bp.route('/roles', methods=['GET'])
 def roles():
     """Get list of available roles."""
-    return jsonify(get_roles()), 200
+    return cached_json_response(_serialized('roles'))
 
 @data_bp.route('/companies', methods=['GET'])
 def companies():
     """Get list of available companies."""
-    return jsonify(get_companies()), 200
+    return cached_json_response(_serialized('companies'))
 
 @data_bp.route('/experience-levels', methods=['GET'])
 def experience_levels():
     """Get list of experience levels."""
-    return jsonify(get_experience_levels()), 200
+    return cached_json_response(_serialized('experience-levels'))
 
 @data_bp.route('/questions', methods=['GET'])
 def questions():
     """Get list of interview questions, optionally filtered by role."""
     role = request.args.get('role', None)
-    return jsonify(get_questions(role)), 200
+    return cached_json_response(_serialized_questions(resolve_role_key(role)))
+
+@data_bp.route('/questions/search', methods=['GET'])
+def search_questions():
+    """Search interview questions, ranked by relevance and paginated."""
+    query = request.args.get('q', '')[:200]
+    role = request.args.get('role', None)
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({'error': 'limit must be positive and offset non-negative'}), 400
+    limit = min(limit, MAX_LIMIT)
+
+    with metrics.timed('search'):
+        total, results = question_index.search(query, role=role, limit=limit, offset=offset)
+    with metrics.timed('serialize'):
+        response = jsonify({
+            'query': query,
+            'role': role,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'results': [{'question': question, 'score': score} for question, score in results]
+        })
+    return response, 200
 
 @data_bp.route('/company-values/<company>', methods=['GET'])
 def company_values(company):
     """Get company values and leadership principles for a specific company."""
-    values = get_company_values(company)
+    values = _serialized_company_values(company.strip().casefold())
     if not values:
         return jsonify({'error': 'Company not found'}), 404
-    return jsonify(values), 200
-
+    return cached_json_response(values)
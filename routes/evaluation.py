@@ -1,11 +1,77 @@
-from flask import Blueprint, request, jsonify
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from services.evaluation_service import evaluate_answer
+import os
+import time
+from flask import Blueprint, request, jsonify, url_for
+from services.evaluation_service import (
+    evaluate_answer,
+    evaluation_cache_key,
+    is_evaluation_cached,
+    stream_evaluation,
+    estimate_evaluation_tokens
+)
+from services.job_queue import job_queue, QueueFullError
+from services.metrics import metrics
+from services.rate_limit import rate_limiter
+from services.admission import admission
+from services.star_analyzer import analyze_answer, quick_check_tips
+from routes.sse import sse_event, sse_response
 
 evaluation_bp = Blueprint('evaluation', __name__)
 
+EVALUATION_FIELDS = ('targetRole', 'targetCompany', 'experienceLevel', 'question', 'answer')
+
+
+def validate_evaluation_payload(data):
+    """Return an error message for an invalid evaluation request, or None."""
+    if not isinstance(data, dict):
+        return 'Request body must be a JSON object'
+
+    for field in EVALUATION_FIELDS:
+        if not data.get(field):
+            return f'Missing required field: {field}'
+
+    answer = data['answer']
+    if len(answer) < 50:
+        return 'Answer must be at least 50 characters long'
+
+    if len(answer) > 10000:
+        return 'Answer must be less than 10,000 characters'
+
+    previous = data.get('previousRevisionId')
+    if previous is not None and (not isinstance(previous, str) or len(previous) > 128):
+        return 'previousRevisionId must be a revision ID string'
+
+    return None
+
+
+def revision_id(data):
+    """ID of the evaluated revision, sent back as ``previousRevisionId`` with the next one."""
+    return evaluation_cache_key(*(data[field] for field in EVALUATION_FIELDS))
+
+
+def evaluation_cost(data):
+    """Estimated LLM tokens for one evaluation request, charged by the rate limiter."""
+    if not isinstance(data, dict):
+        return 0
+    return estimate_evaluation_tokens(*(str(data.get(field) or '') for field in EVALUATION_FIELDS))
+
+
+def evaluation_cached(data):
+    """Whether an evaluation request will be answered from the cache, taking no admission slot."""
+    if validate_evaluation_payload(data) is not None:
+        return False
+    return is_evaluation_cached(*(data[field] for field in EVALUATION_FIELDS))
+
+
+def batch_cost(data):
+    """Estimated LLM tokens for a whole batch."""
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return 0
+    return sum(evaluation_cost(item) for item in items)
+
 @evaluation_bp.route('/', methods=['POST'])
+@rate_limiter.cost(evaluation_cost)
+@admission.lane('evaluate', cached=evaluation_cached)
 def evaluate():
     """
     Evaluate a STAR interview answer using AI.
@@ -16,24 +82,22 @@ def evaluate():
         "targetCompany": "Amazon",
         "experienceLevel": "Mid-level (3-5 years)",
         "question": "Tell me about a time...",
-        "answer": "Situation: ..."
+        "answer": "Situation: ...",
+        "previousRevisionId": "..."  (optional)
     }
+
+    The response includes a ``revisionId``. Sending it as
+    ``previousRevisionId`` with a revised answer to the same question
+    reuses the feedback on the STAR sections that did not change.
     """
     try:
-        data = request.get_json()
-        
-        # Validation
-        required_fields = ['targetRole', 'targetCompany', 'experienceLevel', 'question', 'answer']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        answer = data['answer']
-        if len(answer) < 50:
-            return jsonify({'error': 'Answer must be at least 50 characters long'}), 400
-        
-        if len(answer) > 10000:
-            return jsonify({'error': 'Answer must be less than 10,000 characters'}), 400
+        with metrics.timed('parse'):
+            data = request.get_json()
+            
+            # Validation
+            error = validate_evaluation_payload(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         # Evaluate the answer
         evaluation = evaluate_answer(
@@ -41,10 +105,13 @@ def evaluate():
             target_company=data['targetCompany'],
             experience_level=data['experienceLevel'],
             question=data['question'],
-            answer=answer
+            answer=data['answer'],
+            previous_revision_id=data.get('previousRevisionId')
         )
         
-        return jsonify(evaluation), 200
+        with metrics.timed('serialize'):
+            response = jsonify({**evaluation, 'revisionId': revision_id(data)})
+        return response, 200
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -55,3 +122,381 @@ def evaluate():
             'message': str(e)
         }), 500
 
+@evaluation_bp.route('/quick-check', methods=['POST'])
+def quick_check():
+    """
+    Instant, free structure check of a STAR answer, without calling the LLM.
+
+    Expected JSON body: ``{"answer": "Situation: ..."}``. Returns the local
+    analysis (length, speaking time, STAR sections, "I" versus "we",
+    metrics) and a list of ``tips``.
+    """
+    with metrics.timed('parse'):
+        data = request.get_json(silent=True)
+    answer = data.get('answer') if isinstance(data, dict) else None
+    if not answer or not isinstance(answer, str):
+        return jsonify({'error': 'Missing required field: answer'}), 400
+    if len(answer) > 10000:
+        return jsonify({'error': 'Answer must be less than 10,000 characters'}), 400
+
+    analysis = analyze_answer(answer)
+    with metrics.timed('serialize'):
+        response = jsonify({'analysis': analysis, 'tips': quick_check_tips(analysis)})
+    return response, 200
+
+@evaluation_bp.route('/stream', methods=['POST'])
+@rate_limiter.cost(evaluation_cost)
+@admission.lane('evaluate', cached=evaluation_cached)
+def evaluate_stream():
+    """
+    Evaluate a STAR interview answer, streamed as Server-Sent Events.
+
+    Takes the same JSON body as ``POST /``. Emits a ``section`` event with
+    ``{"name": ..., "value": ...}`` for each top-level part of the
+    evaluation as soon as it is complete, then ``done`` with the
+    ``revisionId``, or an ``error`` event.
+    """
+    with metrics.timed('parse'):
+        data = request.get_json(silent=True)
+        error = validate_evaluation_payload(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    def events():
+        try:
+            for name, value in stream_evaluation(
+                target_role=data['targetRole'],
+                target_company=data['targetCompany'],
+                experience_level=data['experienceLevel'],
+                question=data['question'],
+                answer=data['answer'],
+                previous_revision_id=data.get('previousRevisionId')
+            ):
+                yield sse_event('section', {'name': name, 'value': value})
+            yield sse_event('done', {'revisionId': revision_id(data)})
+        except Exception as e:
+            print(f'Evaluation stream error: {str(e)}')
+            yield sse_event('error', {
+                'error': 'Failed to evaluate answer',
+                'message': str(e)
+            })
+
+    return sse_response(events())
+
+@evaluation_bp.route('/batch', methods=['POST'])
+@rate_limiter.cost(batch_cost)
+def evaluate_batch_route():
+    """
+    Evaluate many STAR answers in one request, streamed as Server-Sent Events.
+
+    Expected JSON body:
+    {
+        "items": [
+            { ...same fields as POST / ... },
+            ...
+        ],
+        "concurrency": 2,  (optional)
+        "stream": false  (optional)
+    }
+
+    Each item is validated like ``POST /`` and queued as a background job,
+    identical items sharing one. At most ``concurrency`` of the batch's
+    jobs run at once, capped at and defaulting to ``BATCH_CONCURRENCY``,
+    and every job also takes an admission slot. The stream starts with a
+    ``queued`` event carrying the ``batchId`` and listing ``{"index": 0,
+    "jobId": ...}`` for every valid item, emits one ``result`` event per
+    item as it finishes, ``{"index": 0, "status": "ok", "evaluation":
+    {...}}`` or ``{"index": 1, "status": "error", "error": ...}``, then a
+    ``done`` event with totals. Invalid or failed items do not fail the
+    batch.
+
+    The stream is held open for at most ``JOB_EVENTS_MAX_DURATION`` seconds,
+    below the worker timeout. Items still pending by then are listed in a
+    final ``timeout`` event; resume with ``GET /batch/<batchId>/events`` or
+    poll ``GET /batch/<batchId>``. With ``"stream": false`` the batch is only
+    queued, and the response is ``202`` with the ``batchId``.
+    """
+    with metrics.timed('parse'):
+        data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Missing required field: items'}), 400
+
+    max_items = int(os.getenv('BATCH_MAX_ITEMS', 200))
+    if len(items) > max_items:
+        return jsonify({'error': f'A batch can contain at most {max_items} items'}), 400
+
+    max_concurrency = int(os.getenv('BATCH_CONCURRENCY', 4))
+    concurrency = data.get('concurrency', max_concurrency)
+    if not isinstance(concurrency, int) or isinstance(concurrency, bool) or concurrency < 1:
+        return jsonify({'error': 'concurrency must be a positive integer'}), 400
+    concurrency = min(concurrency, max_concurrency)
+
+    payloads = []
+    slots = []
+    groups = {}
+    for item in items:
+        error = validate_evaluation_payload(item)
+        if error:
+            slots.append(error)
+            continue
+        payload = _job_payload(item)
+        key = (revision_id(payload), payload.get('previousRevisionId'))
+        if key not in groups:
+            groups[key] = len(payloads)
+            payloads.append(payload)
+        slots.append(groups[key])
+
+    try:
+        batch_id = job_queue.submit_batch('evaluate', payloads, slots, concurrency)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+
+    status_url = url_for('evaluation.batch_status', batch_id=batch_id)
+    events_url = url_for('evaluation.batch_events', batch_id=batch_id)
+    if data.get('stream') is False:
+        return jsonify({
+            'batchId': batch_id,
+            'status': 'queued',
+            'total': len(items),
+            'concurrency': concurrency,
+            'statusUrl': status_url,
+            'eventsUrl': events_url
+        }), 202, {'Location': status_url}
+
+    return sse_response(_batch_events(job_queue.get_batch(batch_id), events_url))
+
+@evaluation_bp.route('/batch/<batch_id>', methods=['GET'])
+@rate_limiter.exempt
+def batch_status(batch_id):
+    """
+    Get the status of a batch, with the result of every finished item.
+
+    ``items`` lists ``{"index": 0, "status": ...}`` for every item of the
+    batch, where ``status`` is ``queued``, ``running``, ``ok`` (with the
+    ``evaluation``) or ``error``. ``status`` is ``done`` once no item is
+    pending.
+    """
+    job_queue.ensure_workers()
+    batch = job_queue.get_batch(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Batch not found'}), 404
+
+    jobs = job_queue.get_many(item['jobId'] for item in batch['items'] if 'jobId' in item)
+    results = [_batch_result(index, item, jobs) for index, item in enumerate(batch['items'])]
+    pending = sum(1 for result in results if result['status'] in ('queued', 'running'))
+    succeeded = sum(1 for result in results if result['status'] == 'ok')
+    return jsonify({
+        'batchId': batch_id,
+        'status': 'running' if pending else 'done',
+        'total': len(results),
+        'pending': pending,
+        'succeeded': succeeded,
+        'failed': len(results) - pending - succeeded,
+        'items': results
+    }), 200
+
+@evaluation_bp.route('/batch/<batch_id>/events', methods=['GET'])
+@rate_limiter.exempt
+def batch_events(batch_id):
+    """
+    Subscribe to a batch as Server-Sent Events.
+
+    Emits the same events as ``POST /batch``. Every connection starts with
+    the results of the items already finished, so a client resuming after
+    a ``timeout`` event skips the indices it already has. A stream is held
+    open for at most ``JOB_EVENTS_MAX_DURATION`` seconds.
+    """
+    job_queue.ensure_workers()
+    batch = job_queue.get_batch(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    return sse_response(_batch_events(batch, request.path))
+
+
+def _batch_events(batch, events_url):
+    """Stream a batch's results until every item finished or the stream has to end."""
+    max_duration = _events_max_duration()
+    pending = {}
+    for index, item in enumerate(batch['items']):
+        if 'jobId' in item:
+            pending.setdefault(item['jobId'], []).append(index)
+
+    def events():
+        yield sse_event('queued', {'batchId': batch['id'], 'jobs': _batch_jobs(pending)})
+        for index, item in enumerate(batch['items']):
+            if 'error' in item:
+                yield sse_event('result', _batch_result(index, item, {}))
+
+        succeeded = 0
+        deadline = time.monotonic() + max_duration
+        while pending and time.monotonic() < deadline:
+            jobs = job_queue.get_many(pending)
+            for job_id in list(pending):
+                job = jobs.get(job_id)
+                if job is not None and job['status'] not in ('done', 'failed'):
+                    continue
+                for index in pending.pop(job_id):
+                    result = _batch_result(index, {'jobId': job_id}, jobs)
+                    succeeded += result['status'] == 'ok'
+                    yield sse_event('result', result)
+            if pending:
+                time.sleep(job_queue.poll_interval)
+
+        if pending:
+            yield sse_event('timeout', {
+                'batchId': batch['id'],
+                'eventsUrl': events_url,
+                'jobs': _batch_jobs(pending)
+            })
+            return
+        yield sse_event('done', {
+            'total': len(batch['items']),
+            'succeeded': succeeded,
+            'failed': len(batch['items']) - succeeded
+        })
+
+    return events()
+
+
+def _batch_result(index, item, jobs):
+    if 'error' in item:
+        return {'index': index, 'status': 'error', 'error': item['error']}
+    job = jobs.get(item['jobId'])
+    if job is None:
+        return {'index': index, 'status': 'error', 'error': 'Failed to evaluate answer', 'message': 'Job not found'}
+    if job['status'] == 'done':
+        return {'index': index, 'status': 'ok', 'evaluation': job['result']}
+    if job['status'] == 'failed':
+        return {'index': index, 'status': 'error', 'error': 'Failed to evaluate answer', 'message': job['error']}
+    return {'index': index, 'status': job['status'], 'jobId': item['jobId']}
+
+
+def _batch_jobs(pending):
+    return sorted(({'index': index, 'jobId': job_id} for job_id, indices in pending.items() for index in indices),
+                  key=lambda job: job['index'])
+
+
+def _run_evaluation_job(data):
+    # Jobs do not go through a request's admission, so they take a slot here
+    with admission.background_slot('evaluate'):
+        evaluation = evaluate_answer(
+            target_role=data['targetRole'],
+            target_company=data['targetCompany'],
+            experience_level=data['experienceLevel'],
+            question=data['question'],
+            answer=data['answer'],
+            previous_revision_id=data.get('previousRevisionId')
+        )
+    return {**evaluation, 'revisionId': revision_id(data)}
+
+job_queue.register('evaluate', _run_evaluation_job)
+
+
+def _job_payload(data):
+    payload = {field: data[field] for field in EVALUATION_FIELDS}
+    if data.get('previousRevisionId'):
+        payload['previousRevisionId'] = data['previousRevisionId']
+    return payload
+
+
+def _events_max_duration():
+    """Seconds a job event stream is held open, below the worker timeout."""
+    return float(os.getenv('JOB_EVENTS_MAX_DURATION', 25))
+
+
+def _job_response(job):
+    body = {
+        'jobId': job['id'],
+        'status': job['status']
+    }
+    if 'position' in job:
+        body['position'] = job['position']
+    if job['status'] == 'done':
+        body['evaluation'] = job['result']
+    elif job['status'] == 'failed':
+        body['error'] = 'Failed to evaluate answer'
+        body['message'] = job['error']
+    return body
+
+@evaluation_bp.route('/jobs', methods=['POST'])
+@rate_limiter.cost(evaluation_cost)
+def submit_job():
+    """
+    Queue an evaluation and return immediately with a job ID.
+
+    Takes the same JSON body as ``POST /``. Responds ``202`` with
+    ``{"jobId": ..., "status": "queued"}``; poll ``GET /jobs/<jobId>`` or
+    subscribe to ``GET /jobs/<jobId>/events`` for the result.
+    """
+    with metrics.timed('parse'):
+        data = request.get_json(silent=True)
+        error = validate_evaluation_payload(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        job_id = job_queue.submit('evaluate', _job_payload(data))
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+
+    status_url = url_for('evaluation.job_status', job_id=job_id)
+    return jsonify({
+        'jobId': job_id,
+        'status': 'queued',
+        'statusUrl': status_url,
+        'eventsUrl': url_for('evaluation.job_events', job_id=job_id)
+    }), 202, {'Location': status_url}
+
+@evaluation_bp.route('/jobs/<job_id>', methods=['GET'])
+@rate_limiter.exempt
+def job_status(job_id):
+    """Get the status of a queued evaluation, including the result once done."""
+    job_queue.ensure_workers()
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_response(job)), 200
+
+@evaluation_bp.route('/jobs/<job_id>/events', methods=['GET'])
+@rate_limiter.exempt
+def job_events(job_id):
+    """
+    Subscribe to a queued evaluation as Server-Sent Events.
+
+    Emits a ``status`` event whenever the job changes state, then a final
+    ``done`` event with the evaluation or an ``error`` event. A stream is
+    held open for at most ``JOB_EVENTS_MAX_DURATION`` seconds, below the
+    worker timeout; if the job is still pending by then, it ends with a
+    ``timeout`` event carrying the current status, and the client should
+    reconnect or poll ``GET /jobs/<jobId>``.
+    """
+    job_queue.ensure_workers()
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    max_duration = _events_max_duration()
+
+    def events():
+        deadline = time.monotonic() + max_duration
+        last_status = None
+        body = {'jobId': job_id}
+        while time.monotonic() < deadline:
+            job = job_queue.get(job_id)
+            if job is None:
+                # Pruned after the retention period while the stream was open
+                yield sse_event('error', {'jobId': job_id, 'error': 'Job not found'})
+                return
+            body = _job_response(job)
+            if job['status'] == 'done':
+                yield sse_event('done', body)
+                return
+            if job['status'] == 'failed':
+                yield sse_event('error', body)
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield sse_event('status', body)
+            time.sleep(job_queue.poll_interval)
+        yield sse_event('timeout', body)
+
+    return sse_response(events())
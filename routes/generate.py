@@ -1,9 +1,41 @@
 from flask import Blueprint, request, jsonify
-from services.generate_service import generate_star_answer
+from services.generate_service import generate_star_answer, stream_star_answer, estimate_generation_tokens
+from routes.sse import sse_event, sse_response
+from services.metrics import metrics
+from services.rate_limit import rate_limiter
+from services.admission import admission
 
 generate_bp = Blueprint('generate', __name__)
 
+
+def validate_generate_payload(data):
+    """Return an error message for an invalid generate request, or None."""
+    if not isinstance(data, dict):
+        return 'Request body must be a JSON object'
+
+    required_fields = ['targetRole', 'targetCompany', 'experienceLevel', 'question']
+    for field in required_fields:
+        if not data.get(field):
+            return f'Missing required field: {field}'
+
+    if len(data['question']) < 10:
+        return 'Question must be at least 10 characters long'
+
+    return None
+
+
+def generate_cost(data):
+    """Estimated LLM tokens for one generate request, charged by the rate limiter."""
+    if not isinstance(data, dict):
+        return 0
+    return estimate_generation_tokens(
+        *(str(data.get(field) or '') for field in ('targetRole', 'targetCompany', 'experienceLevel', 'question')),
+        context=str(data.get('context') or '')
+    )
+
 @generate_bp.route('/', methods=['POST'])
+@rate_limiter.cost(generate_cost)
+@admission.lane('generate')
 def generate():
     """
     Generate a STAR interview answer using AI.
@@ -14,32 +46,35 @@ def generate():
         "targetCompany": "Amazon",
         "experienceLevel": "Mid-level (3-5 years)",
         "question": "Tell me about a time...",
-        "context": "Optional context about experience"
+        "context": "Optional context about experience",
+        "deterministic": false
     }
+
+    With ``"deterministic": true`` the same inputs give the same answer,
+    and identical requests made at the same time share one LLM call.
     """
     try:
-        data = request.get_json()
-        
-        # Validation
-        required_fields = ['targetRole', 'targetCompany', 'experienceLevel', 'question']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        question = data['question']
-        if len(question) < 10:
-            return jsonify({'error': 'Question must be at least 10 characters long'}), 400
+        with metrics.timed('parse'):
+            data = request.get_json()
+            
+            # Validation
+            error = validate_generate_payload(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         # Generate the answer
         answer = generate_star_answer(
             target_role=data['targetRole'],
             target_company=data['targetCompany'],
             experience_level=data['experienceLevel'],
-            question=question,
-            context=data.get('context', '')
+            question=data['question'],
+            context=data.get('context', ''),
+            deterministic=data.get('deterministic') is True
         )
         
-        return jsonify({'answer': answer}), 200
+        with metrics.timed('serialize'):
+            response = jsonify({'answer': answer})
+        return response, 200
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -50,3 +85,41 @@ def generate():
             'message': str(e)
         }), 500
 
+@generate_bp.route('/stream', methods=['POST'])
+@rate_limiter.cost(generate_cost)
+@admission.lane('generate')
+def generate_stream():
+    """
+    Generate a STAR interview answer, streamed as Server-Sent Events.
+
+    Takes the same JSON body as ``POST /``. Emits ``token`` events with
+    ``{"text": ...}`` as the model produces output, then a single ``done``
+    event with the full ``{"answer": ...}``, or an ``error`` event.
+    """
+    with metrics.timed('parse'):
+        data = request.get_json(silent=True)
+        error = validate_generate_payload(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    def events():
+        parts = []
+        try:
+            for text in stream_star_answer(
+                target_role=data['targetRole'],
+                target_company=data['targetCompany'],
+                experience_level=data['experienceLevel'],
+                question=data['question'],
+                context=data.get('context', '')
+            ):
+                parts.append(text)
+                yield sse_event('token', {'text': text})
+            yield sse_event('done', {'answer': ''.join(parts).strip()})
+        except Exception as e:
+            print(f'Generation stream error: {str(e)}')
+            yield sse_event('error', {
+                'error': 'Failed to generate answer',
+                'message': str(e)
+            })
+
+    return sse_response(events())
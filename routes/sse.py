@@ -0,0 +1,30 @@
+"""
+Helpers for Server-Sent Events responses.
+"""
+import json
+from flask import Response, stream_with_context
+from services.metrics import metrics
+
+
+def sse_event(event, data):
+    """Format a single SSE message with a JSON payload."""
+    with metrics.timed('serialize'):
+        payload = json.dumps(data, ensure_ascii=False)
+    return f'event: {event}\ndata: {payload}\n\n'
+
+
+def sse_response(events):
+    """
+    Wrap a generator of formatted SSE messages in a streaming response.
+
+    Buffering is disabled so each message reaches the client as soon as it
+    is yielded, including behind nginx.
+    """
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -1,28 +1,171 @@
 """
 Production server runner using Gunicorn.
+
+SERVER_MODE selects the worker model:
+- sync:   one request per worker process (the original setup)
+- gthread: a thread pool per worker process
+- gevent: cooperative greenlets, hundreds of in-flight requests per worker
+
+Requests spend almost all their time waiting on OpenAI, so gevent is the
+mode to use when serving many concurrent evaluations. The shared SQLite
+stores and the rate limiter's file lock block in C; under gevent they run
+in gevent's thread pool (see ``services/blocking.py``) so a busy database
+only holds up the request waiting on it.
 """
 import os
 import subprocess
 import sys
 
-def main():
-    """Run the Flask app with Gunicorn for production."""
-    port = os.getenv('PORT', '7860')
-    workers = os.getenv('WORKERS', '4')
-    
+SERVER_MODES = ('sync', 'gthread', 'gevent')
+
+# Sync workers of the original setup
+DEFAULT_SYNC_WORKERS = 4
+# Per CPU, with lower and upper bounds per worker
+THREADS_PER_CPU, MIN_THREADS, MAX_THREADS = 8, 8, 64
+CONNECTIONS_PER_CPU, MIN_CONNECTIONS, MAX_CONNECTIONS = 250, 250, 1000
+
+
+def get_server_settings():
+    """
+    Work out worker class and concurrency from the environment and CPU count.
+
+    sync keeps the original four workers. gthread and gevent run one
+    worker per CPU plus one, with threads or connections per worker that
+    grow with the CPU count, since each in-flight request still costs some
+    CPU for parsing, prompt building and serialization.
+    """
+    mode = os.getenv('SERVER_MODE', 'sync').lower()
+    if mode not in SERVER_MODES:
+        raise ValueError(f"SERVER_MODE must be one of: {', '.join(SERVER_MODES)}")
+
+    cpus = os.cpu_count() or 1
+    if mode == 'sync':
+        default_workers = DEFAULT_SYNC_WORKERS
+    else:
+        default_workers = cpus + 1
+    default_threads = min(MAX_THREADS, max(MIN_THREADS, THREADS_PER_CPU * cpus))
+    default_connections = min(MAX_CONNECTIONS, max(MIN_CONNECTIONS, CONNECTIONS_PER_CPU * cpus))
+
+    settings = {
+        'mode': mode,
+        'port': os.getenv('PORT', '7860'),
+        'workers': int(os.getenv('WORKERS', default_workers)),
+        'threads': int(os.getenv('THREADS', default_threads if mode == 'gthread' else 1)),
+        'worker_connections': int(os.getenv('WORKER_CONNECTIONS', default_connections)),
+        'timeout': os.getenv('WORKER_TIMEOUT', '120')
+    }
+
+    # Requests a single worker can have in flight at once
+    if mode == 'gevent':
+        settings['concurrency'] = settings['worker_connections']
+    else:
+        settings['concurrency'] = settings['threads']
+    return settings
+
+
+def build_command(settings, env):
+    """Build the gunicorn command line for the given settings and environment."""
     cmd = [
         'gunicorn',
-        '-w', workers,
-        '-b', f'0.0.0.0:{port}',
-        '--timeout', '120',
+        '-c', 'gunicorn.conf.py',
+        '-w', str(server_workers(settings, env)),
+        '-k', settings['mode'],
+        '-b', f"0.0.0.0:{settings['port']}",
+        '--timeout', settings['timeout'],
         '--access-logfile', '-',
-        '--error-logfile', '-',
-        'app:app'
+        '--error-logfile', '-'
     ]
-    
-    print(f'Starting production server on port {port} with {workers} workers...')
-    subprocess.run(cmd)
+    if settings['mode'] == 'gthread':
+        cmd += ['--threads', str(settings['threads'])]
+    elif settings['mode'] == 'gevent':
+        cmd += ['--worker-connections', str(settings['worker_connections'])]
+    cmd.append('app:app')
+    return cmd
+
+
+def admission_settings(settings):
+    """
+    Admission limits that keep slots free for the fast lane.
+
+    A sync worker serves one request at a time, and holds it while it
+    waits in the admission queue too. So in sync mode each of the
+    ``workers`` may call the LLM, as before admission control, as many
+    requests may wait, and ``server_workers`` starts a worker for each
+    waiting request and one more that only the data and health requests
+    can count on.
+
+    gthread and gevent workers share their slots instead. A quarter of the
+    server's concurrent requests, and at least a whole worker's, is kept
+    for the fast lane. Of the rest, a quarter may wait in the queue, since
+    in gthread mode a waiting request holds its thread, and the others may
+    call the LLM.
+
+    Evaluations, the main traffic, may use all of the LLM slots and
+    generations at most half of them, or one per worker. Waiting requests
+    of both endpoints are admitted in arrival order.
+    """
+    workers = settings['workers']
+    if settings['mode'] == 'sync':
+        queue = total = generate = workers
+    else:
+        slots = workers * settings['concurrency']
+        reserve = max(1, slots // 4, settings['concurrency'] if workers > 1 else 0)
+        budget = max(2, slots - reserve)
+        queue = budget // 4
+        total = max(workers, budget - queue)
+        generate = max(workers, total // 2)
+    return {
+        'ADMISSION_LIMITS': f'evaluate={total}; generate={generate}',
+        'ADMISSION_TOTAL_LIMIT': str(total),
+        'ADMISSION_QUEUE_SIZE': str(queue)
+    }
+
+
+def server_workers(settings, env):
+    """
+    Worker processes to start.
+
+    In sync mode with admission control on, one per LLM slot, one per
+    request that may wait for one and one for the fast lane.
+    """
+    workers = settings['workers']
+    enabled = env.get('ADMISSION_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+    if settings['mode'] != 'sync' or not enabled:
+        return workers
+    return workers + int(env['ADMISSION_QUEUE_SIZE']) + 1
+
+
+def build_environment(settings):
+    """
+    Size per-worker resources to match the worker's concurrency.
+
+    Explicit environment settings always win.
+    """
+    env = os.environ.copy()
+    concurrency = settings['concurrency']
+    env.setdefault('OPENAI_MAX_CONNECTIONS', str(max(20, min(concurrency, 200))))
+    env.setdefault('OPENAI_MAX_KEEPALIVE', str(max(10, min(concurrency, 100))))
+    for name, value in admission_settings(settings).items():
+        env.setdefault(name, value)
+    return env
+
+
+def main():
+    """Run the Flask app with Gunicorn for production."""
+    try:
+        settings = get_server_settings()
+    except ValueError as e:
+        print(str(e))
+        sys.exit(1)
+
+    env = build_environment(settings)
+    cmd = build_command(settings, env)
+
+    print(
+        f"Starting production server on port {settings['port']} with {server_workers(settings, env)} "
+        f"{settings['mode']} workers ({settings['concurrency']} concurrent requests each)..."
+    )
+    subprocess.run(cmd, env=env)
 
 if __name__ == '__main__':
     main()
-
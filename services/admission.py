@@ -0,0 +1,392 @@
+"""
+Admission control for endpoints that call the LLM.
+
+When OpenAI slows down, evaluation and generation requests hold their
+worker for the whole upstream call. Without a cap they pile up until every
+worker is busy, requests die at the worker timeout, and the cheap data and
+health endpoints, which never touch OpenAI, cannot get a worker either.
+
+Views that call the LLM are assigned to a lane (``evaluate`` or
+``generate``) with ``lane``. Every other view is on the fast lane and is
+never held back, and so is a request its lane's ``cached`` check says
+will be answered from a cache. For a request on a lane:
+
+1. If fewer than the lane's limit of requests are running, across all
+   workers, fewer than ``ADMISSION_TOTAL_LIMIT`` are running on all lanes
+   together, and nobody of the same or higher priority is waiting, it runs.
+2. Otherwise it waits in a queue shared by all lanes and ordered by
+   priority, then arrival, for at most ``ADMISSION_MAX_WAIT`` seconds. It
+   checks for a slot every ``ADMISSION_POLL_INTERVAL`` seconds at first,
+   backing off to ``MAX_POLL_INTERVAL`` so long waits do not keep the
+   shared table busy.
+3. If the queue is full or the wait times out, it is shed with ``503`` and
+   a ``Retry-After`` estimated from how long admitted requests have
+   recently held their slot (almost all of it upstream time), the lane's
+   limit and the requests already waiting.
+
+Background jobs take a slot with ``background_slot`` at batch priority.
+They never occupy the queue: they run only once a slot is free and no
+request is waiting for one, however long that takes.
+
+Slots are rows in a shared SQLite table with a lease, so a worker killed
+in the middle of a request only holds its slot until the lease expires.
+The lease outlasts the upstream calls of a healthy request, so a slow one
+never loses its slot.
+The total limit should leave some request slots of the server free for
+the fast lane, while the lane limits may add up to more than it so that a
+lane can use capacity the other one leaves idle; ``run_production.py``
+sizes them that way by default.
+"""
+import os
+import math
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from flask import current_app, g, request
+from werkzeug.exceptions import ServiceUnavailable
+
+from services.blocking import offload
+from services.job_queue import default_job_timeout
+from services.metrics import metrics
+from services.openai_client import max_call_seconds
+from services.result_cache import connect_sqlite
+
+app_dir = Path(__file__).parent.parent.absolute()
+DEFAULT_ADMISSION_PATH = app_dir / 'instance' / 'admission.sqlite3'
+
+DEFAULT_LIMITS = 'evaluate=8; generate=4'
+
+# Lower numbers are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+# Seconds between attempts of background work to take a slot
+BACKGROUND_RETRY_INTERVAL = 0.5
+# Longest pause between checks of a queued request
+MAX_POLL_INTERVAL = 0.4
+
+# Weight of the newest hold time in the per-lane average
+LATENCY_SMOOTHING = 0.2
+
+
+def parse_lane_limits(value):
+    """Parse ``"evaluate=8; generate=4"`` into ``{'evaluate': 8, 'generate': 4}``."""
+    limits = {}
+    for part in value.replace(',', ';').split(';'):
+        if not part.strip():
+            continue
+        lane, _, limit = part.partition('=')
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError(f'Invalid admission limit: {part.strip()!r}')
+        if limit < 1:
+            raise ValueError(f'Admission limit must be at least 1: {part.strip()!r}')
+        limits[lane.strip()] = limit
+    return limits
+
+
+class AdmissionController:
+    """Per-lane concurrency limits with a bounded priority queue, shared by all workers."""
+
+    def __init__(self, path=None, limits=None, total_limit=None, queue_size=None, max_wait=None, lease_ttl=None,
+                 poll_interval=None, enabled=None):
+        self.path = path or os.getenv('ADMISSION_PATH', str(DEFAULT_ADMISSION_PATH))
+        self.limits = limits if limits is not None else parse_lane_limits(os.getenv('ADMISSION_LIMITS',
+                                                                                    DEFAULT_LIMITS))
+        # 0 leaves only the lane limits
+        self.total_limit = (total_limit if total_limit is not None
+                            else int(os.getenv('ADMISSION_TOTAL_LIMIT', 0)))
+        self.queue_size = queue_size if queue_size is not None else int(os.getenv('ADMISSION_QUEUE_SIZE', 16))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv('ADMISSION_MAX_WAIT', 10))
+        # A request makes the same upstream calls as a job, and never less than one
+        self.lease_ttl = max(lease_ttl if lease_ttl is not None
+                             else float(os.getenv('ADMISSION_LEASE_TTL') or default_job_timeout()),
+                             max_call_seconds())
+        self.poll_interval = (poll_interval if poll_interval is not None
+                              else float(os.getenv('ADMISSION_POLL_INTERVAL', 0.05)))
+        if enabled is None:
+            enabled = os.getenv('ADMISSION_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+        self.enabled = enabled
+
+        self._lanes = {}
+        self._local = threading.local()
+        self._schema_ready_pid = None
+        self._owner = None
+
+    # -- Flask integration -----------------------------------------------
+
+    def init_app(self, app):
+        app.before_request(self.admit)
+        app.after_request(self._release_on_close)
+        app.teardown_request(self._release_unfinished)
+
+    def lane(self, name, priority=PRIORITY_INTERACTIVE, cached=None):
+        """
+        Decorator putting a view on lane ``name``; views without a lane are never held back.
+
+        ``cached`` is called with the parsed JSON body (or None) and returns
+        True when the request will be answered from a cache without calling
+        the LLM, in which case it takes no slot.
+        """
+        def decorator(view):
+            self._lanes[view] = (name, priority, cached)
+            return view
+        return decorator
+
+    def admit(self):
+        """
+        ``before_request`` hook taking a slot on the view's lane.
+
+        Raises:
+            ServiceUnavailable: If the request was shed, with ``Retry-After``
+            set to when a slot is expected to be free
+        """
+        if not self.enabled or request.endpoint is None:
+            return
+        lane = self._lanes.get(current_app.view_functions.get(request.endpoint))
+        if lane is None:
+            return
+        name, priority, cached = lane
+        if cached is not None and cached(request.get_json(silent=True)):
+            return
+        g.admission_slot = self.acquire(name, priority)
+
+    def _release_on_close(self, response):
+        # Streamed responses keep their slot until the last event is sent
+        slot = g.pop('admission_slot', None)
+        if slot is not None:
+            response.call_on_close(lambda: self.release(slot))
+        return response
+
+    def _release_unfinished(self, error=None):
+        slot = g.pop('admission_slot', None)
+        if slot is not None:
+            self.release(slot)
+
+    # -- storage ---------------------------------------------------------
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+            self._local.pid = pid
+        if self._schema_ready_pid != pid:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS admission_slots ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, lane TEXT NOT NULL, priority INTEGER NOT NULL, '
+                'state TEXT NOT NULL, owner TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS admission_slots_lane ON admission_slots (lane, state)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS admission_latency ('
+                'lane TEXT PRIMARY KEY, seconds REAL NOT NULL)'
+            )
+            self._owner = f'{pid}-{uuid.uuid4().hex[:8]}'
+            self._schema_ready_pid = pid
+        return conn
+
+    def _transaction(self, fn):
+        return offload(self._run_transaction, fn)
+
+    def _run_transaction(self, fn):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(conn)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+
+    @staticmethod
+    def _count(conn, state, lane=None, ahead_of=None):
+        """
+        Count slots in ``state``, on ``lane`` or on every lane.
+
+        ``ahead_of`` is a ``(priority, id)`` pair; only slots that would be
+        admitted before it are counted, with ``id`` None for a new arrival.
+        """
+        sql, params = 'SELECT COUNT(*) FROM admission_slots WHERE state = ?', [state]
+        if lane is not None:
+            sql += ' AND lane = ?'
+            params.append(lane)
+        if ahead_of is not None:
+            priority, slot_id = ahead_of
+            if slot_id is None:
+                sql += ' AND priority <= ?'
+                params.append(priority)
+            else:
+                sql += ' AND (priority < ? OR (priority = ? AND id < ?))'
+                params.extend((priority, priority, slot_id))
+        return conn.execute(sql, params).fetchone()[0]
+
+    def _fits(self, conn, lane, priority, slot_id=None):
+        """Whether a request can run now, with everyone admitted before it running first."""
+        ahead_of = (priority, slot_id)
+        if (self._count(conn, 'running', lane)
+                + self._count(conn, 'waiting', lane, ahead_of) >= self.limits[lane]):
+            return False
+        return not self.total_limit or (self._count(conn, 'running')
+                                        + self._count(conn, 'waiting', ahead_of=ahead_of) < self.total_limit)
+
+    def _retry_after(self, conn, lane):
+        """Seconds until a slot on ``lane`` is expected to be free for a new request."""
+        row = conn.execute('SELECT seconds FROM admission_latency WHERE lane = ?', (lane,)).fetchone()
+        held = row[0] if row else self.max_wait
+        limit = self.limits[lane]
+        if self.total_limit and self.total_limit < limit:
+            limit = self.total_limit
+        waiting = self._count(conn, 'waiting', None if self.total_limit else lane)
+        return max(1, math.ceil(held * (waiting + 1) / limit))
+
+    # -- public API ------------------------------------------------------
+
+    def acquire(self, lane, priority=PRIORITY_INTERACTIVE):
+        """
+        Take a slot on ``lane``, waiting in the queue if needed.
+
+        Returns:
+            tuple: The slot to pass to ``release``, or None when the lane is
+            not limited or the slot table is unavailable
+
+        Raises:
+            ServiceUnavailable: If the queue is full or the wait timed out
+        """
+        if not self.enabled or lane not in self.limits:
+            return None
+        started = time.monotonic()
+
+        def arrive(conn):
+            slot_id = self._admit_now(conn, lane, priority)
+            if slot_id is not None:
+                return (slot_id, 'running'), None
+            if self._count(conn, 'waiting') >= self.queue_size:
+                return None, self._retry_after(conn, lane)
+            # A waiter gives up after max_wait, so a dead one is dropped soon after
+            cursor = conn.execute(
+                "INSERT INTO admission_slots (lane, priority, state, owner, expires_at) VALUES (?, ?, 'waiting', ?, ?)",
+                (lane, priority, self._owner, time.time() + self.max_wait + 1)
+            )
+            return (cursor.lastrowid, 'waiting'), None
+
+        try:
+            entry, retry_after = self._transaction(arrive)
+        except sqlite3.Error as e:
+            # Admission is a safeguard; never fail the request for it
+            print(f'Admission error ({lane}): {str(e)}')
+            return None
+        if entry is None:
+            self._shed(lane, 'queue_full', retry_after)
+        slot_id, state = entry
+        if state == 'running':
+            metrics.increment('admission_total', lane=lane, result='admitted')
+            return slot_id, lane, time.monotonic()
+
+        metrics.increment('admission_total', lane=lane, result='queued')
+        deadline = started + self.max_wait
+
+        def promote(conn):
+            row = conn.execute('SELECT state FROM admission_slots WHERE id = ?', (slot_id,)).fetchone()
+            if row is None:
+                return False
+            if not self._fits(conn, lane, priority, slot_id):
+                return False
+            conn.execute("UPDATE admission_slots SET state = 'running', expires_at = ? WHERE id = ?",
+                         (time.time() + self.lease_ttl, slot_id))
+            return True
+
+        def give_up(conn):
+            conn.execute('DELETE FROM admission_slots WHERE id = ?', (slot_id,))
+            return self._retry_after(conn, lane)
+
+        try:
+            interval = self.poll_interval
+            while time.monotonic() < deadline:
+                time.sleep(min(interval, max(0, deadline - time.monotonic())))
+                interval = min(2 * interval, max(self.poll_interval, MAX_POLL_INTERVAL))
+                if self._transaction(promote):
+                    metrics.observe('admission_wait_seconds', time.monotonic() - started, lane=lane)
+                    return slot_id, lane, time.monotonic()
+            retry_after = self._transaction(give_up)
+        except sqlite3.Error as e:
+            print(f'Admission error ({lane}): {str(e)}')
+            return None
+        metrics.observe('admission_wait_seconds', time.monotonic() - started, lane=lane)
+        self._shed(lane, 'timeout', retry_after)
+
+    def _admit_now(self, conn, lane, priority):
+        """Take a running slot if one is free now; returns its id or None."""
+        now = time.time()
+        conn.execute('DELETE FROM admission_slots WHERE expires_at < ?', (now,))
+        if not self._fits(conn, lane, priority):
+            return None
+        cursor = conn.execute(
+            "INSERT INTO admission_slots (lane, priority, state, owner, expires_at) VALUES (?, ?, 'running', ?, ?)",
+            (lane, priority, self._owner, now + self.lease_ttl)
+        )
+        return cursor.lastrowid
+
+    @contextmanager
+    def background_slot(self, lane, priority=PRIORITY_BATCH):
+        """
+        Hold a slot on ``lane`` for work done outside a request, such as a job.
+
+        Background work never takes a place in the queue, which is kept for
+        requests that can be shed. It waits, however long it takes, until a
+        slot is free and no request is waiting for one.
+        """
+        slot = None
+        if self.enabled and lane in self.limits:
+            started = time.monotonic()
+            while True:
+                try:
+                    slot_id = self._transaction(lambda conn: self._admit_now(conn, lane, priority))
+                except sqlite3.Error as e:
+                    print(f'Admission error ({lane}): {str(e)}')
+                    break
+                if slot_id is not None:
+                    metrics.increment('admission_total', lane=lane, result='admitted')
+                    metrics.observe('admission_wait_seconds', time.monotonic() - started, lane=lane)
+                    slot = slot_id, lane, time.monotonic()
+                    break
+                time.sleep(BACKGROUND_RETRY_INTERVAL)
+        try:
+            yield
+        finally:
+            self.release(slot)
+
+    def _shed(self, lane, reason, retry_after):
+        metrics.increment('admission_total', lane=lane, result=reason)
+        raise ServiceUnavailable(f'The server is busy, retry in {retry_after} seconds',
+                                 retry_after=retry_after)
+
+    def release(self, slot):
+        """Free a slot taken by ``acquire`` and record how long it was held."""
+        if slot is None:
+            return
+        slot_id, lane, admitted_at = slot
+        held = time.monotonic() - admitted_at
+
+        def free(conn):
+            conn.execute('DELETE FROM admission_slots WHERE id = ?', (slot_id,))
+            conn.execute(
+                'INSERT INTO admission_latency (lane, seconds) VALUES (?, ?) '
+                'ON CONFLICT(lane) DO UPDATE SET seconds = seconds * ? + excluded.seconds * ?',
+                (lane, held, 1 - LATENCY_SMOOTHING, LATENCY_SMOOTHING)
+            )
+
+        try:
+            self._transaction(free)
+        except sqlite3.Error as e:
+            print(f'Admission release error ({lane}): {str(e)}')
+
+
+admission = AdmissionController()
@@ -0,0 +1,289 @@
+"""
+Pool of pre-generated STAR answers for popular question combinations.
+
+Generate requests without personal context are drawn from a small input
+space (role, company, level and a question from the bank), so most of them
+can be served from answers generated earlier. Only combinations whose
+inputs all come from the static lists are pooled; anything typed in by
+hand is generated live and never recorded, so made-up combinations cannot
+trigger background work. For each combination the
+pool keeps up to ``ANSWER_POOL_SIZE`` answers in a shared SQLite database
+and hands them out round-robin, so repeated requests still see different
+answers. Until a combination holds ``ANSWER_POOL_MIN_SIZE`` answers,
+requests are generated live and the live answer is added to the pool.
+
+Every lookup is recorded as demand. A background thread in each process
+tops up the pools of the most requested combinations (requested at least
+``ANSWER_POOL_MIN_HITS`` times, weighted towards recent traffic) by
+generating more answers. Workers claim a combination before generating, so
+two workers never warm the same one at once. All workers together start
+at most ``ANSWER_POOL_WARM_BUDGET`` generations per hour, and each runs in
+a background slot of the ``generate`` admission lane, so warming only uses
+upstream capacity that requests leave idle. Answers are tagged with the
+prompt version and model; answers from any other version are purged on
+startup.
+"""
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from services.admission import admission
+from services.blocking import offload
+from services.metrics import metrics
+from services.result_cache import connect_sqlite, make_cache_key, normalize_text
+
+app_dir = Path(__file__).parent.parent.absolute()
+DEFAULT_POOL_PATH = app_dir / 'instance' / 'answer_pool.sqlite3'
+
+# Seconds between warming passes when no miss wakes the warmer earlier
+WARM_INTERVAL = 60
+# Seconds a claimed combination is reserved for the worker warming it
+CLAIM_TIMEOUT = 300
+# Seconds a combination is skipped after warming it failed
+FAILURE_BACKOFF = 600
+# Demand older than this many seconds counts half as much
+DEMAND_HALF_LIFE = 24 * 3600
+# Combinations not requested for this many seconds are dropped with their answers
+DEMAND_RETENTION = 30 * 24 * 3600
+# Seconds over which ANSWER_POOL_WARM_BUDGET generations may be started
+WARM_BUDGET_WINDOW = 3600
+
+
+class AnswerPool:
+    """Shared pool of pre-generated answers with traffic-driven warming."""
+
+    def __init__(self, version, generate, accepts, path=None, size=None, min_size=None,
+                 min_hits=None, max_combos=None, warm_budget=None, enabled=None):
+        """
+        Args:
+            version: Prompt version and model the answers belong to
+            generate: ``generate(target_role, target_company, experience_level, question)``
+                returning a fresh answer, used for warming
+            accepts: ``accepts(target_role, target_company, experience_level, question)``
+                telling whether a combination may be pooled
+        """
+        self.version = version
+        self.generate = generate
+        self.accepts = accepts
+        self.path = path or os.getenv('ANSWER_POOL_PATH', str(DEFAULT_POOL_PATH))
+        self.size = size if size is not None else int(os.getenv('ANSWER_POOL_SIZE', 5))
+        self.min_size = min(self.size, min_size if min_size is not None else int(os.getenv('ANSWER_POOL_MIN_SIZE', 3)))
+        self.min_hits = min_hits if min_hits is not None else int(os.getenv('ANSWER_POOL_MIN_HITS', 5))
+        self.max_combos = max_combos if max_combos is not None else int(os.getenv('ANSWER_POOL_MAX_COMBOS', 200))
+        self.warm_budget = warm_budget if warm_budget is not None else int(os.getenv('ANSWER_POOL_WARM_BUDGET', 30))
+        if enabled is None:
+            enabled = os.getenv('ANSWER_POOL_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+        self.enabled = enabled and self.size > 0
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._schema_ready_pid = None
+        self._warmer_pid = None
+
+    # -- storage ---------------------------------------------------------
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+            self._local.pid = pid
+        if self._schema_ready_pid != pid:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS demand ('
+                'combo TEXT PRIMARY KEY, version TEXT NOT NULL, target_role TEXT NOT NULL, '
+                'target_company TEXT NOT NULL, experience_level TEXT NOT NULL, question TEXT NOT NULL, '
+                'hits INTEGER NOT NULL, last_seen REAL NOT NULL, cursor INTEGER NOT NULL DEFAULT 0, '
+                'claimed_until REAL NOT NULL DEFAULT 0)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS answers ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, combo TEXT NOT NULL, version TEXT NOT NULL, '
+                'answer TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS answers_combo ON answers (combo, id)')
+            conn.execute('CREATE TABLE IF NOT EXISTS warm_starts (started_at REAL NOT NULL)')
+            self._maintain(conn)
+            self._schema_ready_pid = pid
+        return conn
+
+    def _maintain(self, conn):
+        cutoff = time.time() - DEMAND_RETENTION
+        conn.execute('DELETE FROM answers WHERE version != ?', (self.version,))
+        conn.execute('DELETE FROM demand WHERE version != ? OR last_seen < ?', (self.version, cutoff))
+        conn.execute('DELETE FROM answers WHERE combo NOT IN (SELECT combo FROM demand)')
+
+    def combo_key(self, target_role, target_company, experience_level, question):
+        """Key of a combination, insensitive to case and whitespace."""
+        return make_cache_key(
+            self.version,
+            normalize_text(target_role, casefold=True),
+            normalize_text(target_company, casefold=True),
+            normalize_text(experience_level, casefold=True),
+            normalize_text(question, casefold=True)
+        )
+
+    # -- serving ---------------------------------------------------------
+
+    def take(self, target_role, target_company, experience_level, question):
+        """
+        Record demand for a combination and return its next pooled answer.
+
+        Returns None when the pool for the combination is still too small,
+        or the combination is not one the pool accepts; the caller should
+        generate live and ``add`` the result.
+        """
+        if not self.enabled or not self.accepts(target_role, target_company, experience_level, question):
+            return None
+        self._ensure_warmer()
+        combo = self.combo_key(target_role, target_company, experience_level, question)
+        try:
+            answer, below_target = offload(self._take, combo, (target_role, target_company, experience_level, question))
+        except sqlite3.Error as e:
+            print(f'Answer pool read error: {str(e)}')
+            return None
+        if below_target:
+            self._wakeup.set()
+        metrics.increment('cache_requests_total', namespace='answer_pool', result='hit' if answer else 'miss')
+        return answer
+
+    def _take(self, combo, inputs):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT cursor FROM demand WHERE combo = ?', (combo,)).fetchone()
+            if row is None:
+                conn.execute(
+                    'INSERT INTO demand (combo, version, target_role, target_company, experience_level, '
+                    'question, hits, last_seen) VALUES (?, ?, ?, ?, ?, ?, 1, ?)',
+                    (combo, self.version) + inputs + (now,)
+                )
+                conn.execute('COMMIT')
+                return None, True
+
+            answers = conn.execute(
+                'SELECT answer FROM answers WHERE combo = ? ORDER BY id', (combo,)
+            ).fetchall()
+            served = len(answers) >= self.min_size
+            conn.execute(
+                'UPDATE demand SET hits = hits + 1, last_seen = ?, cursor = cursor + ? WHERE combo = ?',
+                (now, 1 if served else 0, combo)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        answer = answers[row[0] % len(answers)][0] if served else None
+        return answer, len(answers) < self.size
+
+    def add(self, target_role, target_company, experience_level, question, answer):
+        """Add a live-generated answer to the combination's pool if it has room."""
+        if not self.enabled or not answer or not self.accepts(target_role, target_company, experience_level, question):
+            return
+        combo = self.combo_key(target_role, target_company, experience_level, question)
+        try:
+            offload(self._insert, combo, answer)
+        except sqlite3.Error as e:
+            print(f'Answer pool write error: {str(e)}')
+
+    def _insert(self, combo, answer):
+        self._connection().execute(
+            'INSERT INTO answers (combo, version, answer, created_at) '
+            'SELECT ?, ?, ?, ? WHERE (SELECT COUNT(*) FROM answers WHERE combo = ?) < ?',
+            (combo, self.version, answer, time.time(), combo, self.size)
+        )
+
+    # -- warming ---------------------------------------------------------
+
+    def _ensure_warmer(self):
+        """Start this process's warming thread (again after a fork)."""
+        pid = os.getpid()
+        if self._warmer_pid == pid:
+            return
+        with self._lock:
+            if self._warmer_pid == pid:
+                return
+            self._warmer_pid = pid
+            threading.Thread(target=self._warm_loop, name='answer-pool-warmer', daemon=True).start()
+
+    def _warm_loop(self):
+        while True:
+            self._wakeup.wait(WARM_INTERVAL)
+            self._wakeup.clear()
+            try:
+                while self.warm_one():
+                    pass
+            except Exception as e:
+                print(f'Answer pool warming error: {str(e)}')
+
+    def _candidates(self, conn, now):
+        rows = conn.execute(
+            'SELECT d.combo, d.target_role, d.target_company, d.experience_level, d.question, '
+            'd.hits, d.last_seen, COUNT(a.id) FROM demand d LEFT JOIN answers a ON a.combo = d.combo '
+            'WHERE d.hits >= ? AND d.claimed_until < ? GROUP BY d.combo '
+            'HAVING COUNT(a.id) < ? ORDER BY d.hits DESC LIMIT ?',
+            (self.min_hits, now, self.size, self.max_combos)
+        ).fetchall()
+        return sorted(rows, key=lambda row: row[5] * 0.5 ** ((now - row[6]) / DEMAND_HALF_LIFE), reverse=True)
+
+    def warm_one(self):
+        """
+        Generate one answer for the most requested combination below its target size.
+
+        Returns:
+            bool: True if an answer was added, False if there was nothing to
+            do, the warming budget is spent or generation failed
+        """
+        claim = offload(self._claim_next)
+        if claim is None:
+            return False
+        combo, inputs = claim
+
+        try:
+            with admission.background_slot('generate'):
+                answer = self.generate(*inputs)
+        except Exception as e:
+            print(f'Answer pool generation error: {str(e)}')
+            offload(self._set_claim, combo, time.time() + FAILURE_BACKOFF)
+            return False
+        offload(self._insert, combo, answer)
+        offload(self._set_claim, combo, 0)
+        metrics.increment('answer_pool_warmed_total')
+        return True
+
+    def _claim_next(self):
+        """
+        Claim the best candidate for warming and charge it to the budget.
+
+        Returns ``(combo, inputs)``, or None if there is no candidate or
+        the budget shared by all workers is spent.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM warm_starts WHERE started_at < ?', (now - WARM_BUDGET_WINDOW,))
+            claim = None
+            if conn.execute('SELECT COUNT(*) FROM warm_starts').fetchone()[0] < self.warm_budget:
+                claim = self._claim(conn, now)
+            if claim is not None:
+                conn.execute('INSERT INTO warm_starts (started_at) VALUES (?)', (now,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return claim
+
+    def _claim(self, conn, now):
+        for combo, *inputs, hits, last_seen, count in self._candidates(conn, now):
+            conn.execute('UPDATE demand SET claimed_until = ? WHERE combo = ?', (now + CLAIM_TIMEOUT, combo))
+            return combo, inputs
+        return None
+
+    def _set_claim(self, combo, claimed_until):
+        self._connection().execute('UPDATE demand SET claimed_until = ? WHERE combo = ?', (claimed_until, combo))
@@ -0,0 +1,52 @@
+"""
+Blocking storage calls that must not stall gevent workers.
+
+The shared stores keep their state in SQLite, whose busy timeout and
+``BEGIN IMMEDIATE`` wait inside C code, and the SQLite rate limiter queues
+on a file lock. Under a gevent worker such a wait stops every greenlet in
+the process, not just the request that made the call. ``offload`` runs
+the call in gevent's pool of native threads when the process has been
+monkey-patched, and calls it directly in sync and gthread workers.
+``start_background`` starts work nobody waits for on a native thread.
+"""
+import sys
+import time
+import threading
+
+
+def _gevent_patched():
+    if 'gevent' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('socket')
+
+
+def offload(fn, *args, **kwargs):
+    """Return ``fn(*args, **kwargs)``, run on a native thread under gevent."""
+    if _gevent_patched():
+        from gevent import get_hub
+        return get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
+
+
+def start_background(fn, *args):
+    """
+    Start ``fn(*args)`` on a new native thread and return at once.
+
+    Safe to call from a thread ``offload`` runs on, where gevent's patched
+    threads would never be scheduled.
+    """
+    if _gevent_patched():
+        from gevent import monkey
+        monkey.get_original('_thread', 'start_new_thread')(fn, args)
+    else:
+        threading.Thread(target=fn, args=args, daemon=True).start()
+
+
+def background_sleep(seconds):
+    """``time.sleep`` for a thread ``start_background`` started, which must not switch greenlets."""
+    if _gevent_patched():
+        from gevent import monkey
+        monkey.get_original('time', 'sleep')(seconds)
+    else:
+        time.sleep(seconds)
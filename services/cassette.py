@@ -0,0 +1,168 @@
+"""
+Record and replay OpenAI chat completions.
+
+With ``OPENAI_CASSETTE_MODE=record`` every completion the services make is
+stored in a cassette directory. The key is a fingerprint of the request
+arguments. Streamed responses are stored chunk by chunk, with the time
+each chunk arrived. With ``OPENAI_CASSETTE_MODE=replay`` the same requests
+are answered from the cassettes without any network access. Recorded
+timing is replayed as-is (``OPENAI_CASSETTE_LATENCY=original``) or
+skipped (``zero``), which isolates the Flask and serialization overhead
+for profiling and makes performance regression runs reproducible.
+
+Each recording is one gzip-compressed JSON file named after its fingerprint.
+The fingerprint leaves out ``max_tokens``, which ``services.token_budget``
+sizes from the outputs a process has already seen, so a replay matches
+whatever order, concurrency or subset of the requests it runs.
+"""
+import os
+import json
+import gzip
+import time
+import uuid
+import hashlib
+from pathlib import Path
+from types import SimpleNamespace
+
+app_dir = Path(__file__).parent.parent.absolute()
+DEFAULT_CASSETTE_DIR = app_dir / 'instance' / 'cassettes'
+
+CASSETTE_MODES = ('off', 'record', 'replay')
+LATENCY_MODES = ('original', 'zero')
+
+# Request arguments derived from the output budget, left out of fingerprints
+BUDGET_ARGUMENTS = ('max_tokens', 'max_completion_tokens')
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when no recording matches a request."""
+
+
+def get_cassette_mode():
+    """Get the cassette mode from the environment."""
+    mode = os.getenv('OPENAI_CASSETTE_MODE', 'off').lower()
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"OPENAI_CASSETTE_MODE must be one of: {', '.join(CASSETTE_MODES)}")
+    return mode
+
+
+def fingerprint(request):
+    """Stable hash of the request arguments, other than the output budget."""
+    request = {name: value for name, value in request.items() if name not in BUDGET_ARGUMENTS}
+    encoded = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _to_namespace(value):
+    """Turn recorded JSON into objects with attribute access, like the SDK's models."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+def _dump(obj):
+    return obj.model_dump() if hasattr(obj, 'model_dump') else obj
+
+
+class CassetteStore:
+    """Directory of recordings, one gzip JSON file per request fingerprint."""
+
+    def __init__(self, directory=None, latency=None):
+        self.directory = Path(directory or os.getenv('OPENAI_CASSETTE_DIR', str(DEFAULT_CASSETTE_DIR)))
+        self.latency = (latency or os.getenv('OPENAI_CASSETTE_LATENCY', 'original')).lower()
+        if self.latency not in LATENCY_MODES:
+            raise ValueError(f"OPENAI_CASSETTE_LATENCY must be one of: {', '.join(LATENCY_MODES)}")
+
+    def _path(self, key):
+        return self.directory / key[:2] / f'{key}.json.gz'
+
+    def load(self, request):
+        path = self._path(fingerprint(request))
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise CassetteMissError(f'No recording for request {path.stem[:12]} in {self.directory}')
+
+    def save(self, request, recording):
+        key = fingerprint(request)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        recording = dict(recording, fingerprint=key, request=request, recordedAt=time.time())
+        # Write then rename, so concurrent workers never read a partial file
+        tmp_path = path.with_suffix(f'.{uuid.uuid4().hex}.tmp')
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(recording, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def wait(self, seconds):
+        if self.latency == 'original' and seconds > 0:
+            time.sleep(seconds)
+
+
+class CassetteCompletions:
+    """Drop-in for ``client.chat.completions`` that records or replays."""
+
+    def __init__(self, store, mode, client=None):
+        self.store = store
+        self.mode = mode
+        self.client = client
+
+    def create(self, **kwargs):
+        if self.mode == 'replay':
+            return self._replay(kwargs)
+        return self._record(kwargs)
+
+    def _record(self, request):
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(**request)
+        if not request.get('stream'):
+            self.store.save(request, {
+                'stream': False,
+                'elapsed': time.perf_counter() - started,
+                'response': _dump(response)
+            })
+            return response
+        return self._record_stream(request, response, started)
+
+    def _record_stream(self, request, stream, started):
+        chunks = []
+        for chunk in stream:
+            chunks.append({'offset': time.perf_counter() - started, 'chunk': _dump(chunk)})
+            yield chunk
+        # Only complete streams are saved; an abandoned one would replay truncated
+        self.store.save(request, {
+            'stream': True,
+            'elapsed': time.perf_counter() - started,
+            'chunks': chunks
+        })
+
+    def _replay(self, request):
+        recording = self.store.load(request)
+        if not recording['stream']:
+            self.store.wait(recording['elapsed'])
+            return _to_namespace(recording['response'])
+        return self._replay_stream(recording)
+
+    def _replay_stream(self, recording):
+        previous = 0.0
+        for entry in recording['chunks']:
+            self.store.wait(entry['offset'] - previous)
+            previous = entry['offset']
+            yield _to_namespace(entry['chunk'])
+
+
+def wrap_client(client, mode=None, store=None):
+    """
+    Wrap an OpenAI client for the cassette mode.
+
+    Returns ``client`` unchanged when the mode is ``off``. In replay mode
+    ``client`` may be ``None``.
+    """
+    mode = mode or get_cassette_mode()
+    if mode == 'off':
+        return client
+    completions = CassetteCompletions(store or CassetteStore(), mode, client)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
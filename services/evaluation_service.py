@@ -1,24 +1,454 @@
 import os
 import json
-from openai import OpenAI
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from pathlib import Path
-from data.static_data import get_company_values
+from services.openai_client import get_openai_client
+from services.result_cache import ResultCache, make_cache_key, normalize_text
+from services.similarity_cache import SimilarityIndex
+from services.single_flight import SingleFlight
+from services.star_analyzer import STAR_SECTIONS, analyze_answer, length_timing_feedback, section_digests
+from services.json_stream import SectionStreamParser
+from services import llm_json
+from services.metrics import metrics, record_completion
+from services.token_budget import token_budget
+from services.prompt_templates import (
+    EVALUATION_SECTIONS,
+    EVALUATION_TEMPLATE_VERSION,
+    SCORED_DIMENSIONS,
+    SECTION_SHAPES,
+    STAR_DIMENSIONS,
+    build_evaluation_messages,
+    dimension_names,
+    estimate_tokens,
+    expected_evaluation_tokens
+)
 
 # Load environment variables - ensure we load from the project root
 app_dir = Path(__file__).parent.parent.absolute()
 env_path = app_dir / '.env'
 load_dotenv(dotenv_path=env_path)
 
-# Initialize OpenAI client
-def get_openai_client():
-    """Get OpenAI client with API key from environment."""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-    return OpenAI(api_key=api_key)
+# Derived from the prompt templates, so editing a template stops cached
+# results from the old prompt being served.
+EVALUATION_PROMPT_VERSION = EVALUATION_TEMPLATE_VERSION
 
-def evaluate_answer(target_role, target_company, experience_level, question, answer):
+evaluation_cache = ResultCache('evaluation', EVALUATION_PROMPT_VERSION)
+
+# STAR section digests of every cached evaluation's answer, by revision ID
+# (the evaluation's cache key), so a revised answer can reuse the feedback
+# on the sections it did not change
+revision_cache = ResultCache('evaluation_revision', EVALUATION_PROMPT_VERSION)
+
+# Near-identical answers to the same question reuse a cached evaluation
+evaluation_similar = SimilarityIndex('evaluation', EVALUATION_PROMPT_VERSION)
+
+# Identical evaluations in flight at the same time share one upstream call
+evaluation_flight = SingleFlight('evaluation')
+
+
+def get_evaluation_model():
+    """Get the model used for evaluations."""
+    return os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview')
+
+
+def evaluation_cache_key(target_role, target_company, experience_level, question, answer):
+    """Build the cache key for an evaluation request."""
+    return make_cache_key(
+        get_evaluation_model(),
+        evaluation_cache.version,
+        normalize_text(target_role, casefold=True),
+        normalize_text(target_company, casefold=True),
+        normalize_text(experience_level, casefold=True),
+        normalize_text(question, casefold=True),
+        normalize_text(answer)
+    )
+
+
+def is_evaluation_cached(target_role, target_company, experience_level, question, answer):
+    """Whether the evaluation of this exact request is cached, so it needs no LLM call."""
+    return evaluation_cache.contains(
+        evaluation_cache_key(target_role, target_company, experience_level, question, answer)
+    )
+
+
+def evaluation_partition(target_role, target_company, experience_level, question):
+    """Similarity partition of an evaluation: everything but the answer must match."""
+    return evaluation_similar.partition_key(
+        get_evaluation_model(),
+        normalize_text(target_role, casefold=True),
+        normalize_text(target_company, casefold=True),
+        normalize_text(experience_level, casefold=True),
+        normalize_text(question, casefold=True)
+    )
+
+# Independent parts requested concurrently in fan-out mode
+FANOUT_PARTS = {
+    'scoring': {'sections': ('scoredAssessment',)},
+    'star': {'sections': ('starAnalysis',)},
+    'rewrite': {'sections': ('rewriteSuggestions', 'alternativeFraming')},
+    'questions': {'sections': ('guidingQuestions', 'followUpQuestions')},
+    'culture': {'sections': ('companyCultureAlignment',)},
+    'readiness': {'sections': ('interviewReadyAssessment',)}
+}
+
+EVALUATION_MODES = ('monolithic', 'fanout')
+
+# Ceiling of any evaluation's output budget; see services/token_budget.py
+MAX_EVALUATION_TOKENS = 4000
+
+_part_latency = {}
+_part_latency_lock = threading.Lock()
+
+
+def get_evaluation_mode():
+    """Get the evaluation engine mode: 'monolithic' or 'fanout'."""
+    mode = os.getenv('EVALUATION_MODE', 'monolithic').lower()
+    return mode if mode in EVALUATION_MODES else 'monolithic'
+
+
+def _record_part_latency(part, seconds):
+    metrics.observe('evaluation_part_seconds', seconds, part=part)
+    with _part_latency_lock:
+        stats = _part_latency.setdefault(part, {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+        stats['count'] += 1
+        stats['total'] += seconds
+        stats['max'] = max(stats['max'], seconds)
+        stats['last'] = seconds
+
+
+def get_part_latency_stats():
+    """
+    Get upstream latency per evaluation part for this process.
+
+    Monolithic calls are recorded under ``'monolithic'`` and fan-out calls
+    under their part name, so the two modes can be compared directly.
+    """
+    with _part_latency_lock:
+        return {
+            part: {
+                'count': stats['count'],
+                'mean': stats['total'] / stats['count'],
+                'max': stats['max'],
+                'last': stats['last']
+            }
+            for part, stats in _part_latency.items()
+        }
+
+
+def estimate_evaluation_tokens(target_role, target_company, experience_level, question, answer):
+    """
+    Upper bound on the LLM tokens one evaluation uses: prompt plus output budget.
+
+    In fan-out mode every part resends the prompt, so the prompt counts once
+    per part.
+    """
+    messages = build_evaluation_messages(target_role, target_company, experience_level, question, answer)
+    prompt_tokens = estimate_tokens(''.join(message['content'] for message in messages))
+    if get_evaluation_mode() == 'fanout':
+        return sum(prompt_tokens + _output_budget(part, config['sections']) for part, config in FANOUT_PARTS.items())
+    return prompt_tokens + _output_budget('monolithic')
+
+
+def _output_budget(part, sections=EVALUATION_SECTIONS, scope=None):
+    return token_budget.budget(f'evaluation:{part}', expected_evaluation_tokens(sections, scope),
+                               MAX_EVALUATION_TOKENS)
+
+
+def _build_messages(inputs, sections=EVALUATION_SECTIONS, scope=None):
+    with metrics.timed('prompt_build', 'evaluation'):
+        return build_evaluation_messages(*inputs, sections=sections, scope=scope)
+
+
+def _create_evaluation_completion(messages, max_tokens, stream=False):
+    return record_completion(
+        'evaluation',
+        lambda: get_openai_client().chat.completions.create(
+            model=get_evaluation_model(),
+            messages=messages,
+            temperature=0.7,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            stream=stream
+        ),
+        prompt_tokens=estimate_tokens(''.join(message['content'] for message in messages)),
+        stream=stream
+    )
+
+
+def _complete(part, messages, sections=EVALUATION_SECTIONS, scope=None):
+    """Request an evaluation (or part) within its output budget."""
+    started = time.perf_counter()
+    completion = _create_evaluation_completion(messages, _output_budget(part, sections, scope))
+    _record_part_latency(part, time.perf_counter() - started)
+    _observe_output(part, completion)
+    return completion
+
+
+def _observe_output(part, completion):
+    """Record a response's output size; returns True if it was cut off."""
+    choice = completion.choices[0] if completion.choices else None
+    usage = getattr(completion, 'usage', None)
+    output_tokens = getattr(usage, 'completion_tokens', None)
+    if not output_tokens:
+        output_tokens = estimate_tokens(choice.message.content or '') if choice else 0
+    truncated = getattr(choice, 'finish_reason', None) == 'length'
+    token_budget.observe(f'evaluation:{part}', output_tokens, truncated)
+    return truncated
+
+
+def _completion_text(completion):
+    content = completion.choices[0].message.content
+    if not content:
+        raise ValueError("No response from OpenAI")
+    return content
+
+
+def _valid_sections(text, sections):
+    """
+    Sections of a response that are complete and have the declared shape.
+
+    Malformed or truncated JSON is repaired first; sections cut off by the
+    end of the response do not count as valid.
+    """
+    with metrics.timed('json_parse', 'evaluation'):
+        try:
+            result, partial = llm_json.parse(text, 'evaluation')
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(result, dict):
+            return {}
+        valid = {}
+        for name in sections:
+            if name in result and name not in partial:
+                value = _conformed(name, result[name])
+                if value is not None:
+                    valid[name] = value
+        return valid
+
+
+def _conformed(name, value):
+    """A section converted to its declared shape, or None if it does not have it."""
+    value, errors = llm_json.conform(value, SECTION_SHAPES[name])
+    return None if errors else value
+
+
+def _request_missing(inputs, sections):
+    """
+    Request only ``sections`` again, after they came back missing or malformed.
+
+    Raises:
+        ValueError: If any of them is still missing or malformed
+    """
+    for name in sections:
+        metrics.increment('sections_rerequested_total', section=name)
+    completion = _complete('repair', _build_messages(inputs, sections=sections), sections)
+    valid = _valid_sections(_completion_text(completion), sections)
+    missing = [name for name in sections if name not in valid]
+    if missing:
+        raise ValueError(f"Failed to parse OpenAI response: missing or malformed {', '.join(missing)}")
+    return valid
+
+
+def _complete_sections(inputs, text, sections):
+    """Valid ``sections`` of a response, re-requesting the ones that are not."""
+    valid = _valid_sections(text, sections)
+    missing = tuple(name for name in sections if name not in valid)
+    if missing:
+        valid.update(_request_missing(inputs, missing))
+    return valid
+
+
+def _evaluate_part(part, inputs):
+    """Request one fan-out part and return its sections."""
+    sections = FANOUT_PARTS[part]['sections']
+    completion = _complete(part, _build_messages(inputs, sections=sections), sections)
+    return _complete_sections(inputs, _completion_text(completion), sections)
+
+
+def _iter_fanout(inputs):
+    """Run every fan-out part concurrently, yielding sections as parts finish."""
+    with ThreadPoolExecutor(max_workers=len(FANOUT_PARTS)) as executor:
+        futures = [executor.submit(_evaluate_part, part, inputs) for part in FANOUT_PARTS]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _dimension_slot(name):
+    """Position of a scored dimension in ``SCORED_DIMENSIONS``, matched on its generic name."""
+    name = str(name).casefold()
+    for slot, generic in enumerate(SCORED_DIMENSIONS):
+        if generic.replace('<Target Company> ', '').casefold() in name:
+            return slot
+    return None
+
+
+def _star_dimensions(evaluation):
+    """The section-level dimensions of an evaluation's scored assessment, by STAR section."""
+    assessment = evaluation.get('scoredAssessment')
+    dimensions = assessment.get('dimensions') if isinstance(assessment, dict) else None
+    found = {}
+    for dimension in dimensions if isinstance(dimensions, list) else ():
+        slot = _dimension_slot(dimension.get('dimension', '')) if isinstance(dimension, dict) else None
+        if slot is not None and slot < len(STAR_DIMENSIONS):
+            found[STAR_SECTIONS[slot]] = dimension
+    return found
+
+
+def _revision_plan(inputs, previous_revision_id):
+    """
+    What a revised answer can reuse from its previous revision's evaluation.
+
+    Returns:
+        tuple: ``(previous_evaluation, changed)``, where ``changed`` lists the
+        STAR sections whose words differ, or None when the previous revision
+        is unknown, was for another question or context, or every section
+        changed
+    """
+    if not previous_revision_id:
+        return None
+    record = revision_cache.get(previous_revision_id)
+    if record is None or record.get('partition') != evaluation_partition(*inputs[:4]):
+        return None
+    previous = evaluation_cache.get(previous_revision_id)
+    if previous is None:
+        return None
+
+    digests = section_digests(inputs[4])
+    star = previous.get('starAnalysis') or {}
+    dimensions = _star_dimensions(previous)
+    changed = [name for name in STAR_SECTIONS
+               if digests[name] != record['sections'].get(name) or name not in star or name not in dimensions]
+    if len(changed) == len(STAR_SECTIONS):
+        return None
+    return previous, changed
+
+
+def _plan_revision(inputs, previous_revision_id):
+    """``_revision_plan``, counting revisions evaluated incrementally and in full."""
+    plan = _revision_plan(inputs, previous_revision_id)
+    if previous_revision_id:
+        metrics.increment('revision_evaluations_total', mode='full' if plan is None else 'incremental')
+    return plan
+
+
+def _merge_revision(name, value, previous, changed):
+    """A section of a revised answer: the new parts from the LLM, the rest from the previous evaluation."""
+    if name == 'starAnalysis':
+        if not isinstance(value, dict):
+            return None
+        star = previous['starAnalysis']
+        return {part: value.get(part) if part in changed else star[part] for part in STAR_SECTIONS}
+    if name == 'scoredAssessment':
+        if not isinstance(value, dict) or not isinstance(value.get('dimensions'), list):
+            return None
+        slots = {}
+        for dimension in value['dimensions']:
+            slot = _dimension_slot(dimension.get('dimension', '')) if isinstance(dimension, dict) else None
+            if slot is not None:
+                slots.setdefault(slot, dimension)
+        for part, dimension in _star_dimensions(previous).items():
+            if part not in changed:
+                slots[STAR_SECTIONS.index(part)] = dimension
+        if len(slots) < len(SCORED_DIMENSIONS):
+            return None
+        return {**value, 'dimensions': [slots[slot] for slot in range(len(SCORED_DIMENSIONS))]}
+    return value
+
+
+def _revision_sections(inputs, previous, changed):
+    """
+    Evaluate a revised answer, reusing the feedback on unchanged STAR sections.
+
+    The starAnalysis parts and section-level scores of the STAR sections
+    that did not change are taken from the previous evaluation. The LLM is
+    asked for those of the changed sections and for everything that judges
+    the answer as a whole: the other score dimensions and sections.
+    """
+    metrics.increment('revision_sections_reused_total', len(STAR_SECTIONS) - len(changed))
+    names = dimension_names(inputs[1])
+    scope = {'scoredAssessment': [names[slot] for slot in range(len(SCORED_DIMENSIONS))
+                                  if slot >= len(STAR_DIMENSIONS) or STAR_SECTIONS[slot] in changed]}
+    if changed:
+        scope['starAnalysis'] = changed
+    sections = tuple(name for name in EVALUATION_SECTIONS if name != 'starAnalysis' or changed)
+
+    part = f'revision-{len(changed)}'
+    completion = _complete(part, _build_messages(inputs, sections, scope), sections, scope)
+    with metrics.timed('json_parse', 'evaluation'):
+        try:
+            result, partial = llm_json.parse(_completion_text(completion), 'evaluation')
+        except json.JSONDecodeError:
+            result, partial = {}, set()
+    if not isinstance(result, dict):
+        result = {}
+
+    valid = {}
+    for name in sections:
+        if name not in result or name in partial:
+            continue
+        value = _merge_revision(name, result[name], previous, changed)
+        if value is not None:
+            value = _conformed(name, value)
+        if value is not None:
+            valid[name] = value
+    # Sections that came back incomplete are requested again in full
+    missing = tuple(name for name in sections if name not in valid)
+    if missing:
+        valid.update(_request_missing(inputs, missing))
+    if 'starAnalysis' not in sections:
+        valid['starAnalysis'] = previous['starAnalysis']
+    return _ordered_evaluation(valid)
+
+
+def _ordered_evaluation(sections):
+    """Merge sections into the canonical response order."""
+    return {name: sections[name] for name in EVALUATION_SECTIONS if name in sections}
+
+
+def _local_sections(analysis):
+    """The sections computed from the local answer analysis instead of by the LLM."""
+    return {'lengthTimingFeedback': length_timing_feedback(analysis), 'answerAnalysis': analysis}
+
+
+def _with_answer_analysis(evaluation, analysis):
+    """Merge the local answer analysis into an LLM evaluation."""
+    return {**evaluation, **_local_sections(analysis)}
+
+
+def _similar_evaluation(cache_key, inputs):
+    """
+    The cached evaluation of a near-identical answer, or None.
+
+    The local answer analysis is recomputed for this answer, and the result
+    is cached under this answer's own key as well.
+    """
+    similar_key = evaluation_similar.find(evaluation_partition(*inputs[:4]), inputs[4])
+    if similar_key is None:
+        return None
+    cached = evaluation_cache.get(similar_key)
+    if cached is None:
+        return None
+    evaluation = _with_answer_analysis(cached, analyze_answer(inputs[4]))
+    _cache_evaluation(cache_key, inputs, evaluation)
+    return evaluation
+
+
+def _cache_evaluation(cache_key, inputs, evaluation):
+    """Cache an evaluation, with what later revisions and similar answers need to reuse it."""
+    partition = evaluation_partition(*inputs[:4])
+    evaluation_cache.set(cache_key, evaluation)
+    revision_cache.set(cache_key, {'partition': partition, 'sections': section_digests(inputs[4])})
+    evaluation_similar.add(partition, cache_key, inputs[4])
+
+
+def evaluate_answer(target_role, target_company, experience_level, question, answer, previous_revision_id=None):
     """
     Evaluate a STAR interview answer using OpenAI.
     
@@ -28,179 +458,51 @@ def evaluate_answer(target_role, target_company, experience_level, question, ans
         experience_level: Their experience level
         question: The interview question
         answer: The candidate's STAR-formatted answer
+        previous_revision_id: Revision ID (``evaluation_cache_key``) of the
+            candidate's previous answer to the same question; feedback on
+            the STAR sections it shares with this answer is reused, and the
+            evaluations of near-identical answers are not
     
     Returns:
         dict: Comprehensive evaluation results
     """
-    company_values = get_company_values(target_company)
-    leadership_principles = company_values.get('principles', []) if company_values else []
-    
-    system_prompt = """You are an expert interview coach specializing in behavioral interviews using the STAR method (Situation, Task, Action, Result). Your role is to provide comprehensive, actionable feedback that helps candidates improve their interview performance."""
-    
-    user_prompt = f"""Evaluate the following behavioral interview answer using the STAR method.
-
-**Context:**
-- Target Role: {target_role}
-- Target Company: {target_company}
-- Experience Level: {experience_level}
-- Interview Question: {question}
-
-**Company Leadership Principles ({target_company}):**
-{chr(10).join([f"{i+1}. {principle}" for i, principle in enumerate(leadership_principles)])}
-
-**Candidate's Answer:**
-{answer}
-
-**Evaluation Requirements:**
-
-Provide a comprehensive evaluation in the following JSON format:
-
-{{
-  "scoredAssessment": {{
-    "dimensions": [
-      {{
-        "dimension": "Situation Clarity",
-        "score": 1-5,
-        "justification": "Detailed explanation"
-      }},
-      {{
-        "dimension": "Task Definition",
-        "score": 1-5,
-        "justification": "Detailed explanation"
-      }},
-      {{
-        "dimension": "Actions Taken",
-        "score": 1-5,
-        "justification": "Detailed explanation"
-      }},
-      {{
-        "dimension": "Results & Impact",
-        "score": 1-5,
-        "justification": "Detailed explanation"
-      }},
-      {{
-        "dimension": "{target_company} Leadership Principles",
-        "score": 1-5,
-        "justification": "Detailed explanation showing which principles are demonstrated"
-      }},
-      {{
-        "dimension": "Technical Depth (Role-Relevant)",
-        "score": 1-5,
-        "justification": "Detailed explanation"
-      }},
-      {{
-        "dimension": "Communication & Structure",
-        "score": 1-5,
-        "justification": "Detailed explanation"
-      }}
-    ]
-  }},
-  "starAnalysis": {{
-    "situation": {{
-      "strengths": ["strength 1", "strength 2"],
-      "opportunities": ["opportunity 1", "opportunity 2"]
-    }},
-    "task": {{
-      "strengths": ["strength 1", "strength 2"],
-      "opportunities": ["opportunity 1", "opportunity 2"]
-    }},
-    "action": {{
-      "strengths": ["strength 1", "strength 2"],
-      "opportunities": ["opportunity 1", "opportunity 2"]
-    }},
-    "result": {{
-      "strengths": ["strength 1", "strength 2"],
-      "opportunities": ["opportunity 1", "opportunity 2"]
-    }}
-  }},
-  "rewriteSuggestions": [
-    "Suggestion 1",
-    "Suggestion 2",
-    "Suggestion 3",
-    "Suggestion 4"
-  ],
-  "guidingQuestions": [
-    "Question 1",
-    "Question 2",
-    "Question 3",
-    "Question 4"
-  ],
-  "companyCultureAlignment": {{
-    "principles": [
-      {{
-        "principle": "Principle Name",
-        "alignment": "How it aligns with the story"
-      }}
-    ],
-    "additionalAlignment": "Additional suggestions for better alignment"
-  }},
-  "followUpQuestions": [
-    "Question 1",
-    "Question 2",
-    "Question 3",
-    "Question 4",
-    "Question 5"
-  ],
-  "alternativeFraming": [
-    "Suggestion 1",
-    "Suggestion 2",
-    "Suggestion 3"
-  ],
-  "lengthTimingFeedback": {{
-    "currentLength": "Estimated speaking time",
-    "recommendations": [
-      "Recommendation 1",
-      "Recommendation 2",
-      "Recommendation 3"
-    ]
-  }},
-  "interviewReadyAssessment": {{
-    "overall": "Overall assessment text",
-    "topPriorities": [
-      "Priority 1",
-      "Priority 2",
-      "Priority 3"
-    ],
-    "conclusion": "Concluding statement"
-  }}
-}}
-
-**Scoring Guidelines:**
-- 5: Exceptional - Exceeds expectations, highly impressive
-- 4: Strong - Meets expectations well, minor improvements possible
-- 3: Adequate - Meets basic expectations, needs improvement
-- 2: Weak - Below expectations, significant gaps
-- 1: Poor - Major issues, needs substantial work
-
-**Focus Areas:**
-1. Ensure feedback is specific, actionable, and constructive
-2. Highlight alignment with {target_company}'s leadership principles
-3. Provide role-specific technical depth feedback for {target_role}
-4. Consider the {experience_level} experience level expectations
-5. Balance praise for strengths with clear improvement opportunities
-
-Return ONLY valid JSON, no additional text or markdown formatting."""
+    cache_key = evaluation_cache_key(target_role, target_company, experience_level, question, answer)
+    cached = evaluation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    inputs = (target_role, target_company, experience_level, question, answer)
+    # A revision is close to its previous answer by design, and its changes
+    # are the part that needs feedback
+    similar = None if previous_revision_id else _similar_evaluation(cache_key, inputs)
+    if similar is not None:
+        return similar
+    return evaluation_flight.do(cache_key, lambda: _evaluate_uncached(cache_key, inputs, previous_revision_id))
+
+
+def _evaluate_uncached(cache_key, inputs, previous_revision_id=None):
+    # Another worker may have finished the same evaluation just before this
+    # one took the lease
+    cached = evaluation_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     try:
-        model = os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview')
-        openai_client = get_openai_client()
-        
-        completion = openai_client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=4000,
-            response_format={"type": "json_object"}
-        )
-        
-        content = completion.choices[0].message.content
-        if not content:
-            raise ValueError("No response from OpenAI")
-        
-        evaluation = json.loads(content)
+        plan = _plan_revision(inputs, previous_revision_id)
+        if plan is not None:
+            evaluation = _revision_sections(inputs, *plan)
+        elif get_evaluation_mode() == 'fanout':
+            sections = {}
+            for part_sections in _iter_fanout(inputs):
+                sections.update(part_sections)
+            evaluation = _ordered_evaluation(sections)
+        else:
+            completion = _complete('monolithic', _build_messages(inputs))
+            evaluation = _ordered_evaluation(_complete_sections(inputs, _completion_text(completion),
+                                                                EVALUATION_SECTIONS))
+
+        evaluation = _with_answer_analysis(evaluation, analyze_answer(inputs[4]))
+        _cache_evaluation(cache_key, inputs, evaluation)
         return evaluation
         
     except json.JSONDecodeError as e:
@@ -208,3 +510,106 @@ Return ONLY valid JSON, no additional text or markdown formatting."""
     except Exception as e:
         raise Exception(f"OpenAI API error: {str(e)}")
 
+
+def stream_evaluation(target_role, target_company, experience_level, question, answer, previous_revision_id=None):
+    """
+    Evaluate a STAR interview answer, yielding each section as it completes.
+
+    Takes the same arguments as ``evaluate_answer``. Yields
+    ``(section_name, value)`` tuples for the top-level keys of the
+    evaluation as soon as the model has finished writing each one. The local
+    ``lengthTimingFeedback`` and ``answerAnalysis`` come first, before the
+    LLM has answered. Cached
+    evaluations, and those of near-identical answers unless this is a
+    revision, are replayed immediately. Revised answers are evaluated incrementally, and their
+    sections sent when the whole response has arrived.
+    """
+    cache_key = evaluation_cache_key(target_role, target_company, experience_level, question, answer)
+    cached = evaluation_cache.get(cache_key)
+    if cached is not None:
+        yield from cached.items()
+        return
+
+    inputs = (target_role, target_company, experience_level, question, answer)
+    # A revision is close to its previous answer by design, and its changes
+    # are the part that needs feedback
+    similar = None if previous_revision_id else _similar_evaluation(cache_key, inputs)
+    if similar is not None:
+        yield from similar.items()
+        return
+
+    analysis = analyze_answer(answer)
+    yield from _local_sections(analysis).items()
+
+    plan = _plan_revision(inputs, previous_revision_id)
+    if plan is not None:
+        try:
+            sections = _revision_sections(inputs, *plan)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Failed to parse OpenAI response: {str(e)}")
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+        for name, value in sections.items():
+            yield name, value
+        _cache_evaluation(cache_key, inputs, _with_answer_analysis(sections, analysis))
+        return
+
+    if get_evaluation_mode() == 'fanout':
+        sections = {}
+        try:
+            for part_sections in _iter_fanout(inputs):
+                sections.update(part_sections)
+                for name, value in part_sections.items():
+                    yield name, value
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Failed to parse OpenAI response: {str(e)}")
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+        _cache_evaluation(cache_key, inputs, _with_answer_analysis(_ordered_evaluation(sections), analysis))
+        return
+
+    parser = SectionStreamParser()
+    emitted = set()
+    finish_reason = None
+
+    try:
+        started = time.perf_counter()
+        for chunk in _create_evaluation_completion(_build_messages(inputs), _output_budget('monolithic'), stream=True):
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            text = chunk.choices[0].delta.content
+            if not text:
+                continue
+            for name, value in parser.feed(text):
+                # A malformed section is left for the checks below, since
+                # the client keeps the first version it is sent
+                value = _conformed(name, value) if name in SECTION_SHAPES else None
+                if value is not None:
+                    emitted.add(name)
+                    yield name, value
+        _record_part_latency('monolithic', time.perf_counter() - started)
+        token_budget.observe('evaluation:monolithic', estimate_tokens(parser.text), finish_reason == 'length')
+
+        if not parser.text:
+            raise ValueError("No response from OpenAI")
+
+        # Parse the full document once more so nothing the incremental parser
+        # skipped is lost, and so only complete, valid evaluations are cached.
+        # Sections that are missing or malformed are requested again on their
+        # own and sent when they arrive.
+        sections = _valid_sections(parser.text, EVALUATION_SECTIONS)
+        for name, value in sections.items():
+            if name not in emitted:
+                yield name, value
+        missing = tuple(name for name in EVALUATION_SECTIONS if name not in sections)
+        if missing:
+            for name, value in _request_missing(inputs, missing).items():
+                sections[name] = value
+                yield name, value
+        _cache_evaluation(cache_key, inputs, _with_answer_analysis(_ordered_evaluation(sections), analysis))
+
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Failed to parse OpenAI response: {str(e)}")
+    except Exception as e:
+        raise Exception(f"OpenAI API error: {str(e)}")
@@ -1,23 +1,74 @@
 import os
 import json
-from openai import OpenAI
 from dotenv import load_dotenv
 from pathlib import Path
-from data.static_data import get_company_values
+from services.openai_client import get_openai_client
+from services.metrics import metrics, record_completion
+from services.prompt_templates import (
+    GENERATE_OUTPUT_TOKENS,
+    GENERATE_TEMPLATE_VERSION,
+    build_generate_messages,
+    estimate_tokens
+)
+from services.token_budget import token_budget
+from services.result_cache import make_cache_key, normalize_text
+from services.single_flight import SingleFlight
+from services.answer_pool import AnswerPool
+from data.static_data import is_listed_combination
 
 # Load environment variables
 app_dir = Path(__file__).parent.parent.absolute()
 env_path = app_dir / '.env'
 load_dotenv(dotenv_path=env_path)
 
-def get_openai_client():
-    """Get OpenAI client with API key from environment."""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-    return OpenAI(api_key=api_key)
+# Ceiling of a generated answer's output budget; see services/token_budget.py
+MAX_GENERATION_TOKENS = 1500
 
-def generate_star_answer(target_role, target_company, experience_level, question, context=''):
+# Fixed sampling seed for deterministic generation
+DETERMINISTIC_SEED = 0
+
+# Identical deterministic generations in flight at the same time share one upstream call
+generation_flight = SingleFlight('generate')
+
+def get_generation_model():
+    """Get the model used for answer generation."""
+    return os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview')
+
+
+def _build_messages(*args):
+    with metrics.timed('prompt_build', 'generate'):
+        return build_generate_messages(*args)
+
+
+def _prompt_tokens(messages):
+    return estimate_tokens(''.join(message['content'] for message in messages))
+
+
+def _output_budget():
+    return token_budget.budget('generate', GENERATE_OUTPUT_TOKENS, MAX_GENERATION_TOKENS)
+
+
+def estimate_generation_tokens(target_role, target_company, experience_level, question, context=''):
+    """Upper bound on the LLM tokens one generation uses: prompt plus output budget."""
+    messages = build_generate_messages(target_role, target_company, experience_level, question, context)
+    return _prompt_tokens(messages) + _output_budget()
+
+
+def generation_flight_key(target_role, target_company, experience_level, question, context=''):
+    """Fingerprint of a deterministic generation request."""
+    return make_cache_key(
+        GENERATE_TEMPLATE_VERSION,
+        get_generation_model(),
+        normalize_text(target_role, casefold=True),
+        normalize_text(target_company, casefold=True),
+        normalize_text(experience_level, casefold=True),
+        normalize_text(question, casefold=True),
+        normalize_text(context)
+    )
+
+
+def generate_star_answer(target_role, target_company, experience_level, question, context='',
+                         deterministic=False):
     """
     Generate a STAR interview answer using OpenAI.
     
@@ -27,78 +78,115 @@ def generate_star_answer(target_role, target_company, experience_level, question
         experience_level: Their experience level
         question: The interview question
         context: Optional context about the candidate's experience
+        deterministic: Sample at temperature 0 with a fixed seed, so the
+            same inputs give the same answer. Identical deterministic
+            requests in flight at the same time share one upstream call.
     
     Returns:
         str: Generated STAR-formatted answer
     """
-    company_values = get_company_values(target_company)
-    leadership_principles = company_values.get('principles', []) if company_values else []
-    
-    system_prompt = """You are an expert interview coach helping candidates prepare for behavioral interviews. Your role is to generate realistic, compelling STAR (Situation, Task, Action, Result) formatted answers that demonstrate strong leadership, problem-solving, and impact. Generate answers that are specific, measurable, and aligned with the company's values."""
-    
-    context_section = f"""
-**Candidate Context:**
-{context if context else 'No specific context provided. Generate a realistic example appropriate for the experience level.'}
-""" if context else "\n**Note:** Generate a realistic example appropriate for the experience level.\n"
-    
-    user_prompt = f"""Generate a compelling STAR-formatted answer for the following behavioral interview question.
-
-**Context:**
-- Target Role: {target_role}
-- Target Company: {target_company}
-- Experience Level: {experience_level}
-- Interview Question: {question}
-{context_section}
-**Company Leadership Principles ({target_company}):**
-{chr(10).join([f"- {principle}" for principle in leadership_principles])}
-
-**Requirements:**
-1. Generate a realistic, specific example that demonstrates:
-   - Strong problem-solving skills
-   - Leadership and ownership
-   - Impact and measurable results
-   - Alignment with {target_company}'s leadership principles
-
-2. Format the answer using the STAR method:
-   - **Situation:** Set the context (project, team, challenge)
-   - **Task:** Describe your responsibility and what needed to be accomplished
-   - **Action:** Detail the specific actions you took (use "I" statements)
-   - **Result:** Quantify the impact and outcomes
-
-3. Make it appropriate for {experience_level} level:
-   - Include relevant technical details for {target_role}
-   - Show appropriate scope and impact for the experience level
-   - Demonstrate growth and learning
-
-4. Ensure the answer:
-   - Is 300-500 words
-   - Includes specific metrics and numbers where possible
-   - Shows 2-3 of {target_company}'s leadership principles
-   - Is realistic and believable
-   - Demonstrates both technical and soft skills
-
-Generate ONLY the STAR answer, formatted clearly with Situation, Task, Action, and Result sections. Do not include any additional commentary or explanation."""
+    inputs = (target_role, target_company, experience_level, question, context)
+    if deterministic:
+        return generation_flight.do(generation_flight_key(*inputs), lambda: _generate(inputs, deterministic=True))
+
+    # Answers without personal context can come from the pre-generated pool
+    if not context:
+        pooled = answer_pool.take(*inputs[:4])
+        if pooled is not None:
+            return pooled
+    answer = _generate(inputs)
+    if not context:
+        answer_pool.add(*inputs[:4], answer)
+    return answer
+
+
+def _generate(inputs, deterministic=False):
+    messages = _build_messages(*inputs)
+    sampling = {'temperature': 0, 'seed': DETERMINISTIC_SEED} if deterministic else {'temperature': 0.8}
 
     try:
-        model = os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview')
         openai_client = get_openai_client()
         
-        completion = openai_client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.8,
-            max_tokens=1500
+        completion = record_completion(
+            'generate',
+            lambda: openai_client.chat.completions.create(
+                model=get_generation_model(),
+                messages=messages,
+                max_tokens=_output_budget(),
+                **sampling
+            ),
+            prompt_tokens=_prompt_tokens(messages)
         )
         
         content = completion.choices[0].message.content
         if not content:
             raise ValueError("No response from OpenAI")
-        
+
+        usage = getattr(completion, 'usage', None)
+        token_budget.observe('generate', getattr(usage, 'completion_tokens', None) or estimate_tokens(content),
+                             completion.choices[0].finish_reason == 'length')
         return content.strip()
         
     except Exception as e:
         raise Exception(f"OpenAI API error: {str(e)}")
 
+
+# Pre-generated answers for popular combinations, warmed in the background
+answer_pool = AnswerPool(
+    f'{GENERATE_TEMPLATE_VERSION}:{get_generation_model()}',
+    lambda *combo: _generate(combo + ('',)),
+    is_listed_combination
+)
+
+
+def stream_star_answer(target_role, target_company, experience_level, question, context=''):
+    """
+    Generate a STAR interview answer, yielding text chunks as they arrive.
+
+    Takes the same arguments as ``generate_star_answer``. The first chunk is
+    yielded as soon as the model emits its first token. An answer from the
+    pre-generated pool is yielded as a single chunk.
+    """
+    if not context:
+        pooled = answer_pool.take(target_role, target_company, experience_level, question)
+        if pooled is not None:
+            yield pooled
+            return
+
+    messages = _build_messages(target_role, target_company, experience_level, question, context)
+
+    try:
+        openai_client = get_openai_client()
+
+        stream = record_completion(
+            'generate',
+            lambda: openai_client.chat.completions.create(
+                model=get_generation_model(),
+                messages=messages,
+                temperature=0.8,
+                max_tokens=_output_budget(),
+                stream=True
+            ),
+            prompt_tokens=_prompt_tokens(messages),
+            stream=True
+        )
+
+        parts = []
+        finish_reason = None
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            text = chunk.choices[0].delta.content
+            if text:
+                parts.append(text)
+                yield text
+
+        if not parts:
+            raise ValueError("No response from OpenAI")
+        token_budget.observe('generate', estimate_tokens(''.join(parts)), finish_reason == 'length')
+        if not context:
+            answer_pool.add(target_role, target_company, experience_level, question, ''.join(parts).strip())
+
+    except Exception as e:
+        raise Exception(f"OpenAI API error: {str(e)}")
@@ -0,0 +1,373 @@
+"""
+SQLite-backed background job queue.
+
+Submitting a job only inserts a row, so the HTTP request returns at once.
+A bounded pool of worker threads in each process claims queued jobs from
+the shared database, runs the registered handler and stores the result for
+clients to poll. Because the queue lives in SQLite, a job submitted to one
+gunicorn worker can be picked up by any other.
+
+Jobs can be submitted together as a batch, which is stored with the job of
+each of its items so clients can follow it from any worker. At most the
+batch's ``concurrency`` of its jobs run at once, across all workers.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+
+from services.blocking import offload
+from services.openai_client import max_call_seconds
+from services.result_cache import connect_sqlite
+
+app_dir = Path(__file__).parent.parent.absolute()
+DEFAULT_QUEUE_PATH = app_dir / 'instance' / 'jobs.sqlite3'
+
+# Upstream calls a job makes one after the other: the evaluation, then a
+# request for any sections that came back missing or malformed
+UPSTREAM_CALLS_PER_JOB = 2
+JOB_TIMEOUT_MARGIN = 30.0
+
+
+def default_job_timeout():
+    """Seconds a healthy job can run, so only lost jobs are requeued."""
+    return UPSTREAM_CALLS_PER_JOB * max_call_seconds() + JOB_TIMEOUT_MARGIN
+
+
+_JOB_COLUMNS = 'id, kind, status, result, error, created_at, started_at, finished_at'
+
+
+def _job_from_row(row):
+    job = {
+        'id': row[0],
+        'kind': row[1],
+        'status': row[2],
+        'createdAt': row[5],
+        'startedAt': row[6],
+        'finishedAt': row[7]
+    }
+    if row[2] == 'done':
+        job['result'] = json.loads(row[3])
+    elif row[2] == 'failed':
+        job['error'] = row[4]
+    return job
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds the maximum number of pending jobs."""
+
+
+class JobQueue:
+    """Persistent job queue with a per-process pool of worker threads."""
+
+    def __init__(self, path=None, workers=None, max_pending=None, job_timeout=None,
+                 retention=None, poll_interval=0.5):
+        self.path = path or os.getenv('JOB_QUEUE_PATH', str(DEFAULT_QUEUE_PATH))
+        self.workers = workers if workers is not None else int(os.getenv('JOB_WORKERS', 4))
+        self.max_pending = max_pending if max_pending is not None else int(os.getenv('JOB_MAX_PENDING', 1000))
+        self.job_timeout = (job_timeout if job_timeout is not None
+                            else float(os.getenv('JOB_TIMEOUT') or default_job_timeout()))
+        self.retention = retention if retention is not None else float(os.getenv('JOB_RETENTION', 24 * 3600))
+        self.poll_interval = poll_interval
+
+        self._handlers = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started_pid = None
+        self._schema_ready_pid = None
+        self._last_maintenance = 0.0
+
+    def register(self, kind, handler):
+        """Register ``handler(payload) -> result`` for jobs of ``kind``."""
+        self._handlers[kind] = handler
+
+    # -- storage ---------------------------------------------------------
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+            self._local.pid = pid
+        if self._schema_ready_pid != pid:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, '
+                'payload TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, '
+                'created_at REAL NOT NULL, started_at REAL, finished_at REAL)'
+            )
+            try:
+                # Queues created before batches lack the column
+                conn.execute('ALTER TABLE jobs ADD COLUMN batch_id TEXT')
+            except sqlite3.OperationalError:
+                pass
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_batch_status ON jobs (batch_id, status)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS batches ('
+                'id TEXT PRIMARY KEY, concurrency INTEGER NOT NULL, items TEXT NOT NULL, '
+                'created_at REAL NOT NULL)'
+            )
+            self._schema_ready_pid = pid
+        return conn
+
+    def submit(self, kind, payload):
+        """
+        Queue a job and return its ID.
+
+        Raises:
+            ValueError: If no handler is registered for ``kind``
+            QueueFullError: If too many jobs are already pending
+        """
+        return self.submit_many(kind, [payload])[0]
+
+    def submit_many(self, kind, payloads):
+        """
+        Queue several jobs at once and return their IDs, in order.
+
+        Either every job is queued or, if they do not all fit, none is.
+
+        Raises:
+            ValueError: If no handler is registered for ``kind``
+            QueueFullError: If the jobs would exceed the pending limit
+        """
+        if kind not in self._handlers:
+            raise ValueError(f'Unknown job type: {kind}')
+
+        job_ids = offload(self._insert, kind, payloads)
+        self.ensure_workers()
+        self._wakeup.set()
+        return job_ids
+
+    def submit_batch(self, kind, payloads, items, concurrency):
+        """
+        Queue the jobs of a batch at once and return the batch ID.
+
+        ``items`` lists every item of the batch, in order, as the index of
+        its payload in ``payloads`` (items may share one) or as an error
+        message for an item that is not queued. At most ``concurrency`` of
+        the batch's jobs run at the same time.
+
+        Raises:
+            ValueError: If no handler is registered for ``kind``
+            QueueFullError: If the jobs would exceed the pending limit
+        """
+        if kind not in self._handlers:
+            raise ValueError(f'Unknown job type: {kind}')
+
+        batch_id = uuid.uuid4().hex
+        offload(self._insert, kind, payloads, (batch_id, items, concurrency))
+        self.ensure_workers()
+        self._wakeup.set()
+        return batch_id
+
+    def _insert(self, kind, payloads, batch=None):
+        batch_id = batch[0] if batch is not None else None
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if pending + len(payloads) > self.max_pending:
+                raise QueueFullError('Too many pending jobs, please retry later')
+
+            now = time.time()
+            job_ids = [uuid.uuid4().hex for _ in payloads]
+            conn.executemany(
+                'INSERT INTO jobs (id, kind, status, payload, batch_id, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                [(job_id, kind, 'queued', json.dumps(payload), batch_id, now)
+                 for job_id, payload in zip(job_ids, payloads)]
+            )
+            if batch is not None:
+                _, items, concurrency = batch
+                items = [{'error': item} if isinstance(item, str) else {'jobId': job_ids[item]} for item in items]
+                conn.execute(
+                    'INSERT INTO batches (id, concurrency, items, created_at) VALUES (?, ?, ?, ?)',
+                    (batch_id, concurrency, json.dumps(items), now)
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return job_ids
+
+    def get(self, job_id):
+        """Return the job as a dict, or ``None`` if it does not exist."""
+        return offload(self._get, job_id)
+
+    def get_many(self, job_ids):
+        """
+        Return the jobs that still exist as a dict keyed by ID.
+
+        Unlike ``get``, queued jobs do not include their ``position``.
+        """
+        return offload(self._get_many, list(job_ids))
+
+    def get_batch(self, batch_id):
+        """
+        Return the batch as a dict, or ``None`` if it does not exist.
+
+        Its ``items`` hold ``{"jobId": ...}`` for every queued item and
+        ``{"error": ...}`` for the others; look the jobs up with ``get_many``.
+        """
+        return offload(self._get_batch, batch_id)
+
+    def _get_batch(self, batch_id):
+        row = self._connection().execute(
+            'SELECT id, concurrency, items, created_at FROM batches WHERE id = ?',
+            (batch_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'concurrency': row[1],
+            'items': json.loads(row[2]),
+            'createdAt': row[3]
+        }
+
+    def _get(self, job_id):
+        row = self._connection().execute(
+            f'SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = _job_from_row(row)
+        if row[2] == 'queued':
+            job['position'] = self._connection().execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?",
+                (row[5],)
+            ).fetchone()[0]
+        return job
+
+    def _get_many(self, job_ids):
+        jobs = {}
+        conn = self._connection()
+        # Stay well below SQLite's limit on bound parameters
+        for start in range(0, len(job_ids), 500):
+            chunk = job_ids[start:start + 500]
+            rows = conn.execute(
+                f'SELECT {_JOB_COLUMNS} FROM jobs WHERE id IN ({",".join("?" * len(chunk))})',
+                chunk
+            ).fetchall()
+            jobs.update((row[0], _job_from_row(row)) for row in rows)
+        return jobs
+
+    def _claim(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Skip the jobs of batches already running their concurrency
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs WHERE status = 'queued' "
+                'AND (batch_id IS NULL OR ('
+                "SELECT COUNT(*) FROM jobs running WHERE running.batch_id = jobs.batch_id AND running.status = 'running'"
+                ') < (SELECT concurrency FROM batches WHERE batches.id = jobs.batch_id)) '
+                'ORDER BY created_at LIMIT 1'
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 "
+                    'WHERE id = ?',
+                    (time.time(), row[0])
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def _finish(self, job_id, result=None, error=None):
+        status = 'failed' if error is not None else 'done'
+        self._connection().execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?',
+            (status, json.dumps(result) if error is None else None, error, time.time(), job_id)
+        )
+
+    def _maintain(self):
+        """Requeue jobs orphaned by a dead worker and drop old finished jobs."""
+        now = time.time()
+        if now - self._last_maintenance < self.job_timeout / 10:
+            return
+        self._last_maintenance = now
+
+        conn = self._connection()
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Job timed out', finished_at = ? "
+            "WHERE status = 'running' AND started_at < ? AND attempts >= 2",
+            (now, now - self.job_timeout)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', started_at = NULL "
+            "WHERE status = 'running' AND started_at < ?",
+            (now - self.job_timeout,)
+        )
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (now - self.retention,)
+        )
+        conn.execute(
+            'DELETE FROM batches WHERE created_at < ? '
+            'AND id NOT IN (SELECT batch_id FROM jobs WHERE batch_id IS NOT NULL)',
+            (now - self.retention,)
+        )
+
+    # -- workers ---------------------------------------------------------
+
+    def ensure_workers(self):
+        """Start this process's worker threads if they are not running yet."""
+        pid = os.getpid()
+        if self._started_pid == pid:
+            return
+        with self._lock:
+            if self._started_pid == pid:
+                return
+            self._wakeup = threading.Event()
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f'job-worker-{index}',
+                    daemon=True
+                )
+                thread.start()
+            self._started_pid = pid
+
+    def _worker_loop(self):
+        while True:
+            try:
+                offload(self._maintain)
+                job = offload(self._claim)
+            except sqlite3.Error as e:
+                print(f'Job queue error: {str(e)}')
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            job_id, kind, payload, _ = job
+            try:
+                result = self._handlers[kind](json.loads(payload))
+            except Exception as e:
+                print(f'Job {job_id} failed: {str(e)}')
+                result, error = None, str(e)
+            else:
+                error = None
+
+            try:
+                offload(self._finish, job_id, result=result, error=error)
+            except sqlite3.Error as e:
+                # The job stays 'running' and is requeued after the timeout
+                print(f'Job queue error: {str(e)}')
+
+
+job_queue = JobQueue()
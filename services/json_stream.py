@@ -0,0 +1,96 @@
+"""
+Incremental parser for a streamed top-level JSON object.
+
+The model streams a single JSON object token by token. ``SectionStreamParser``
+is fed those chunks and returns each top-level ``"key": value`` member as
+soon as its value is complete, without waiting for the closing brace of the
+whole document.
+"""
+import json
+
+
+class SectionStreamParser:
+    """Emit completed top-level members of a JSON object from text chunks."""
+
+    def __init__(self):
+        self._text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+        self._member_emitted = False
+        self.finished = False
+
+    @property
+    def text(self):
+        """All text fed so far."""
+        return self._text
+
+    def feed(self, chunk):
+        """
+        Feed a chunk of streamed text.
+
+        Returns:
+            list: ``(key, value)`` tuples for members completed by this chunk
+        """
+        self._text += chunk
+        text = self._text
+        completed = []
+
+        while self._pos < len(text):
+            char = text[self._pos]
+            index = self._pos
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self.finished:
+                continue
+
+            if char == '"':
+                if self._depth >= 1:
+                    self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+                if self._depth == 1:
+                    if char != '{':
+                        raise ValueError('Expected a JSON object')
+                    self._start_member(index + 1)
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 1:
+                    # A nested object/array value just closed
+                    self._emit(text, index + 1, completed)
+                elif self._depth == 0:
+                    self._emit(text, index, completed)
+                    self.finished = True
+            elif char == ',' and self._depth == 1:
+                self._emit(text, index, completed)
+                self._start_member(index + 1)
+
+        return completed
+
+    def _start_member(self, index):
+        self._member_start = index
+        self._member_emitted = False
+
+    def _emit(self, text, end, completed):
+        if self._member_emitted or self._member_start is None:
+            return
+        member = text[self._member_start:end].strip()
+        self._member_emitted = True
+        if not member:
+            return
+        try:
+            parsed = json.loads('{' + member + '}')
+        except json.JSONDecodeError:
+            return
+        completed.extend(parsed.items())
@@ -0,0 +1,235 @@
+"""
+Tolerant parsing and validation of JSON written by the LLM.
+
+The model is asked for a JSON object, but now and then it wraps the object
+in a markdown code fence, leaves a trailing comma, or is cut off at its
+token budget in the middle of a string. Failing the whole request for that
+makes the user resubmit and pay for the evaluation twice. Instead:
+
+1. ``parse`` tries a strict parse first, with orjson when it is installed.
+2. If that fails, ``repair`` strips code fences and any text around the
+   object, drops trailing commas, closes an unterminated string and closes
+   the open arrays and objects. Top-level members that were still being
+   written when the text ended are reported as partial, since their values
+   may be cut short.
+3. ``conform`` checks a value against a declared shape, converting
+   numbers written as strings, so the caller can re-request only the
+   sections that are missing, malformed or partial.
+
+Every parse is counted in ``llm_json_total`` by outcome (``parsed``,
+``repaired`` or ``failed``), which gives the repair rate.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library parser
+    orjson = None
+
+from services.metrics import metrics
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def loads(text):
+    """Strict JSON parse, with orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError as e:
+            raise json.JSONDecodeError(str(e), text, 0)
+    return json.loads(text)
+
+
+def _strip_fence(text):
+    """The text from the first ``{``, without a closing markdown fence."""
+    start = text.find('{')
+    if start < 0:
+        return ''
+    text = text[start:].rstrip()
+    if text.endswith('```'):
+        text = text[:-3].rstrip()
+    return text
+
+
+def _strip_trailing(out, chars):
+    while out and out[-1] in chars:
+        out.pop()
+
+
+def repair(text):
+    """
+    Repair a malformed or truncated JSON object.
+
+    Returns:
+        tuple: ``(repaired_text, partial)``, where ``partial`` is the set of
+        top-level keys whose values were cut off by the end of the text
+    """
+    out = []
+    stack = []
+    in_string = escape = False
+    # Per open object: True while a key is expected rather than a value
+    expect_key = []
+    last_string_start = 0
+    top_key = None
+    member_open = False
+    partial = set()
+
+    text = _strip_fence(text)
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char in '{[':
+            stack.append(char)
+            expect_key.append(char == '{')
+            out.append(char)
+        elif char in '}]':
+            if not stack or _CLOSERS[stack[-1]] != char:
+                continue
+            _strip_trailing(out, ' \t\r\n,')
+            stack.pop()
+            expect_key.pop()
+            out.append(char)
+            if not stack:
+                break
+        elif char == '"':
+            in_string = True
+            last_string_start = len(out)
+            out.append(char)
+        elif char == ':':
+            out.append(char)
+            if stack and stack[-1] == '{':
+                expect_key[-1] = False
+            if len(stack) == 1:
+                try:
+                    top_key = loads(''.join(out[last_string_start:-1]))
+                except ValueError:
+                    top_key = None
+                member_open = True
+        elif char == ',':
+            out.append(char)
+            if stack and stack[-1] == '{':
+                expect_key[-1] = True
+            if len(stack) == 1:
+                member_open = False
+        else:
+            out.append(char)
+
+    if stack:
+        if member_open and top_key is not None:
+            partial.add(top_key)
+        if in_string:
+            if escape:
+                out.pop()
+            out.append('"')
+            # An object key cut off before its colon gets a null value
+            if stack[-1] == '{' and expect_key[-1]:
+                out.append(':null')
+        else:
+            # Drop a literal cut short ("tru", "12.") and dangling separators
+            while out and out[-1] not in '"{}[],:' and not out[-1].isspace():
+                out.pop()
+            _strip_trailing(out, ' \t\r\n,')
+            if out and out[-1] == ':':
+                out.append('null')
+            elif out and out[-1] == '"' and stack[-1] == '{' and expect_key[-1]:
+                out.append(':null')
+        for opener in reversed(stack):
+            _strip_trailing(out, ' \t\r\n,')
+            out.append(_CLOSERS[opener])
+    return ''.join(out), partial
+
+
+def parse(text, kind):
+    """
+    Parse LLM output, repairing it if a strict parse fails.
+
+    Returns:
+        tuple: ``(value, partial)`` as described in ``repair``; ``partial``
+        is empty when the text parsed as is
+
+    Raises:
+        json.JSONDecodeError: If the text cannot be repaired
+    """
+    try:
+        value = loads(text)
+    except ValueError:
+        pass
+    else:
+        metrics.increment('llm_json_total', kind=kind, result='parsed')
+        return value, set()
+
+    repaired, partial = repair(text)
+    try:
+        value = loads(repaired)
+    except ValueError:
+        metrics.increment('llm_json_total', kind=kind, result='failed')
+        raise json.JSONDecodeError('Could not repair JSON response', text, 0)
+    metrics.increment('llm_json_total', kind=kind, result='repaired')
+    return value, partial
+
+
+def _number(text):
+    """``text`` as an int or float if it is a plain number, else None."""
+    try:
+        number = float(text.strip())
+    except ValueError:
+        return None
+    if number != number or number in (float('inf'), float('-inf')):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def conform(value, shape, path='$'):
+    """
+    Check ``value`` against a shape, converting what can be converted.
+
+    A shape is a dict of required keys and their shapes, a one-item list
+    describing every item of an array, or a type (or tuple of types) the
+    value must have. Extra keys are allowed and arrays may be empty (no
+    principles for an unknown company). A number written as a string
+    (``"4"``) is converted where a number is expected, and a number where
+    a string is expected.
+
+    Returns:
+        tuple: ``(value, errors)``, the converted value and the problems
+        found as ``"<path>: <problem>"``, empty if the value matches
+    """
+    if isinstance(shape, dict):
+        if not isinstance(value, dict):
+            return value, [f'{path}: expected an object']
+        value, errors = dict(value), []
+        for key, key_shape in shape.items():
+            if key not in value:
+                errors.append(f'{path}.{key}: missing')
+            else:
+                value[key], key_errors = conform(value[key], key_shape, f'{path}.{key}')
+                errors.extend(key_errors)
+        return value, errors
+    if isinstance(shape, list):
+        if not isinstance(value, list):
+            return value, [f'{path}: expected an array']
+        items, errors = [], []
+        for index, item in enumerate(value):
+            item, item_errors = conform(item, shape[0], f'{path}[{index}]')
+            items.append(item)
+            errors.extend(item_errors)
+        return items, errors
+    types = shape if isinstance(shape, tuple) else (shape,)
+    if isinstance(value, bool):
+        pass
+    elif isinstance(value, types):
+        return value, []
+    elif isinstance(value, str) and float in types and _number(value) is not None:
+        return _number(value), []
+    elif isinstance(value, (int, float)) and str in types:
+        return str(value), []
+    return value, [f'{path}: expected {getattr(shape, "__name__", "a number")}']
@@ -0,0 +1,273 @@
+"""
+Process-safe metrics with Prometheus text exposition.
+
+Each process keeps its counters and histograms in memory, so recording a
+value costs only a lock and a few additions. A background thread in each
+process writes its totals to ``METRICS_DIR/<pid>.json`` every few
+seconds, and so does every scrape of ``/api/metrics``. A scrape sums the snapshot files of all
+gunicorn workers, so the exposed numbers cover the whole server no matter
+which worker answers. Files of exited workers are kept, because their
+counts are still part of the totals. The directory is cleared when
+gunicorn starts.
+"""
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+app_dir = Path(__file__).parent.parent.absolute()
+DEFAULT_METRICS_DIR = app_dir / 'instance' / 'metrics'
+
+PREFIX = 'interview_'
+
+# Upper bounds in seconds, from sub-millisecond parsing to slow LLM calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+METRICS = {
+    'stage_seconds': ('histogram', 'Time spent in each request stage, per blueprint'),
+    'request_seconds': ('histogram', 'Time to produce a response (streams: until headers), per blueprint'),
+    'evaluation_part_seconds': ('histogram', 'Upstream latency per evaluation part (monolithic or fan-out part)'),
+    'requests_total': ('counter', 'HTTP responses by blueprint and status code'),
+    'llm_tokens_total': ('counter', 'LLM tokens by direction (streamed completions are estimated)'),
+    'cache_requests_total': ('counter', 'Result cache lookups by namespace and result'),
+    'answer_pool_warmed_total': ('counter', 'Answers generated in the background for the answer pool'),
+    'coalesced_requests_total': ('counter', 'Calls that shared an identical in-flight call, by namespace and scope'),
+    'admission_total': ('counter', 'Requests on an LLM lane by admission result: admitted, queued, queue_full or timeout'),
+    'admission_wait_seconds': ('histogram', 'Time queued requests waited for a slot, per lane'),
+    'rate_limited_total': ('counter', 'Requests rejected by the rate limiter'),
+    'llm_json_total': ('counter', 'LLM JSON responses by kind and outcome: parsed, repaired or failed'),
+    'sections_rerequested_total': ('counter', 'Evaluation sections requested again after coming back missing or malformed'),
+    'revision_evaluations_total': ('counter', 'Evaluations of revised answers, by mode: incremental or full'),
+    'revision_sections_reused_total': ('counter', 'STAR sections whose feedback was reused from a previous revision'),
+    'truncated_completions_total': ('counter', 'LLM responses cut off at their max_tokens budget, by kind'),
+    'upstream_errors_total': ('counter', 'Failed LLM calls by exception type')
+}
+
+
+def _labels_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    """Counters and histograms for one process, with file-based aggregation."""
+
+    def __init__(self, directory=None, flush_interval=None):
+        self.directory = Path(directory or os.getenv('METRICS_DIR', str(DEFAULT_METRICS_DIR)))
+        self.flush_interval = (flush_interval if flush_interval is not None
+                               else float(os.getenv('METRICS_FLUSH_INTERVAL', 5)))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._counters = {}
+        self._histograms = {}
+        self._flusher_started = False
+
+    def _check_process(self):
+        # A forked child must not report its parent's numbers as its own
+        if self._pid != os.getpid():
+            self._reset()
+        if not self._flusher_started:
+            self._flusher_started = True
+            threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def increment(self, name, amount=1, **labels):
+        """Add ``amount`` to a counter."""
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._check_process()
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        """Record a duration in a histogram."""
+        key = (name, _labels_key(labels))
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self._check_process()
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0}
+            histogram['buckets'][index] += 1
+            histogram['sum'] += seconds
+
+    @contextmanager
+    def timed(self, stage, blueprint=None):
+        """Time a block as ``stage_seconds`` for ``blueprint`` (default: the current request's)."""
+        if blueprint is None:
+            blueprint = current_blueprint()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - started, blueprint=blueprint, stage=stage)
+
+    # -- aggregation -----------------------------------------------------
+
+    def snapshot(self):
+        """This process's metrics as JSON-serialisable data."""
+        with self._lock:
+            self._check_process()
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, dict(labels), list(histogram['buckets']), histogram['sum']]
+                    for (name, labels), histogram in self._histograms.items()
+                ]
+            }
+
+    def flush(self):
+        """Write this process's snapshot file."""
+        with self._flush_lock:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f'{os.getpid()}.json'
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f'Metrics flush failed: {str(e)}')
+
+    def clear(self):
+        """Remove all snapshot files, e.g. when the server (re)starts."""
+        if self.directory.exists():
+            for path in self.directory.glob('*.json'):
+                path.unlink(missing_ok=True)
+
+    def collect(self):
+        """Sum the snapshots of every process, including this one."""
+        self.flush()
+        counters = {}
+        histograms = {}
+        for path in self.directory.glob('*.json'):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in snapshot['counters']:
+                key = (name, _labels_key(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total in snapshot['histograms']:
+                key = (name, _labels_key(labels))
+                merged = histograms.setdefault(key, {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0})
+                merged['buckets'] = [a + b for a, b in zip(merged['buckets'], buckets)]
+                merged['sum'] += total
+        return counters, histograms
+
+    def render(self):
+        """All processes' metrics in the Prometheus text format."""
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            full_name = PREFIX + name
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+            else:
+                for (metric, labels), histogram in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float('inf'),), histogram['buckets']):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else _format_value(bound)
+                        lines.append(f'{full_name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                    lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(histogram["sum"])}')
+                    lines.append(f'{full_name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def current_blueprint():
+    """
+    Blueprint name of the request being handled.
+
+    ``'app'`` for app-level routes and ``'none'`` outside a request.
+    """
+    from flask import has_request_context, request
+    if has_request_context():
+        return request.blueprint or 'app'
+    return 'none'
+
+
+def record_completion(blueprint, create, prompt_tokens=0, stream=False):
+    """
+    Call ``create()`` for an LLM completion and record upstream metrics.
+
+    Records total upstream time, time to first token for streams, token
+    usage and failures. Streams are returned wrapped, so their timing is
+    recorded as the caller consumes them.
+    """
+    started = time.perf_counter()
+    try:
+        result = create()
+    except Exception as e:
+        metrics.increment('upstream_errors_total', blueprint=blueprint, type=type(e).__name__)
+        raise
+
+    if stream:
+        return _observe_stream(result, blueprint, started, prompt_tokens)
+
+    metrics.observe('stage_seconds', time.perf_counter() - started, blueprint=blueprint, stage='upstream_total')
+    usage = getattr(result, 'usage', None)
+    metrics.increment('llm_tokens_total', getattr(usage, 'prompt_tokens', None) or prompt_tokens,
+                      blueprint=blueprint, direction='in')
+    if usage is not None and getattr(usage, 'completion_tokens', None):
+        metrics.increment('llm_tokens_total', usage.completion_tokens, blueprint=blueprint, direction='out')
+    return result
+
+
+def _observe_stream(chunks, blueprint, started, prompt_tokens):
+    characters = 0
+    first_token = False
+    try:
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not first_token:
+                    first_token = True
+                    metrics.observe('stage_seconds', time.perf_counter() - started,
+                                    blueprint=blueprint, stage='upstream_ttft')
+                characters += len(chunk.choices[0].delta.content)
+            yield chunk
+    except Exception as e:
+        metrics.increment('upstream_errors_total', blueprint=blueprint, type=type(e).__name__)
+        raise
+    metrics.observe('stage_seconds', time.perf_counter() - started, blueprint=blueprint, stage='upstream_total')
+    metrics.increment('llm_tokens_total', prompt_tokens, blueprint=blueprint, direction='in')
+    # Same four-characters-per-token estimate as the prompt templates
+    metrics.increment('llm_tokens_total', (characters + 3) // 4, blueprint=blueprint, direction='out')
+
+
+metrics = MetricsRegistry()
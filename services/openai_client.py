@@ -0,0 +1,143 @@
+"""
+Shared, process-wide OpenAI client.
+
+Creating a new ``OpenAI`` client per request throws away the underlying
+httpx connection pool, so every call pays a fresh TCP + TLS handshake.
+This module keeps one pooled client per process and rebuilds it after a
+fork, so each gunicorn worker gets its own pool instead of sharing sockets
+inherited from the master.
+
+When ``OPENAI_CASSETTE_MODE`` is ``record`` or ``replay`` the client is
+wrapped by ``services.cassette``; replay needs no API key.
+"""
+import os
+import threading
+
+import httpx
+from openai import OpenAI
+from dotenv import load_dotenv
+from pathlib import Path
+
+from services.cassette import get_cassette_mode, wrap_client
+
+# Load environment variables - ensure we load from the project root
+app_dir = Path(__file__).parent.parent.absolute()
+env_path = app_dir / '.env'
+load_dotenv(dotenv_path=env_path)
+
+# Longest pause of the OpenAI client between retries
+MAX_RETRY_DELAY = 8.0
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+
+def _float_env(name, default):
+    return float(os.getenv(name, default))
+
+
+def _int_env(name, default):
+    return int(os.getenv(name, default))
+
+
+def get_client_settings():
+    """Read connection pool and timeout settings from the environment."""
+    return {
+        'max_connections': _int_env('OPENAI_MAX_CONNECTIONS', 20),
+        'max_keepalive_connections': _int_env('OPENAI_MAX_KEEPALIVE', 10),
+        'keepalive_expiry': _float_env('OPENAI_KEEPALIVE_EXPIRY', 60.0),
+        'connect_timeout': _float_env('OPENAI_CONNECT_TIMEOUT', 5.0),
+        'read_timeout': _float_env('OPENAI_READ_TIMEOUT', 110.0),
+        'max_retries': _int_env('OPENAI_MAX_RETRIES', 2),
+    }
+
+
+def max_call_seconds(settings=None):
+    """
+    Longest one completion call can take before it fails, retries included.
+
+    Every attempt may wait up to the connect and read timeouts, and the
+    client sleeps at most 8 seconds between attempts.
+    """
+    settings = settings or get_client_settings()
+    attempts = 1 + settings['max_retries']
+    return (settings['connect_timeout'] + settings['read_timeout']) * attempts + MAX_RETRY_DELAY * (attempts - 1)
+
+
+def _build_client():
+    mode = get_cassette_mode()
+    if mode == 'replay':
+        return wrap_client(None, mode)
+
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+    settings = get_client_settings()
+    timeout = httpx.Timeout(
+        settings['read_timeout'],
+        connect=settings['connect_timeout']
+    )
+    http_client = httpx.Client(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=settings['max_connections'],
+            max_keepalive_connections=settings['max_keepalive_connections'],
+            keepalive_expiry=settings['keepalive_expiry']
+        )
+    )
+    client = OpenAI(
+        api_key=api_key,
+        base_url=os.getenv('OPENAI_BASE_URL') or None,
+        timeout=timeout,
+        max_retries=settings['max_retries'],
+        http_client=http_client
+    )
+    return wrap_client(client, mode)
+
+
+def get_openai_client():
+    """
+    Get the shared OpenAI client for the current process.
+
+    The client is created lazily on first use. If the process has forked
+    since the client was created, a new client (and connection pool) is
+    built for the child.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _lock:
+        if _client is None or _client_pid != pid:
+            _client = _build_client()
+            _client_pid = pid
+    return _client
+
+
+def init_worker():
+    """
+    Build a fresh client for a newly forked worker.
+
+    Called from the gunicorn ``post_fork`` hook so the first request in a
+    worker does not pay the client construction cost. A missing API key is
+    reported but not fatal, matching the startup check in ``app.py``.
+    """
+    reset_client()
+    try:
+        get_openai_client()
+    except ValueError as e:
+        print(f'OpenAI client not initialised: {str(e)}')
+
+
+def reset_client():
+    """Drop the current client without closing sockets shared with a parent."""
+    global _client, _client_pid
+    _client = None
+    _client_pid = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_client)
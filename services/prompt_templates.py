@@ -0,0 +1,474 @@
+"""
+Prompt templates for evaluation and answer generation.
+
+Messages are laid out so that everything static comes first and the
+per-request data comes last:
+
+1. The system message holds the instructions, the full JSON schema and the
+   scoring guidelines. It is identical for every request, which makes it a
+   shared prefix for the provider's prompt caching.
+2. The user message starts with the ``PRINCIPLES_TOP_K`` leadership
+   principles of the company most relevant to the question and answer
+   (see ``data.principle_ranking``), instead of all of them. When all of
+   them are selected, the block precompiled for the company at import is
+   used.
+3. Role, level, question and answer follow at the end.
+
+Every template, the principle keywords and the top-k setting are hashed
+into a version string, so editing any of them automatically invalidates
+cached results produced by the old prompt.
+
+``SECTION_OUTPUT_TOKENS`` and ``GENERATE_OUTPUT_TOKENS`` estimate how long
+the responses asked for are; ``services.token_budget`` sizes ``max_tokens``
+from them.
+"""
+import os
+import hashlib
+from functools import lru_cache
+
+from data.principle_ranking import DEFAULT_TOP_K, RANKING_VERSION, rank_principles
+from data.static_data import get_companies, get_company_values
+
+# Principles listed in a prompt; 0 lists all of them
+PRINCIPLES_TOP_K = int(os.getenv('PRINCIPLES_TOP_K', DEFAULT_TOP_K))
+
+# Rough tokens per English word in generated text
+TOKENS_PER_WORD = 4 / 3
+
+# Top-level sections of an evaluation written by the LLM, in response order;
+# lengthTimingFeedback is computed locally (see services.star_analyzer)
+EVALUATION_SECTIONS = (
+    'scoredAssessment',
+    'starAnalysis',
+    'rewriteSuggestions',
+    'guidingQuestions',
+    'companyCultureAlignment',
+    'followUpQuestions',
+    'alternativeFraming',
+    'interviewReadyAssessment'
+)
+
+# JSON schema snippet for each evaluation section
+SECTION_SCHEMAS = {
+    'scoredAssessment': """  "scoredAssessment": {
+    "dimensions": [
+      {
+        "dimension": "Situation Clarity",
+        "score": 1-5,
+        "justification": "Detailed explanation"
+      },
+      {
+        "dimension": "Task Definition",
+        "score": 1-5,
+        "justification": "Detailed explanation"
+      },
+      {
+        "dimension": "Actions Taken",
+        "score": 1-5,
+        "justification": "Detailed explanation"
+      },
+      {
+        "dimension": "Results & Impact",
+        "score": 1-5,
+        "justification": "Detailed explanation"
+      },
+      {
+        "dimension": "<Target Company> Leadership Principles",
+        "score": 1-5,
+        "justification": "Detailed explanation showing which principles are demonstrated"
+      },
+      {
+        "dimension": "Technical Depth (Role-Relevant)",
+        "score": 1-5,
+        "justification": "Detailed explanation"
+      },
+      {
+        "dimension": "Communication & Structure",
+        "score": 1-5,
+        "justification": "Detailed explanation"
+      }
+    ]
+  }""",
+    'starAnalysis': """  "starAnalysis": {
+    "situation": {
+      "strengths": ["strength 1", "strength 2"],
+      "opportunities": ["opportunity 1", "opportunity 2"]
+    },
+    "task": {
+      "strengths": ["strength 1", "strength 2"],
+      "opportunities": ["opportunity 1", "opportunity 2"]
+    },
+    "action": {
+      "strengths": ["strength 1", "strength 2"],
+      "opportunities": ["opportunity 1", "opportunity 2"]
+    },
+    "result": {
+      "strengths": ["strength 1", "strength 2"],
+      "opportunities": ["opportunity 1", "opportunity 2"]
+    }
+  }""",
+    'rewriteSuggestions': """  "rewriteSuggestions": [
+    "Suggestion 1",
+    "Suggestion 2",
+    "Suggestion 3",
+    "Suggestion 4"
+  ]""",
+    'guidingQuestions': """  "guidingQuestions": [
+    "Question 1",
+    "Question 2",
+    "Question 3",
+    "Question 4"
+  ]""",
+    'companyCultureAlignment': """  "companyCultureAlignment": {
+    "principles": [
+      {
+        "principle": "Principle Name",
+        "alignment": "How it aligns with the story"
+      }
+    ],
+    "additionalAlignment": "Additional suggestions for better alignment"
+  }""",
+    'followUpQuestions': """  "followUpQuestions": [
+    "Question 1",
+    "Question 2",
+    "Question 3",
+    "Question 4",
+    "Question 5"
+  ]""",
+    'alternativeFraming': """  "alternativeFraming": [
+    "Suggestion 1",
+    "Suggestion 2",
+    "Suggestion 3"
+  ]""",
+    'interviewReadyAssessment': """  "interviewReadyAssessment": {
+    "overall": "Overall assessment text",
+    "topPriorities": [
+      "Priority 1",
+      "Priority 2",
+      "Priority 3"
+    ],
+    "conclusion": "Concluding statement"
+  }"""
+}
+
+# Dimensions of the scored assessment, in schema order
+SCORED_DIMENSIONS = (
+    'Situation Clarity',
+    'Task Definition',
+    'Actions Taken',
+    'Results & Impact',
+    '<Target Company> Leadership Principles',
+    'Technical Depth (Role-Relevant)',
+    'Communication & Structure'
+)
+
+# Dimensions that judge a single STAR section; the others judge the whole answer
+STAR_DIMENSIONS = dict(zip(('situation', 'task', 'action', 'result'), SCORED_DIMENSIONS))
+
+# Shape each section must have, checked by services.llm_json.conform
+_NUMBER = (int, float)
+_STAR_PART = {'strengths': [str], 'opportunities': [str]}
+SECTION_SHAPES = {
+    'scoredAssessment': {'dimensions': [{'dimension': str, 'score': _NUMBER, 'justification': str}]},
+    'starAnalysis': {'situation': _STAR_PART, 'task': _STAR_PART, 'action': _STAR_PART, 'result': _STAR_PART},
+    'rewriteSuggestions': [str],
+    'guidingQuestions': [str],
+    'companyCultureAlignment': {'principles': [{'principle': str, 'alignment': str}], 'additionalAlignment': str},
+    'followUpQuestions': [str],
+    'alternativeFraming': [str],
+    'interviewReadyAssessment': {'overall': str, 'topPriorities': [str], 'conclusion': str}
+}
+
+# Typical output tokens of each section as the schema asks for it
+SECTION_OUTPUT_TOKENS = {
+    'scoredAssessment': 700,
+    'starAnalysis': 500,
+    'rewriteSuggestions': 200,
+    'guidingQuestions': 120,
+    'companyCultureAlignment': 250,
+    'followUpQuestions': 150,
+    'alternativeFraming': 150,
+    'interviewReadyAssessment': 250
+}
+
+EVALUATION_SYSTEM_PROMPT = """You are an expert interview coach specializing in behavioral interviews using the STAR method (Situation, Task, Action, Result). Your role is to provide comprehensive, actionable feedback that helps candidates improve their interview performance.
+
+You will be given a company's leadership principles, the interview context, and the candidate's answer. Evaluate the answer using the STAR method.
+
+**Evaluation JSON format:**
+
+{
+""" + ',\n'.join(SECTION_SCHEMAS[section] for section in EVALUATION_SECTIONS) + """
+}
+
+Replace <Target Company> with the target company's name.
+
+**Scoring Guidelines:**
+- 5: Exceptional - Exceeds expectations, highly impressive
+- 4: Strong - Meets expectations well, minor improvements possible
+- 3: Adequate - Meets basic expectations, needs improvement
+- 2: Weak - Below expectations, significant gaps
+- 1: Poor - Major issues, needs substantial work
+
+**Focus Areas:**
+1. Ensure feedback is specific, actionable, and constructive
+2. Highlight alignment with the target company's leadership principles
+3. Provide role-specific technical depth feedback for the target role
+4. Consider the expectations for the candidate's experience level
+5. Balance praise for strengths with clear improvement opportunities
+
+Return ONLY valid JSON, no additional text or markdown formatting. When asked for specific parts of the evaluation, return a JSON object containing only those top-level keys."""
+
+GENERATE_SYSTEM_PROMPT = """You are an expert interview coach helping candidates prepare for behavioral interviews. Your role is to generate realistic, compelling STAR (Situation, Task, Action, Result) formatted answers that demonstrate strong leadership, problem-solving, and impact. Generate answers that are specific, measurable, and aligned with the company's values.
+
+**Requirements:**
+1. Generate a realistic, specific example that demonstrates:
+   - Strong problem-solving skills
+   - Leadership and ownership
+   - Impact and measurable results
+   - Alignment with the target company's leadership principles
+
+2. Format the answer using the STAR method:
+   - **Situation:** Set the context (project, team, challenge)
+   - **Task:** Describe your responsibility and what needed to be accomplished
+   - **Action:** Detail the specific actions you took (use "I" statements)
+   - **Result:** Quantify the impact and outcomes
+
+3. Make it appropriate for the candidate's experience level:
+   - Include relevant technical details for the target role
+   - Show appropriate scope and impact for the experience level
+   - Demonstrate growth and learning
+
+4. Ensure the answer:
+   - Is 300-500 words
+   - Includes specific metrics and numbers where possible
+   - Shows 2-3 of the target company's leadership principles
+   - Is realistic and believable
+   - Demonstrates both technical and soft skills
+
+Generate ONLY the STAR answer, formatted clearly with Situation, Task, Action, and Result sections. Do not include any additional commentary or explanation."""
+
+# Longest answer GENERATE_SYSTEM_PROMPT asks for, in words and tokens
+GENERATE_MAX_WORDS = 500
+GENERATE_OUTPUT_TOKENS = int(GENERATE_MAX_WORDS * TOKENS_PER_WORD)
+
+
+def _template_version(name, *parts):
+    digest = hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+    return f'{name}-{digest[:12]}'
+
+
+@lru_cache(maxsize=4096)
+def compile_company_block(company, principles=None):
+    """
+    Render the leadership principles block for a company.
+
+    ``principles`` is a tuple of selected principles; by default all of
+    the company's principles are listed. Results are memoized; the full
+    blocks of known companies are compiled at import time into
+    ``COMPANY_BLOCKS``.
+    """
+    if principles is None:
+        company_values = get_company_values(company)
+        principles = company_values.get('principles', []) if company_values else []
+    lines = '\n'.join(f'{i+1}. {principle}' for i, principle in enumerate(principles))
+    return f"""**Company Leadership Principles ({company}):**
+{lines}
+"""
+
+
+def select_company_block(company, text):
+    """Principles block with the ``PRINCIPLES_TOP_K`` principles most relevant to ``text``."""
+    principles = rank_principles(company, text, PRINCIPLES_TOP_K)
+    if principles == COMPANY_PRINCIPLES.get(company):
+        return COMPANY_BLOCKS[company]
+    return compile_company_block(company, principles)
+
+
+def expected_evaluation_tokens(sections=EVALUATION_SECTIONS, scope=None):
+    """Typical output tokens of an evaluation limited to ``sections`` and ``scope``."""
+    scope = scope or {}
+    total = 0
+    for section in sections:
+        if section == 'starAnalysis' and 'starAnalysis' in scope:
+            total += SECTION_OUTPUT_TOKENS[section] * len(scope['starAnalysis']) // len(STAR_DIMENSIONS)
+        elif section == 'scoredAssessment' and 'scoredAssessment' in scope:
+            total += SECTION_OUTPUT_TOKENS[section] * len(scope['scoredAssessment']) // len(SCORED_DIMENSIONS)
+        else:
+            total += SECTION_OUTPUT_TOKENS[section]
+    return total
+
+
+def dimension_names(company):
+    """``SCORED_DIMENSIONS`` with the company's name filled in."""
+    return tuple(name.replace('<Target Company>', company) for name in SCORED_DIMENSIONS)
+
+
+def _company_principles(company):
+    company_values = get_company_values(company)
+    return tuple(company_values['principles']) if company_values else ()
+
+
+def precompile_companies():
+    """Compile the full principles block for every known company."""
+    return {company: compile_company_block(company, COMPANY_PRINCIPLES[company]) for company in get_companies()}
+
+
+COMPANY_PRINCIPLES = {company: _company_principles(company) for company in get_companies()}
+COMPANY_BLOCKS = precompile_companies()
+
+_PRINCIPLE_SELECTION = f'principles-{RANKING_VERSION}-top-{PRINCIPLES_TOP_K}'
+
+EVALUATION_TEMPLATE_VERSION = _template_version(
+    'evaluation', EVALUATION_SYSTEM_PROMPT, _PRINCIPLE_SELECTION, *sorted(COMPANY_BLOCKS.values())
+)
+GENERATE_TEMPLATE_VERSION = _template_version(
+    'generate', GENERATE_SYSTEM_PROMPT, _PRINCIPLE_SELECTION, *sorted(COMPANY_BLOCKS.values())
+)
+
+
+def build_evaluation_messages(target_role, target_company, experience_level, question, answer,
+                              sections=EVALUATION_SECTIONS, scope=None):
+    """
+    Build the chat messages for an evaluation request.
+
+    ``sections`` limits the requested JSON to a subset of
+    ``EVALUATION_SECTIONS``; by default the full evaluation is requested.
+    The schema itself always stays in the shared system prompt. ``scope``
+    narrows sections further when re-evaluating a revised answer:
+    ``starAnalysis`` to a list of STAR sections and ``scoredAssessment`` to
+    a list of dimensions.
+    """
+    if tuple(sections) == EVALUATION_SECTIONS and not scope:
+        request_line = 'Provide the complete evaluation in the JSON format above.'
+    else:
+        request_line = (
+            'Provide ONLY the following top-level keys of the evaluation JSON: '
+            + ', '.join(sections) + '.'
+        )
+    scope = scope or {}
+    if scope.get('starAnalysis'):
+        request_line += ('\nIn starAnalysis, include ONLY these keys (the rest of the answer is unchanged '
+                         'since it was last evaluated): ' + ', '.join(scope['starAnalysis']) + '.')
+    if scope.get('scoredAssessment'):
+        request_line += ('\nIn scoredAssessment, include ONLY these dimensions: '
+                         + ', '.join(scope['scoredAssessment']) + '.')
+
+    company_block = select_company_block(target_company, f'{question}\n{answer}')
+
+    user_prompt = f"""{company_block}
+**Context:**
+- Target Role: {target_role}
+- Target Company: {target_company}
+- Experience Level: {experience_level}
+- Interview Question: {question}
+
+**Candidate's Answer:**
+{answer}
+
+**Evaluation Requirements:**
+{request_line}"""
+
+    return [
+        {"role": "system", "content": EVALUATION_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def build_generate_messages(target_role, target_company, experience_level, question, context=''):
+    """Build the chat messages for a STAR answer generation request."""
+    if context:
+        context_section = f"""
+**Candidate Context:**
+{context}
+"""
+    else:
+        context_section = "\n**Note:** Generate a realistic example appropriate for the experience level.\n"
+
+    company_block = select_company_block(target_company, f'{question}\n{context}')
+
+    user_prompt = f"""{company_block}
+Generate a compelling STAR-formatted answer for the following behavioral interview question.
+
+**Context:**
+- Target Role: {target_role}
+- Target Company: {target_company}
+- Experience Level: {experience_level}
+- Interview Question: {question}
+{context_section}"""
+
+    return [
+        {"role": "system", "content": GENERATE_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def estimate_tokens(text):
+    """Rough token count for English prompt text (about four characters per token)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def shared_prefix_length(messages_a, messages_b):
+    """Number of leading characters two prompts have in common."""
+    text_a = ''.join(message['content'] for message in messages_a)
+    text_b = ''.join(message['content'] for message in messages_b)
+    length = 0
+    for char_a, char_b in zip(text_a, text_b):
+        if char_a != char_b:
+            break
+        length += 1
+    return length
+
+
+def data_first_messages(messages):
+    """
+    The same prompt laid out as before these templates: a short system
+    message, then the request data followed by the static instructions.
+    """
+    intro, _, instructions = messages[0]['content'].partition('\n\n')
+    return [
+        {"role": "system", "content": intro},
+        {"role": "user", "content": f"{messages[1]['content']}\n\n{instructions}"}
+    ]
+
+
+def _prompt_counts(messages_a, messages_b):
+    text = ''.join(message['content'] for message in messages_a)
+    return {
+        'prompt_tokens': estimate_tokens(text),
+        'shared_prefix_tokens': estimate_tokens(text[:shared_prefix_length(messages_a, messages_b)])
+    }
+
+
+def prompt_token_report():
+    """
+    Estimate prompt size and cacheable prefix for two unrelated requests.
+
+    Returns a dict per prompt kind with ``before`` (the data-first layout,
+    see ``data_first_messages``) and ``after`` (the current templates), each
+    with the total prompt tokens and the tokens shared as an identical
+    prefix between the two requests.
+    """
+    first = ('Software Engineer', 'Amazon', 'Senior (6-10 years)',
+             'Tell me about a time you disagreed with your manager.',
+             'Situation: Our team was migrating a billing service...')
+    second = ('Data Scientist', 'Amazon', 'Junior (0-2 years)',
+              'Describe a project where requirements were unclear.',
+              'Situation: In my first role I was asked to forecast churn...')
+    report = {}
+    for kind, builder in (('evaluation', build_evaluation_messages),
+                          ('generate', build_generate_messages)):
+        messages_a = builder(*first)
+        messages_b = builder(*second)
+        report[kind] = {
+            'before': _prompt_counts(data_first_messages(messages_a), data_first_messages(messages_b)),
+            'after': _prompt_counts(messages_a, messages_b)
+        }
+    return report
+
+
+if __name__ == '__main__':
+    for kind, layouts in prompt_token_report().items():
+        for layout, counts in layouts.items():
+            print(f"{kind} {layout}: ~{counts['prompt_tokens']} prompt tokens, "
+                  f"~{counts['shared_prefix_tokens']} in the shared cacheable prefix")
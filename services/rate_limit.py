@@ -0,0 +1,507 @@
+"""
+Token-bucket rate limiting shared by all worker processes.
+
+Limits are enforced with flask-limiter. Its stock strategies count
+requests in fixed or sliding windows, so this module adds a
+``token-bucket`` strategy to the ``limits`` package it is built on. A limit such as
+``100 per hour`` becomes a bucket that holds up to 100 tokens and refills
+at 100 tokens per hour, so short bursts are allowed while the long-run
+rate stays at the limit. Each request takes one token from every request
+limit (``RATELIMIT_DEFAULT``). Requests that call the LLM also take their
+estimated LLM token cost, prompt plus maximum output, from the token
+limits (``RATELIMIT_LLM_TOKENS``), shared by all LLM endpoints. A request
+whose cost is larger than a token bucket can ever hold is rejected with
+``413`` instead of waiting for a refill that would never be enough.
+
+Bucket state lives in storage shared by all gunicorn workers, so the
+limits hold for the whole server and survive worker restarts:
+
+- ``sqlite:///<path>`` (default ``instance/ratelimit.sqlite3``): a WAL
+  database on the local disk, registered here as a ``limits`` storage. A
+  check is one short write transaction.
+- ``redis://...``: a Lua script on a Redis server, for several hosts. Needs
+  the ``redis`` package.
+- ``memory://``: per-process buckets, for single-process development.
+
+Limits are a safeguard: if the storage fails, the request is let through
+and the error is printed.
+"""
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to SQLite's own locking
+    fcntl = None
+
+from flask import request, current_app
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits import parse_many
+from limits.storage import MemoryStorage, RedisStorage, Storage
+from limits.strategies import STRATEGIES, RateLimiter as LimitsStrategy
+from limits.util import WindowStats
+from werkzeug.exceptions import RequestEntityTooLarge, TooManyRequests
+
+from services.blocking import offload
+from services.result_cache import connect_sqlite
+
+app_dir = Path(__file__).parent.parent.absolute()
+DEFAULT_STORAGE_URI = 'sqlite:///' + str(app_dir / 'instance' / 'ratelimit.sqlite3')
+
+DEFAULT_LIMITS = '200 per day; 100 per hour'
+DEFAULT_LLM_TOKEN_LIMITS = '2000000 per day; 500000 per hour'
+
+TOKEN_BUCKET = 'token-bucket'
+
+# Seconds between purges of buckets that have refilled completely
+PURGE_INTERVAL = 300
+
+
+def refill(state, capacity, rate, now):
+    """Tokens in a bucket at ``now``; a bucket without state is full."""
+    if state is None:
+        return float(capacity)
+    tokens, updated = state[:2]
+    return min(float(capacity), tokens + max(0.0, now - updated) * rate)
+
+
+def plan_consume(buckets, states, now):
+    """
+    Decide whether all ``buckets`` can pay their cost.
+
+    ``buckets`` holds ``(key, capacity, rate, cost)`` tuples and ``states``
+    maps keys to stored ``(tokens, updated)``. A cost above the capacity can
+    never be paid and has to be rejected before it gets here.
+
+    Returns:
+        tuple: ``(retry_after, new_states)`` where ``new_states`` maps keys
+        to ``(tokens, updated, full_at)``, or is None when the request is
+        rejected
+    """
+    retry_after = 0.0
+    new_states = {}
+    for key, capacity, rate, cost in buckets:
+        tokens = refill(states.get(key), capacity, rate, now)
+        if tokens < cost:
+            retry_after = max(retry_after, (cost - tokens) / rate)
+        new_states[key] = (tokens - cost, now, now + (capacity - tokens + cost) / rate)
+    if retry_after > 0:
+        return retry_after, None
+    return 0.0, new_states
+
+
+class MemoryBuckets:
+    """Buckets in this process only."""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def consume(self, buckets, now):
+        with self._lock:
+            retry_after, new_states = plan_consume(buckets, self._states, now)
+            if new_states:
+                self._states.update(new_states)
+                if len(self._states) > 100000:
+                    self._states = {key: state for key, state in self._states.items() if state[2] >= now}
+            return retry_after
+
+    def level(self, key, capacity, rate, now):
+        return refill(self._states.get(key), capacity, rate, now)
+
+    def clear_bucket(self, key):
+        self._states.pop(key, None)
+
+
+class SQLiteStorage(Storage):
+    """
+    ``limits`` storage in a SQLite database shared by every process on the host.
+
+    Holds token buckets for the ``token-bucket`` strategy, and plain
+    counters so that the stock fixed-window strategy works on it as well.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri[len('sqlite:///'):]
+        self._local = threading.local()
+        self._schema_ready_pid = None
+        self._next_purge = 0.0
+        self._thread_lock = threading.Lock()
+        self._lock_file = None
+        self._lock_pid = None
+
+    @property
+    def base_exceptions(self):
+        return (sqlite3.Error, OSError)
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = connect_sqlite(self.path)
+            # Every limit is hit in its own transaction, so a request is
+            # several commits. Bucket levels lost in an OS crash only
+            # refill the buckets early, so skip the fsync at checkpoints.
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+            self._local.pid = pid
+        if self._schema_ready_pid != pid:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, '
+                'full_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS buckets_full_at ON buckets (full_at)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS counters ('
+                'key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._schema_ready_pid = pid
+        return conn
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Serialize writes across threads and processes.
+
+        SQLite waits for a busy database by sleeping for up to 100 ms at a
+        time, which under contention puts long stalls in the tail. Queuing
+        on a file lock first wakes the next waiter as soon as the lock is
+        released.
+        """
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            if self._lock_pid != os.getpid():
+                self._lock_file = open(f'{self.path}.lock', 'a')
+                self._lock_pid = os.getpid()
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _write(self, fn, *args):
+        """Run ``fn(conn, *args)`` in one ``BEGIN IMMEDIATE`` transaction."""
+        conn = self._connection()
+        with self._exclusive():
+            # IMMEDIATE takes the write lock up front, so no other worker can
+            # change the rows between the read and the update
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = fn(conn, *args)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return result
+
+    def _read(self, sql, params):
+        return self._connection().execute(sql, params).fetchone()
+
+    def consume(self, buckets, now):
+        return offload(self._write, self._consume, buckets, now)
+
+    def _consume(self, conn, buckets, now):
+        keys = [bucket[0] for bucket in buckets]
+        rows = conn.execute(
+            f'SELECT key, tokens, updated FROM buckets WHERE key IN ({",".join("?" * len(keys))})',
+            keys
+        ).fetchall()
+        states = {key: (tokens, updated) for key, tokens, updated in rows}
+        retry_after, new_states = plan_consume(buckets, states, now)
+        if new_states:
+            conn.executemany(
+                'INSERT INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, '
+                'updated = excluded.updated, full_at = excluded.full_at',
+                [(key,) + state for key, state in new_states.items()]
+            )
+        if now >= self._next_purge:
+            self._next_purge = now + PURGE_INTERVAL
+            conn.execute('DELETE FROM buckets WHERE full_at < ?', (now,))
+            conn.execute('DELETE FROM counters WHERE expires_at < ?', (now,))
+        return retry_after
+
+    def level(self, key, capacity, rate, now):
+        row = offload(self._read, 'SELECT tokens, updated FROM buckets WHERE key = ?', (key,))
+        return refill(row, capacity, rate, now)
+
+    def clear_bucket(self, key):
+        offload(self._write, lambda conn: conn.execute('DELETE FROM buckets WHERE key = ?', (key,)))
+
+    def incr(self, key, expiry, amount=1):
+        return offload(self._write, self._incr, key, expiry, amount)
+
+    def _incr(self, conn, key, expiry, amount):
+        now = time.time()
+        row = conn.execute('SELECT value, expires_at FROM counters WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] <= now:
+            value, expires_at = amount, now + expiry
+        else:
+            value, expires_at = row[0] + amount, row[1]
+        conn.execute(
+            'INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at',
+            (key, value, expires_at)
+        )
+        return value
+
+    def get(self, key):
+        row = offload(self._read, 'SELECT value FROM counters WHERE key = ? AND expires_at > ?', (key, time.time()))
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = offload(self._read, 'SELECT expires_at FROM counters WHERE key = ?', (key,))
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            offload(self._read, 'SELECT 1', ())
+            return True
+        except self.base_exceptions:
+            return False
+
+    def reset(self):
+        def delete_all(conn):
+            return sum(conn.execute(f'DELETE FROM {table}').rowcount for table in ('buckets', 'counters'))
+        return offload(self._write, delete_all)
+
+    def clear(self, key):
+        def delete_key(conn):
+            conn.execute('DELETE FROM buckets WHERE key = ?', (key,))
+            conn.execute('DELETE FROM counters WHERE key = ?', (key,))
+        offload(self._write, delete_key)
+
+
+# Same algorithm as plan_consume(), run atomically on the Redis server.
+# KEYS are bucket keys; ARGV is now followed by capacity, rate, cost per key.
+_REDIS_CONSUME = """
+local now = tonumber(ARGV[1])
+local retry_after = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 1])
+    local rate = tonumber(ARGV[i * 3])
+    local cost = tonumber(ARGV[i * 3 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = capacity
+    if state[1] then
+        tokens = math.min(capacity, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * rate)
+    end
+    if tokens < cost then
+        retry_after = math.max(retry_after, (cost - tokens) / rate)
+    end
+    levels[i] = {tokens - cost, math.ceil((capacity - tokens + cost) / rate * 1000)}
+end
+if retry_after > 0 then
+    return tostring(retry_after)
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', tostring(levels[i][1]), 'updated', tostring(now))
+    redis.call('PEXPIRE', key, math.max(1, levels[i][2]))
+end
+return '0'
+"""
+
+
+class RedisBuckets:
+    """Buckets on the Redis server of a ``limits`` Redis storage, updated by a server-side script."""
+
+    def __init__(self, client):
+        self._client = client
+        self._script = client.register_script(_REDIS_CONSUME)
+
+    def consume(self, buckets, now):
+        args = [now]
+        for key, capacity, rate, cost in buckets:
+            args.extend((capacity, rate, cost))
+        return float(self._script(keys=[bucket[0] for bucket in buckets], args=args))
+
+    def level(self, key, capacity, rate, now):
+        tokens, updated = self._client.hmget(key, 'tokens', 'updated')
+        state = None if tokens is None else (float(tokens), float(updated))
+        return refill(state, capacity, rate, now)
+
+    def clear_bucket(self, key):
+        self._client.delete(key)
+
+
+def bucket_store(storage):
+    """
+    Token-bucket operations for a ``limits`` storage.
+
+    Raises:
+        ValueError: If the storage is not SQLite, Redis or memory
+    """
+    if isinstance(storage, SQLiteStorage):
+        return storage
+    if isinstance(storage, RedisStorage):
+        return RedisBuckets(storage.get_connection())
+    if isinstance(storage, MemoryStorage):
+        return MemoryBuckets()
+    raise ValueError('RATELIMIT_STORAGE_URI must start with sqlite:///, redis:// or memory://')
+
+
+class TokenBucketRateLimiter(LimitsStrategy):
+    """
+    ``limits`` strategy treating each limit as a token bucket.
+
+    A hit of cost ``n`` takes ``n`` tokens. When it is rejected, the time
+    until the bucket can pay is kept for this thread, so the reset time
+    ``get_window_stats`` reports for it right after, which becomes the
+    ``Retry-After`` header, is when the request can be retried rather than
+    when the bucket is full again.
+    """
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.buckets = bucket_store(storage)
+        self._local = threading.local()
+
+    @staticmethod
+    def _bucket(item, identifiers):
+        return item.key_for(*identifiers), item.amount, item.amount / item.get_expiry()
+
+    def hit(self, item, *identifiers, cost=1):
+        key, capacity, rate = self._bucket(item, identifiers)
+        now = time.time()
+        try:
+            retry_after = self.buckets.consume([(key, capacity, rate, cost)], now)
+        except self.storage.base_exceptions as e:
+            # Rate limits are a safeguard; never fail the request for them
+            print(f'Rate limit storage error: {str(e)}')
+            return True
+        self._local.retry_at = (key, now + retry_after) if retry_after > 0 else None
+        return retry_after == 0
+
+    def hit_all(self, items, *identifiers, cost=1):
+        """
+        Take ``cost`` tokens from the buckets of every limit in ``items``, or from none.
+
+        Returns:
+            float: 0 if every bucket paid, else seconds until all of them can
+        """
+        buckets = [self._bucket(item, identifiers) + (cost,) for item in items]
+        try:
+            return self.buckets.consume(buckets, time.time())
+        except self.storage.base_exceptions as e:
+            print(f'Rate limit storage error: {str(e)}')
+            return 0.0
+
+    def test(self, item, *identifiers, cost=1):
+        key, capacity, rate = self._bucket(item, identifiers)
+        try:
+            return self.buckets.level(key, capacity, rate, time.time()) >= cost
+        except self.storage.base_exceptions as e:
+            print(f'Rate limit storage error: {str(e)}')
+            return True
+
+    def get_window_stats(self, item, *identifiers):
+        key, capacity, rate = self._bucket(item, identifiers)
+        now = time.time()
+        try:
+            tokens = self.buckets.level(key, capacity, rate, now)
+        except self.storage.base_exceptions as e:
+            print(f'Rate limit storage error: {str(e)}')
+            tokens = float(capacity)
+        retry_at = getattr(self._local, 'retry_at', None)
+        if retry_at is not None and retry_at[0] == key:
+            return WindowStats(retry_at[1], int(tokens))
+        return WindowStats(now + (capacity - tokens) / rate, int(tokens))
+
+    def clear(self, item, *identifiers):
+        key, _, _ = self._bucket(item, identifiers)
+        self.buckets.clear_bucket(key)
+
+
+STRATEGIES[TOKEN_BUCKET] = TokenBucketRateLimiter
+
+
+class RateLimiter:
+    """
+    Per-IP limits for a Flask app.
+
+    flask-limiter charges every request to the request limits, which are
+    its application-wide limits, so they are shared by all endpoints.
+    Views can be exempted with ``exempt`` and given an LLM token cost with
+    ``cost``; a view without a cost only pays into the request limits. Both
+    checks run in ``before_request`` hooks registered ahead of admission
+    control, so a rejected request never takes an admission slot.
+    """
+
+    def __init__(self):
+        self.limiter = Limiter(get_remote_address, strategy=TOKEN_BUCKET)
+        self.token_limits = []
+        self.max_cost = None
+        self._costs = {}
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_APPLICATION', os.getenv('RATELIMIT_DEFAULT', DEFAULT_LIMITS))
+        app.config.setdefault('RATELIMIT_STORAGE_URI', os.getenv('RATELIMIT_STORAGE_URI', DEFAULT_STORAGE_URI))
+        self.token_limits = parse_many(os.getenv('RATELIMIT_LLM_TOKENS', DEFAULT_LLM_TOKEN_LIMITS))
+        self.max_cost = min(limit.amount for limit in self.token_limits)
+        self.limiter.init_app(app)
+        app.before_request(self.check_llm_tokens)
+
+    def exempt(self, view):
+        """Exclude a view function from rate limiting."""
+        return self.limiter.exempt(view)
+
+    def cost(self, estimate):
+        """
+        Decorator giving a view an LLM token cost.
+
+        ``estimate`` is called with the parsed JSON body (or None) and
+        returns the estimated number of LLM tokens the request will use.
+        """
+        def decorator(view):
+            self._costs[view] = estimate
+            return view
+        return decorator
+
+    def retry_after(self):
+        """Seconds until the request limit that rejected this request has refilled, or None."""
+        limit = self.limiter.current_limit
+        if limit is None or not limit.breached:
+            return None
+        return max(1, int(limit.reset_at - time.time()))
+
+    def check_llm_tokens(self):
+        """
+        ``before_request`` hook charging the client's LLM token buckets.
+
+        Raises:
+            RequestEntityTooLarge: If the request's cost is more than a
+            token bucket can ever hold
+            TooManyRequests: If a bucket cannot pay, with ``Retry-After``
+            set to when it will have refilled enough
+        """
+        if not self.limiter.enabled or request.endpoint is None:
+            return
+        estimate = self._costs.get(current_app.view_functions.get(request.endpoint))
+        if estimate is None:
+            return
+        cost = estimate(request.get_json(silent=True))
+        if cost > self.max_cost:
+            raise RequestEntityTooLarge(
+                f'Request needs about {cost} LLM tokens, more than the limit of {self.max_cost}'
+            )
+        # All token limits in one call, so a request one of them rejects is
+        # not charged to the others
+        retry_after = self.limiter.limiter.hit_all(self.token_limits, get_remote_address(), 'llm', cost=cost)
+        if retry_after > 0:
+            limits = '; '.join(str(limit) for limit in self.token_limits)
+            raise TooManyRequests(f'LLM token limits of {limits} exceeded', retry_after=max(1, int(retry_after) + 1))
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,243 @@
+"""
+Two-tier cache for LLM results.
+
+Results are keyed on a content hash of the normalized request inputs. Each
+process keeps a small in-memory LRU in front of a shared SQLite database
+(WAL mode), so every gunicorn worker on the host sees the same hits.
+Entries are tagged with the prompt version that produced them; entries from
+any other version are never served. Old and new workers share the database
+during a rolling deploy, so other versions are not purged when a worker
+starts: expired entries of every version are, and ``invalidate`` purges
+other versions on request.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from services.blocking import offload
+from services.metrics import metrics
+
+app_dir = Path(__file__).parent.parent.absolute()
+DEFAULT_CACHE_PATH = app_dir / 'instance' / 'cache.sqlite3'
+
+# Stats counters that are also exported as cache_requests_total results
+_LOOKUP_RESULTS = {'memory_hits': 'memory_hit', 'disk_hits': 'disk_hit', 'misses': 'miss'}
+
+
+def normalize_text(value, casefold=False):
+    """Collapse whitespace (and optionally case) so trivial edits share a key."""
+    text = ' '.join(str(value or '').split())
+    return text.casefold() if casefold else text
+
+
+def make_cache_key(*parts):
+    """Hash the given parts into a stable hex key."""
+    payload = json.dumps(parts, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def connect_sqlite(path):
+    """Open a SQLite connection tuned for many concurrent local readers."""
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        # Callers handle storage failures as sqlite3.Error
+        raise sqlite3.OperationalError(f'Cannot create {Path(path).parent}: {str(e)}') from e
+    conn = sqlite3.connect(str(path), timeout=5.0, isolation_level=None,
+                           check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=5000')
+    return conn
+
+
+class ResultCache:
+    """LRU memory tier backed by a shared SQLite disk tier."""
+
+    def __init__(self, namespace, version, max_entries=None, ttl=None,
+                 path=None, enabled=None):
+        self.namespace = namespace
+        self.version = version
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('CACHE_MAX_ENTRIES', 512))
+        self.ttl = ttl if ttl is not None else float(os.getenv('CACHE_TTL', 7 * 24 * 3600))
+        self.path = path or os.getenv('CACHE_PATH', str(DEFAULT_CACHE_PATH))
+        if enabled is None:
+            enabled = os.getenv('CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+        self.enabled = enabled
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._schema_ready_pid = None
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'errors': 0}
+
+    # -- disk tier -------------------------------------------------------
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+            self._local.pid = pid
+        if self._schema_ready_pid != pid:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'namespace TEXT NOT NULL, key TEXT NOT NULL, version TEXT NOT NULL, '
+                'value TEXT NOT NULL, created_at REAL NOT NULL, '
+                'PRIMARY KEY (namespace, key))'
+            )
+            self._purge_expired(conn)
+            self._schema_ready_pid = pid
+        return conn
+
+    def _purge_expired(self, conn):
+        conn.execute(
+            'DELETE FROM results WHERE namespace = ? AND created_at < ?',
+            (self.namespace, time.time() - self.ttl)
+        )
+
+    def _purge_other_versions(self, conn):
+        conn.execute(
+            'DELETE FROM results WHERE namespace = ? AND version != ?',
+            (self.namespace, self.version)
+        )
+
+    def _disk_invalidate(self, every_version):
+        conn = self._connection()
+        if every_version:
+            conn.execute('DELETE FROM results WHERE namespace = ?', (self.namespace,))
+        else:
+            self._purge_other_versions(conn)
+
+    def _disk_get(self, key):
+        row = self._connection().execute(
+            'SELECT value, created_at FROM results '
+            'WHERE namespace = ? AND key = ? AND version = ?',
+            (self.namespace, key, self.version)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row
+
+    def _disk_set(self, key, value, created_at):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO results (namespace, key, version, value, created_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (self.namespace, key, self.version, value, created_at)
+        )
+
+    # -- memory tier -----------------------------------------------------
+
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if time.time() - created_at > self.ttl:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def _memory_set(self, key, value, created_at):
+        with self._lock:
+            self._memory[key] = (value, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+        if name in _LOOKUP_RESULTS:
+            metrics.increment('cache_requests_total', namespace=self.namespace, result=_LOOKUP_RESULTS[name])
+
+    # -- public API ------------------------------------------------------
+
+    def get(self, key):
+        """Return the cached result for ``key`` or ``None``."""
+        if not self.enabled:
+            return None
+
+        value = self._memory_get(key)
+        if value is not None:
+            self._count('memory_hits')
+            return json.loads(value)
+
+        try:
+            row = offload(self._disk_get, key)
+        except sqlite3.Error as e:
+            self._count('errors')
+            print(f'Cache read error ({self.namespace}): {str(e)}')
+            row = None
+
+        if row is None:
+            self._count('misses')
+            return None
+
+        self._memory_set(key, row[0], row[1])
+        self._count('disk_hits')
+        return json.loads(row[0])
+
+    def contains(self, key):
+        """Whether a result is cached for ``key``, without counting a lookup."""
+        if not self.enabled:
+            return False
+        if self._memory_get(key) is not None:
+            return True
+        try:
+            return offload(self._disk_get, key) is not None
+        except sqlite3.Error as e:
+            self._count('errors')
+            print(f'Cache read error ({self.namespace}): {str(e)}')
+            return False
+
+    def set(self, key, result):
+        """Store a JSON-serializable result under ``key``."""
+        if not self.enabled:
+            return
+        value = json.dumps(result, ensure_ascii=False, separators=(',', ':'))
+        created_at = time.time()
+        self._memory_set(key, value, created_at)
+        try:
+            offload(self._disk_set, key, value, created_at)
+            self._count('writes')
+        except sqlite3.Error as e:
+            self._count('errors')
+            print(f'Cache write error ({self.namespace}): {str(e)}')
+
+    def invalidate(self, version=None):
+        """
+        Drop cached results.
+
+        With no argument every entry in this namespace is removed. Passing
+        a new ``version`` switches the cache to that prompt version and
+        removes entries produced by any other version.
+        """
+        with self._lock:
+            self._memory.clear()
+        if version is not None:
+            self.version = version
+        try:
+            offload(self._disk_invalidate, version is None)
+        except sqlite3.Error as e:
+            self._count('errors')
+            print(f'Cache invalidation error ({self.namespace}): {str(e)}')
+
+    def stats(self):
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        stats['namespace'] = self.namespace
+        stats['version'] = self.version
+        return stats
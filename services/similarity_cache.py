@@ -0,0 +1,448 @@
+"""
+Similarity lookup of near-identical answers for the result cache.
+
+The result cache only matches answers that are identical after whitespace
+normalization. Many answers differ from one already evaluated by
+punctuation or a word or two (shared templates, classmates), and would get
+the same evaluation. This index finds them:
+
+- An answer is vectorized locally with a hashing TF-IDF vectorizer: word
+  unigrams and bigrams are hashed (CRC32, so every process agrees) into
+  ``DIMENSIONS`` signed buckets, weighted by sublinear term frequency
+  times IDF (capped at ``MAX_IDF``), and L2-normalized. Document
+  frequencies are counted per hashed term in the shared database as
+  answers are added, and discounted as they are purged.
+- The hashed terms and their counts are stored with the cache key of
+  their result in the shared SQLite cache file, partitioned by the inputs
+  that must match exactly (question, company, level, role and model). Each
+  process loads a partition on first use and then only reads the rows
+  added since. Vectors are weighted in memory, and the answer looked up
+  is weighted with the same IDF as the partition it is compared with.
+  When the process reloads the IDF, each partition is queued on its next
+  lookup to be re-weighted by a background thread, and used with the old
+  IDF until then.
+- A lookup scans a ``COARSE_DIMENSIONS`` random projection of the
+  partition, which keeps the scan to 128 bytes per answer, then compares
+  the best ``CANDIDATES`` rows on their full vectors. The best one is a
+  hit if its cosine similarity reaches ``SIMILARITY_CACHE_THRESHOLD`` and
+  it quotes the same figures. Answers that differ only in their numbers
+  ("cut costs by 20%" and "by 40%") are otherwise nearly as similar as
+  true near-duplicates, but deserve different feedback.
+
+Answer texts are not stored, only their hashed terms.
+"""
+import os
+import time
+import zlib
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+
+import numpy as np
+
+from data.question_search import tokenize
+from services.blocking import offload, start_background, background_sleep
+from services.metrics import metrics
+from services.result_cache import connect_sqlite, make_cache_key
+
+app_dir = Path(__file__).parent.parent.absolute()
+DEFAULT_INDEX_PATH = app_dir / 'instance' / 'cache.sqlite3'
+
+# Signed buckets of a stored vector, and of the projection scanned first
+DIMENSIONS = 256
+COARSE_DIMENSIONS = 32
+# Rows of the coarse scan compared on their full vectors
+CANDIDATES = 8
+# Distortion of squared distances allowed for by the coarse scan: a row is a
+# candidate if its projected cosine is within this factor of the threshold
+COARSE_SLACK = 4
+# Hashed terms whose document frequencies are counted
+TERM_BUCKETS = 1 << 16
+# Seconds between reloads of the document frequencies
+IDF_REFRESH_INTERVAL = 300
+# Rows re-weighted per step of a background rebuild, and seconds between steps
+REWEIGHT_CHUNK = 64
+REWEIGHT_PAUSE = 0.002
+# Cap on a term's IDF. Uncapped, one rare word weighs as much as a sentence
+# of common ones, so a typo fix scores below a rewritten action
+MAX_IDF = 2.0
+
+# Fixed projection, so every process computes the same coarse vectors
+_PROJECTION = (np.random.default_rng(0).standard_normal((DIMENSIONS, COARSE_DIMENSIONS))
+               / np.sqrt(COARSE_DIMENSIONS)).astype(np.float32)
+
+
+def hash_terms(tokens):
+    """CRC32 hashes of the unigrams and bigrams of ``tokens``, with their counts."""
+    counts = {}
+    for term in tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]:
+        counts[term] = counts.get(term, 0) + 1
+    hashes = np.fromiter((zlib.crc32(term.encode('utf-8')) for term in counts), dtype=np.uint32, count=len(counts))
+    return hashes, np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+
+def figures_key(tokens):
+    """CRC32 of the numbers in ``tokens``, in order."""
+    return zlib.crc32(' '.join(token for token in tokens if any(c.isdigit() for c in token)).encode('utf-8'))
+
+
+def vectorize(hashes, counts, idf):
+    """L2-normalized hashing TF-IDF vector of hashed terms."""
+    return vectorize_many([(hashes, counts)], idf)[0]
+
+
+def vectorize_many(terms, idf):
+    """``vectorize`` for a list of ``(hashes, counts)`` pairs, as one matrix."""
+    if not terms:
+        return np.zeros((0, DIMENSIONS), dtype=np.float32)
+    hashes = np.concatenate([row[0] for row in terms])
+    counts = np.concatenate([row[1] for row in terms])
+    rows = np.repeat(np.arange(len(terms)), [len(row[0]) for row in terms])
+    weights = (1 + np.log(counts)) * idf[hashes & (TERM_BUCKETS - 1)]
+    signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)
+    cells = rows * DIMENSIONS + (hashes >> 16) % DIMENSIONS
+    vectors = np.bincount(cells, weights=weights * signs, minlength=len(terms) * DIMENSIONS)
+    vectors = vectors.astype(np.float32).reshape(len(terms), DIMENSIONS)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def pack_terms(hashes, counts):
+    """Stored form of hashed terms: the hashes, then their counts."""
+    return hashes.tobytes() + np.minimum(counts, 0xFFFF).astype(np.uint16).tobytes()
+
+
+def unpack_terms(blob):
+    """Inverse of ``pack_terms``."""
+    size = len(blob) // 6
+    return (np.frombuffer(blob, dtype=np.uint32, count=size),
+            np.frombuffer(blob, dtype=np.uint16, offset=4 * size).astype(np.float32))
+
+
+def _coarse(vectors):
+    coarse = vectors @ _PROJECTION
+    norms = np.linalg.norm(coarse, axis=-1, keepdims=True)
+    return coarse / np.where(norms == 0, 1, norms)
+
+
+class _Partition:
+    """
+    Terms and vectors of one partition held by this process, grown by doubling.
+
+    ``idf`` is the IDF the vectors are weighted with, and lookups weight
+    the text they look up with the same array. When the index reloads the
+    IDF, the vectors are rebuilt in the background and swapped in with
+    ``reweight``; until then the partition is compared with the old one.
+    """
+
+    def __init__(self, idf):
+        self.count = 0
+        self.last_id = 0
+        self.keys = []
+        self.terms = []
+        self.idf = idf
+        # IDF of the rebuild in progress, if any
+        self.pending_idf = None
+        self.figures = np.zeros(16, dtype=np.uint32)
+        self.coarse = np.zeros((16, COARSE_DIMENSIONS), dtype=np.float32)
+        self.full = np.zeros((16, DIMENSIONS), dtype=np.float16)
+
+    def reweight(self, full, coarse, done, idf):
+        """
+        Swap in new arrays whose first ``done`` rows are weighted with ``idf``.
+
+        They replace the current arrays rather than overwrite them, so
+        snapshots handed out earlier stay consistent. Rows appended since
+        they were built are weighted here.
+        """
+        if len(full) < len(self.full):
+            full = np.resize(full, self.full.shape)
+            coarse = np.resize(coarse, self.coarse.shape)
+        if done < self.count:
+            vectors = vectorize_many(self.terms[done:self.count], idf)
+            full[done:self.count] = vectors
+            coarse[done:self.count] = _coarse(vectors)
+        self.full, self.coarse, self.idf = full, coarse, idf
+
+    def extend(self, rows, terms, vectors):
+        """Append ``rows`` read from the database, skipping those another thread appended first."""
+        # Rows are in id order, so those already appended come first
+        skip = sum(1 for row in rows if row[0] <= self.last_id)
+        rows, terms, vectors = rows[skip:], terms[skip:], vectors[skip:]
+        if not rows:
+            return
+        needed = self.count + len(rows)
+        if needed > len(self.coarse):
+            capacity = max(needed, 2 * len(self.coarse))
+            self.coarse = np.resize(self.coarse, (capacity, COARSE_DIMENSIONS))
+            self.full = np.resize(self.full, (capacity, DIMENSIONS))
+            self.figures = np.resize(self.figures, capacity)
+        self.full[self.count:needed] = vectors
+        self.coarse[self.count:needed] = _coarse(vectors)
+        self.figures[self.count:needed] = [row[3] for row in rows]
+        self.keys.extend(row[1] for row in rows)
+        self.terms.extend(terms)
+        self.count = needed
+        self.last_id = rows[-1][0]
+
+
+def _document_frequencies(term_hashes):
+    """Documents per hashed term bucket of ``term_hashes``, one array per document, with the count under -1."""
+    frequencies = {-1: len(term_hashes)}
+    for hashes in term_hashes:
+        for bucket in np.unique(hashes & (TERM_BUCKETS - 1)).tolist():
+            frequencies[bucket] = frequencies.get(bucket, 0) + 1
+    return frequencies
+
+
+class SimilarityIndex:
+    """Near-duplicate lookup of texts that have a cached result, per partition."""
+
+    def __init__(self, namespace, version, path=None, threshold=None, ttl=None,
+                 max_partitions=None, enabled=None):
+        self.namespace = namespace
+        self.version = version
+        self.path = path or os.getenv('CACHE_PATH', str(DEFAULT_INDEX_PATH))
+        self.threshold = threshold if threshold is not None else float(os.getenv('SIMILARITY_CACHE_THRESHOLD', 0.95))
+        self.coarse_floor = 1 - COARSE_SLACK * (1 - self.threshold)
+        self.ttl = ttl if ttl is not None else float(os.getenv('CACHE_TTL', 7 * 24 * 3600))
+        self.max_partitions = (max_partitions if max_partitions is not None
+                               else int(os.getenv('SIMILARITY_CACHE_MAX_PARTITIONS', 1000)))
+        if enabled is None:
+            enabled = all(os.getenv(name, 'true').lower() not in ('0', 'false', 'no')
+                          for name in ('CACHE_ENABLED', 'SIMILARITY_CACHE_ENABLED'))
+        self.enabled = enabled
+
+        self._partitions = OrderedDict()
+        self._reweight_queue = deque()
+        self._reweighting = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._schema_ready_pid = None
+        self.idf_refresh_interval = IDF_REFRESH_INTERVAL
+        self._idf = np.ones(TERM_BUCKETS, dtype=np.float32)
+        self._idf_loaded_at = 0.0
+
+    # -- storage ---------------------------------------------------------
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+            self._local.pid = pid
+        if self._schema_ready_pid != pid:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS similar_documents ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, namespace TEXT NOT NULL, version TEXT NOT NULL, '
+                'partition TEXT NOT NULL, key TEXT NOT NULL, terms BLOB NOT NULL, figures INTEGER NOT NULL, '
+                'created_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS similar_documents_partition '
+                         'ON similar_documents (namespace, partition, id)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS similar_terms ('
+                'namespace TEXT NOT NULL, bucket INTEGER NOT NULL, df INTEGER NOT NULL, '
+                'PRIMARY KEY (namespace, bucket))'
+            )
+            self._purge(conn)
+            with self._lock:
+                self._partitions.clear()
+                # The thread re-weighting them is not copied into a forked process
+                self._reweight_queue.clear()
+                self._reweighting = False
+            self._schema_ready_pid = pid
+        return conn
+
+    def _purge(self, conn):
+        """Drop entries of other versions or past the TTL, and their share of the document frequencies."""
+        where = 'namespace = ? AND (version != ? OR created_at < ?)'
+        params = (self.namespace, self.version, time.time() - self.ttl)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(f'SELECT terms FROM similar_documents WHERE {where}', params).fetchall()
+            if rows:
+                frequencies = _document_frequencies([unpack_terms(row[0])[0] for row in rows])
+                conn.executemany(
+                    'UPDATE similar_terms SET df = df - ? WHERE namespace = ? AND bucket = ?',
+                    [(count, self.namespace, bucket) for bucket, count in frequencies.items()]
+                )
+                conn.execute('DELETE FROM similar_terms WHERE namespace = ? AND df <= 0', (self.namespace,))
+                conn.execute(f'DELETE FROM similar_documents WHERE {where}', params)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _current_idf(self, conn):
+        """IDF per hashed term, reloaded from the shared counts every few minutes."""
+        now = time.time()
+        if now - self._idf_loaded_at < self.idf_refresh_interval:
+            return self._idf
+        rows = conn.execute('SELECT bucket, df FROM similar_terms WHERE namespace = ?', (self.namespace,)).fetchall()
+        df = np.zeros(TERM_BUCKETS, dtype=np.float32)
+        documents = 0
+        for bucket, count in rows:
+            if bucket < 0:
+                documents = count
+            else:
+                df[bucket] = count
+        self._idf = np.minimum(np.log((1 + documents) / (1 + df)) + 1, MAX_IDF).astype(np.float32)
+        self._idf_loaded_at = now
+        return self._idf
+
+    def _partition(self, conn, partition, idf):
+        """
+        This process's copy of a partition, with rows added by any process
+        since the last call, and the IDF its vectors are weighted with.
+
+        If that is not ``idf``, the partition is queued to be re-weighted
+        with it in the background.
+        """
+        with self._lock:
+            part = self._partitions.get(partition)
+            if part is None:
+                part = self._partitions[partition] = _Partition(idf)
+                while len(self._partitions) > self.max_partitions:
+                    self._partitions.popitem(last=False)
+            self._partitions.move_to_end(partition)
+            last_id, weights = part.last_id, part.idf
+        # Read and vectorize outside the lock, so loading one partition does
+        # not hold up lookups in the others
+        rows = conn.execute(
+            'SELECT id, key, terms, figures FROM similar_documents '
+            'WHERE namespace = ? AND partition = ? AND id > ? AND version = ? ORDER BY id',
+            (self.namespace, partition, last_id, self.version)
+        ).fetchall()
+        terms = [unpack_terms(row[2]) for row in rows]
+        vectors = vectorize_many(terms, weights)
+        with self._lock:
+            if part.idf is not weights:
+                vectors = vectorize_many(terms, part.idf)
+            part.extend(rows, terms, vectors)
+            if part.idf is not idf and part.pending_idf is not idf:
+                part.pending_idf = idf
+                self._reweight_queue.append((part, idf))
+                if not self._reweighting:
+                    self._reweighting = True
+                    start_background(self._reweight_queued)
+            return part.count, part.keys, part.coarse, part.full, part.figures, part.idf
+
+    def _reweight_queued(self):
+        """Re-weight queued partitions one at a time, on the index's one background thread."""
+        while True:
+            with self._lock:
+                if not self._reweight_queue:
+                    self._reweighting = False
+                    return
+                part, idf = self._reweight_queue.popleft()
+            self._reweight(part, idf)
+
+    def _reweight(self, part, idf):
+        """Rebuild the vectors of ``part`` with ``idf`` and swap them in, unless a newer IDF came first."""
+        try:
+            with self._lock:
+                count, capacity, terms = part.count, len(part.full), part.terms[:part.count]
+            full = np.zeros((capacity, DIMENSIONS), dtype=np.float16)
+            coarse = np.zeros((capacity, COARSE_DIMENSIONS), dtype=np.float32)
+            # In small steps with pauses between them, so lookups seldom wait
+            # for the GIL; the partition keeps the old IDF a little longer
+            for start in range(0, count, REWEIGHT_CHUNK):
+                vectors = vectorize_many(terms[start:start + REWEIGHT_CHUNK], idf)
+                full[start:start + len(vectors)] = vectors
+                coarse[start:start + len(vectors)] = _coarse(vectors)
+                background_sleep(REWEIGHT_PAUSE)
+            with self._lock:
+                if part.pending_idf is idf:
+                    part.reweight(full, coarse, count, idf)
+                    part.pending_idf = None
+        except Exception as e:
+            print(f'Similarity cache reweight error ({self.namespace}): {str(e)}')
+            with self._lock:
+                if part.pending_idf is idf:
+                    part.pending_idf = None
+
+    def _load(self, partition):
+        conn = self._connection()
+        return self._partition(conn, partition, self._current_idf(conn))
+
+    def _write(self, rows, terms):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO similar_documents (namespace, version, partition, key, terms, figures, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows
+            )
+            conn.executemany(
+                'INSERT INTO similar_terms (namespace, bucket, df) VALUES (?, ?, ?) '
+                'ON CONFLICT(namespace, bucket) DO UPDATE SET df = df + excluded.df',
+                [(self.namespace, bucket, count) for bucket, count in terms.items()]
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    # -- public API ------------------------------------------------------
+
+    def partition_key(self, *parts):
+        """Partition of entries that may be matched with each other."""
+        return make_cache_key(self.version, *parts)
+
+    def find(self, partition, text):
+        """
+        Return the cache key of the most similar stored text in ``partition``.
+
+        Returns None when no stored text reaches the similarity threshold.
+        """
+        if not self.enabled:
+            return None
+        try:
+            count, keys, coarse, full, figures, idf = offload(self._load, partition)
+        except sqlite3.Error as e:
+            print(f'Similarity cache read error ({self.namespace}): {str(e)}')
+            return None
+
+        key = None
+        if count:
+            tokens = tokenize(text)
+            vector = vectorize(*hash_terms(tokens), idf)
+            scores = coarse[:count] @ _coarse(vector)
+            # Only rows close enough on the projection to reach the threshold
+            # are ranked, which is much cheaper than ranking the whole scan
+            candidates = np.flatnonzero(scores >= self.coarse_floor)
+            if len(candidates) > CANDIDATES:
+                candidates = candidates[np.argpartition(scores[candidates], -CANDIDATES)[-CANDIDATES:]]
+            candidates = candidates[figures[candidates] == figures_key(tokens)]
+            if len(candidates):
+                similarity = full[candidates].astype(np.float32) @ vector
+                best = int(np.argmax(similarity))
+                if similarity[best] >= self.threshold:
+                    key = keys[candidates[best]]
+        metrics.increment('cache_requests_total', namespace=f'{self.namespace}_similar',
+                          result='hit' if key else 'miss')
+        return key
+
+    def add(self, partition, key, text):
+        """Index ``text``, whose result is cached under ``key``."""
+        self.add_many([(partition, key, text)])
+
+    def add_many(self, entries):
+        """Index several ``(partition, key, text)`` entries in one transaction."""
+        if not self.enabled or not entries:
+            return
+        try:
+            now = time.time()
+            rows, term_hashes = [], []
+            for partition, key, text in entries:
+                tokens = tokenize(text)
+                hashes, counts = hash_terms(tokens)
+                rows.append((self.namespace, self.version, partition, key, pack_terms(hashes, counts),
+                             figures_key(tokens), now))
+                term_hashes.append(hashes)
+            offload(self._write, rows, _document_frequencies(term_hashes))
+        except sqlite3.Error as e:
+            print(f'Similarity cache write error ({self.namespace}): {str(e)}')
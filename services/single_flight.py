@@ -0,0 +1,199 @@
+"""
+Single-flight coalescing of identical in-flight LLM calls.
+
+When several requests with the same fingerprint arrive while the first is
+still waiting on the LLM, only the first one makes the upstream call; the
+others wait and share its result.
+
+- Within a process, the first caller for a key becomes the leader and the
+  other threads wait on its future.
+- Across gunicorn workers, leaders take a lease on the key in a shared
+  SQLite table (next to the result cache). A leader that finds the key
+  leased by another worker polls the table until the result is published,
+  and its own followers wait for it. A lease lasts as long as a healthy
+  call can take, so a slow call is never run twice. Leases expire, so a
+  crashed worker only delays the others until a waiting leader takes the
+  lease over, and a leader stops waiting after ``SINGLE_FLIGHT_MAX_WAIT``
+  and makes the call itself, well before the worker timeout would kill
+  its request.
+
+Results are kept in the table for a few seconds after they are published,
+so late pollers can read them. A failed call releases its lease and
+publishes nothing: its in-process followers get the error, while waiting
+leaders in other workers take the lease over and try again.
+"""
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+from services.blocking import offload
+from services.job_queue import default_job_timeout
+from services.metrics import metrics
+from services.openai_client import max_call_seconds
+from services.result_cache import connect_sqlite
+
+app_dir = Path(__file__).parent.parent.absolute()
+DEFAULT_FLIGHT_PATH = app_dir / 'instance' / 'cache.sqlite3'
+
+# Marker for a key whose lease is held by another worker
+_RUNNING = object()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key, across threads and processes."""
+
+    def __init__(self, namespace, path=None, lease_ttl=None, poll_interval=None,
+                 linger=None, max_wait=None, enabled=None):
+        self.namespace = namespace
+        self.path = path or os.getenv('CACHE_PATH', str(DEFAULT_FLIGHT_PATH))
+        # A call makes the same upstream calls as a job, and never less than one
+        self.lease_ttl = max(lease_ttl if lease_ttl is not None
+                             else float(os.getenv('SINGLE_FLIGHT_LEASE_TTL') or default_job_timeout()),
+                             max_call_seconds())
+        # Half the worker timeout leaves the call made after giving up time to finish
+        self.max_wait = (max_wait if max_wait is not None
+                         else float(os.getenv('SINGLE_FLIGHT_MAX_WAIT') or float(os.getenv('WORKER_TIMEOUT', 120)) / 2))
+        self.poll_interval = (poll_interval if poll_interval is not None
+                              else float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', 0.05)))
+        self.linger = linger if linger is not None else 10.0
+        if enabled is None:
+            enabled = os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+        self.enabled = enabled
+
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._schema_ready_pid = None
+        self._owner = None
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+            self._local.pid = pid
+        if self._schema_ready_pid != pid:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS flights ('
+                'namespace TEXT NOT NULL, key TEXT NOT NULL, owner TEXT NOT NULL, '
+                'status TEXT NOT NULL, result TEXT, expires_at REAL NOT NULL, '
+                'PRIMARY KEY (namespace, key))'
+            )
+            self._owner = f'{pid}-{uuid.uuid4().hex[:8]}'
+            self._schema_ready_pid = pid
+        return conn
+
+    def do(self, key, fn):
+        """
+        Return ``fn()``, or the result of an identical call already in flight.
+
+        ``fn`` must return a JSON-serialisable value so it can be shared with
+        other workers.
+        """
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            metrics.increment('coalesced_requests_total', namespace=self.namespace, scope='thread')
+            return future.result()
+
+        try:
+            result = self._run_shared(key, fn)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _run_shared(self, key, fn):
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            try:
+                published = offload(self._acquire, key)
+            except Exception as e:
+                # The lease table is an optimization; never fail the call for it
+                print(f'Single-flight lease error: {str(e)}')
+                return fn()
+            if published is None:
+                break
+            if published is not _RUNNING:
+                metrics.increment('coalesced_requests_total', namespace=self.namespace, scope='process')
+                return json.loads(published)
+            if time.monotonic() >= deadline:
+                # The owner is slow or gone; its lease stays, so it still publishes
+                print(f'Single-flight wait for {self.namespace} timed out; calling directly')
+                return fn()
+            time.sleep(self.poll_interval)
+
+        try:
+            result = fn()
+        except BaseException:
+            offload(self._release, key)
+            raise
+        offload(self._publish, key, result)
+        return result
+
+    def _acquire(self, key):
+        """
+        Take the lease on ``key``.
+
+        Returns None when the lease was taken, ``_RUNNING`` while another
+        worker holds it, or the published JSON result.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT status, result, expires_at FROM flights WHERE namespace = ? AND key = ?',
+                (self.namespace, key)
+            ).fetchone()
+            if row is not None and row[2] > now:
+                conn.execute('COMMIT')
+                return row[1] if row[0] == 'done' else _RUNNING
+            conn.execute(
+                'INSERT OR REPLACE INTO flights (namespace, key, owner, status, result, expires_at) '
+                "VALUES (?, ?, ?, 'running', NULL, ?)",
+                (self.namespace, key, self._owner, now + self.lease_ttl)
+            )
+            conn.execute('DELETE FROM flights WHERE expires_at < ?', (now,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return None
+
+    def _publish(self, key, result):
+        try:
+            self._connection().execute(
+                "UPDATE flights SET status = 'done', result = ?, expires_at = ? "
+                'WHERE namespace = ? AND key = ? AND owner = ?',
+                (json.dumps(result, ensure_ascii=False), time.time() + self.linger,
+                 self.namespace, key, self._owner)
+            )
+        except Exception as e:
+            print(f'Single-flight publish error: {str(e)}')
+
+    def _release(self, key):
+        try:
+            self._connection().execute(
+                'DELETE FROM flights WHERE namespace = ? AND key = ? AND owner = ?',
+                (self.namespace, key, self._owner)
+            )
+        except Exception as e:
+            print(f'Single-flight release error: {str(e)}')
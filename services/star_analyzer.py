@@ -0,0 +1,217 @@
+"""
+Local heuristic analysis of STAR answers.
+
+Some evaluation feedback is deterministic: how long the answer is, which
+STAR sections it has, how many words each gets, how often the candidate
+says "I" rather than "we", and whether the result is quantified. This
+module computes those signals with precompiled regular expressions in well
+under a millisecond. They are merged into every evaluation, where they
+replace the length and timing feedback the LLM used to write, and power
+the free quick-check endpoint.
+
+Answers are segmented on explicit labels ("Situation:", "**Task:**") when
+they have them, otherwise on cue phrases ("I was asked to", "as a result").
+The same segmentation tells which sections a revised answer changed.
+"""
+import re
+import hashlib
+from functools import lru_cache
+
+STAR_SECTIONS = ('situation', 'task', 'action', 'result')
+
+# Typical interview speaking pace
+WORDS_PER_MINUTE = 150
+
+# Comfortable spoken length of a STAR answer, about 1.5 to 3 minutes
+MIN_WORDS = 225
+MAX_WORDS = 450
+
+# Patterns run on the lower-cased answer, which is much faster than IGNORECASE
+_LABEL_RE = re.compile(r'(situation|task|actions?|results?)\s*\**\s*[:–—-]')
+_SENTENCE_RE = re.compile(r'(?:[^.!?\n]|[.!?](?=\S))+[.!?]*')
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+_SINGULAR_RE = re.compile(r'\bI\b|\b(?:[Mm]e|[Mm]y|[Mm]ine|[Mm]yself)\b')
+_PLURAL_RE = re.compile(r'\b(?:we|us|our|ours|ourselves)\b')
+_METRIC_RE = re.compile(r'[$€£]?\d[\d,.]*(?:\s?(?:%|percent\b|x\b|[kmb]\b|thousand\b|million\b|billion\b))?')
+_TASK_CUE_RE = re.compile(
+    r'\b(?:my (?:task|goal|job|role|responsibility|mandate)|i (?:was|were) (?:asked|tasked|responsible|assigned)'
+    r'|i needed to|i had to|the goal was|our goal was|the objective was)\b'
+)
+_RESULT_CUE_RE = re.compile(
+    r'\b(?:as a result|the result|in the end|ultimately|outcome|this (?:led|resulted)'
+    r'|which (?:led|resulted|reduced|increased|improved|saved|cut))\b'
+)
+_ACTION_START_RE = re.compile(r'\s*(?:i|first|then|next|after|to)\b')
+
+# Characters that may sit between a sentence boundary and a section label
+_LABEL_PREFIX = ' \t*_#>-'
+
+
+def _word_count(text):
+    return len(_WORD_RE.findall(text))
+
+
+def _is_label_start(text, index):
+    """True if ``index`` starts a line or sentence, allowing markdown before it."""
+    while index > 0 and text[index - 1] in _LABEL_PREFIX:
+        index -= 1
+    return index == 0 or text[index - 1] in '.!?\n'
+
+
+def _segment_by_labels(text):
+    matches = [match for match in _LABEL_RE.finditer(text) if _is_label_start(text, match.start())]
+    if len({match.group(1).rstrip('s') for match in matches}) < 2:
+        return None
+    sections = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        name = match.group(1).rstrip('s')
+        end = following.start() if following else len(text)
+        sections[name] = sections.get(name, '') + ' ' + text[match.end():end]
+    return sections
+
+
+def _segment_by_cues(text):
+    sections = {}
+    state = 'situation'
+    for index, sentence in enumerate(_SENTENCE_RE.findall(text)):
+        if state != 'result' and index > 0 and _RESULT_CUE_RE.search(sentence):
+            state = 'result'
+        elif state == 'situation' and _TASK_CUE_RE.search(sentence):
+            state = 'task'
+        elif state in ('situation', 'task') and index > 0 and _ACTION_START_RE.match(sentence):
+            state = 'action'
+        sections[state] = sections.get(state, '') + ' ' + sentence
+    return sections
+
+
+def _segment(text):
+    labelled = _segment_by_labels(text)
+    return (labelled, 'labels') if labelled is not None else (_segment_by_cues(text), 'heuristic')
+
+
+def format_duration(seconds):
+    """``95`` -> ``"1 min 35 s"``."""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    if not minutes:
+        return f'{seconds} s'
+    return f'{minutes} min {seconds} s' if seconds else f'{minutes} min'
+
+
+@lru_cache(maxsize=256)
+def analyze_answer(answer):
+    """
+    Compute deterministic signals for a STAR answer.
+
+    Returns:
+        dict: Word count, speaking time, per-section presence and word
+        counts, first-person usage and the metrics found. Treat it as
+        read-only; results are memoized.
+    """
+    answer = answer or ''
+    text = answer.lower()
+    words = _word_count(text)
+    seconds = round(words * 60 / WORDS_PER_MINUTE)
+
+    texts, segmentation = _segment(text)
+    sections = {}
+    for name in STAR_SECTIONS:
+        section_words = _word_count(texts.get(name, ''))
+        sections[name] = {
+            'present': section_words > 0,
+            'wordCount': section_words,
+            'share': round(section_words / words, 2) if words else 0.0
+        }
+
+    singular = len(_SINGULAR_RE.findall(answer))
+    plural = len(_PLURAL_RE.findall(text))
+    metrics = _METRIC_RE.findall(text)
+    result_metrics = _METRIC_RE.findall(texts.get('result', ''))
+
+    return {
+        'wordCount': words,
+        'speakingTimeSeconds': seconds,
+        'currentLength': f'{words} words, about {format_duration(seconds)} when spoken',
+        'segmentation': segmentation,
+        'sections': sections,
+        'missingSections': [name for name in STAR_SECTIONS if not sections[name]['present']],
+        'firstPerson': {
+            'singular': singular,
+            'plural': plural,
+            'singularShare': round(singular / (singular + plural), 2) if singular + plural else None
+        },
+        'metrics': {
+            'count': len(metrics),
+            'inResult': len(result_metrics),
+            'examples': metrics[:5]
+        }
+    }
+
+
+@lru_cache(maxsize=256)
+def section_digests(answer):
+    """
+    Digest of the words of each STAR section, for comparing revisions.
+
+    Case, punctuation and whitespace do not change a digest. Treat the
+    result as read-only; results are memoized.
+    """
+    texts, _ = _segment((answer or '').lower())
+    return {
+        name: hashlib.sha256(' '.join(_WORD_RE.findall(texts.get(name, ''))).encode('utf-8')).hexdigest()[:16]
+        for name in STAR_SECTIONS
+    }
+
+
+def _length_tip(words):
+    if words < MIN_WORDS:
+        return (f'At {words} words the answer is short; aim for {MIN_WORDS}-{MAX_WORDS} words '
+                '(about 1.5 to 3 minutes spoken).')
+    if words > MAX_WORDS:
+        return (f'At {words} words the answer runs long; trim it to {MIN_WORDS}-{MAX_WORDS} words '
+                '(about 1.5 to 3 minutes spoken).')
+    return None
+
+
+def _balance_tips(sections):
+    tips = []
+    setup = sections['situation']['share'] + sections['task']['share']
+    if setup > 0.4:
+        tips.append(f'Situation and Task take {round(setup * 100)}% of the answer; '
+                    'keep the setup to about a quarter and move on to what you did.')
+    if sections['action']['present'] and sections['action']['share'] < 0.3:
+        tips.append('Spend more of the answer on the Action: what you did, step by step.')
+    if sections['result']['present'] and sections['result']['share'] < 0.1:
+        tips.append('Give the Result more room: the outcome, its impact and what you learned.')
+    return tips
+
+
+def length_timing_feedback(analysis):
+    """The ``lengthTimingFeedback`` section of an evaluation, from the local analysis."""
+    words = analysis['wordCount']
+    length_tip = _length_tip(words)
+    recommendations = [length_tip] if length_tip else [
+        f'At {words} words the answer fits the 1.5 to 3 minutes an interviewer expects; keep it this length.'
+    ]
+    recommendations.extend(_balance_tips(analysis['sections']))
+    return {'currentLength': analysis['currentLength'], 'recommendations': recommendations}
+
+
+def quick_check_tips(analysis):
+    """Actionable tips derived only from the local analysis."""
+    tips = []
+    for name in analysis['missingSections']:
+        tips.append(f'Add a clear {name.capitalize()} section; the answer does not seem to have one.')
+
+    length_tip = _length_tip(analysis['wordCount'])
+    if length_tip:
+        tips.append(length_tip)
+    tips.extend(_balance_tips(analysis['sections']))
+
+    first_person = analysis['firstPerson']
+    if first_person['singularShare'] is not None and first_person['singularShare'] < 0.5 and first_person['plural'] >= 3:
+        tips.append('Say "I" more than "we" so your own contribution is clear.')
+
+    if not analysis['metrics']['inResult']:
+        tips.append('Quantify the result with numbers, percentages, time or money saved.')
+    return tips
+
@@ -0,0 +1,57 @@
+"""
+Output token budgets for LLM requests.
+
+``max_tokens`` used to be a fixed ceiling: 4000 for an evaluation and 1500
+for a generated answer, well above what either response needs. Since the
+rate limiter and the provider both reserve ``max_tokens`` up front, an
+oversized budget costs capacity even when it is never used.
+
+A request's budget is now the output its prompt asks for, times a safety
+headroom, capped at the old ceiling. The expected output of an evaluation
+is the sum of ``SECTION_OUTPUT_TOKENS`` for the requested sections, and
+that of a generated answer follows from the word limit in its prompt.
+
+Each process also remembers the output sizes of recent responses of each
+kind. When real responses run longer than expected, the budget follows
+the largest of them instead. A response cut off at its budget is counted
+in ``truncated_completions_total`` and remembered at its full budget, so
+the next budget of that kind is a headroom larger.
+"""
+import os
+import threading
+from collections import deque
+
+from services.metrics import metrics
+
+# Recent output sizes remembered per kind
+WINDOW = 200
+
+
+class TokenBudget:
+    """Sizes ``max_tokens`` from expected and recently observed output."""
+
+    def __init__(self, headroom=None, window=WINDOW):
+        self.headroom = headroom if headroom is not None else float(os.getenv('TOKEN_BUDGET_HEADROOM', 1.3))
+        self.window = window
+        self._observed = {}
+        self._lock = threading.Lock()
+
+    def budget(self, kind, expected, ceiling):
+        """``max_tokens`` for a request of ``kind`` expected to write ``expected`` tokens."""
+        with self._lock:
+            observed = self._observed.get(kind)
+            largest = max(observed) if observed else 0
+        return max(1, min(ceiling, int(max(expected, largest) * self.headroom)))
+
+    def observe(self, kind, output_tokens, truncated=False):
+        """Record the output size of a finished response."""
+        with self._lock:
+            observed = self._observed.get(kind)
+            if observed is None:
+                observed = self._observed[kind] = deque(maxlen=self.window)
+            observed.append(output_tokens)
+        if truncated:
+            metrics.increment('truncated_completions_total', kind=kind)
+
+
+token_budget = TokenBudget()
@@ -7,11 +7,14 @@ const state = {
     answer: '',
     answerMode: 'custom', // 'custom' or 'ai'
     evaluation: null,
+    revisionId: null, // Last evaluated revision, so a revised answer only re-evaluates what changed
     roles: [],
     companies: [],
     experienceLevels: [],
     questions: [],
-    companyValues: null
+    questionsByRole: {},
+    companyValues: null,
+    companyValuesByCompany: {}
 };
 
 // API base URL
@@ -27,17 +30,14 @@ document.addEventListener('DOMContentLoaded', async () => {
 // Load initial data
 async function loadInitialData() {
     try {
-        const [rolesRes, companiesRes, levelsRes, questionsRes] = await Promise.all([
-            fetch(`${API_BASE}/data/roles`),
-            fetch(`${API_BASE}/data/companies`),
-            fetch(`${API_BASE}/data/experience-levels`),
-            fetch(`${API_BASE}/data/questions?role=${encodeURIComponent(state.targetRole)}`)
-        ]);
-
-        state.roles = await rolesRes.json();
-        state.companies = await companiesRes.json();
-        state.experienceLevels = await levelsRes.json();
-        state.questions = await questionsRes.json();
+        const data = await loadBootstrapData();
+
+        state.roles = data.roles;
+        state.companies = data.companies;
+        state.experienceLevels = data.experienceLevels;
+        state.questionsByRole = data.questions;
+        state.companyValuesByCompany = data.companyValues;
+        state.questions = state.questionsByRole[state.targetRole] || [];
 
         populateSelects();
     } catch (error) {
@@ -45,6 +45,16 @@ async function loadInitialData() {
     }
 }
 
+// Bootstrap data is embedded in the page; fetch it only if it is missing
+async function loadBootstrapData() {
+    const embedded = document.getElementById('bootstrap-data');
+    if (embedded && embedded.textContent.trim()) {
+        return JSON.parse(embedded.textContent);
+    }
+    const response = await fetch(`${API_BASE}/data/bootstrap`);
+    return response.json();
+}
+
 // Populate select dropdowns
 function populateSelects() {
     const roleSelect = document.getElementById('target-role');
@@ -171,6 +181,10 @@ function setupEventListeners() {
 
 // Load questions for current role
 async function loadQuestions() {
+    if (state.questionsByRole[state.targetRole]) {
+        state.questions = state.questionsByRole[state.targetRole];
+        return;
+    }
     try {
         const response = await fetch(`${API_BASE}/data/questions?role=${encodeURIComponent(state.targetRole)}`);
         state.questions = await response.json();
@@ -211,6 +225,12 @@ function populateQuestionDropdown() {
 
 // Load company values
 async function loadCompanyValues(company) {
+    // Bootstrap lists every company, with null for those without values
+    if (company in state.companyValuesByCompany) {
+        state.companyValues = state.companyValuesByCompany[company];
+        displayCompanyValues();
+        return;
+    }
     try {
         const response = await fetch(`${API_BASE}/data/company-values/${encodeURIComponent(company)}`);
         if (response.ok) {
@@ -264,6 +284,38 @@ function toggleAnswerMode(mode) {
     }
 }
 
+// Read a Server-Sent Events response body, calling onEvent(name, data) per event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = 'message';
+            const dataLines = [];
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    eventName = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    dataLines.push(line.slice(5).trim());
+                }
+            });
+            if (dataLines.length) {
+                onEvent(eventName, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+}
+
 // Handle AI answer generation
 async function handleGenerateAIAnswer() {
     if (!state.question.trim()) {
@@ -277,18 +329,13 @@ async function handleGenerateAIAnswer() {
     const contextInput = document.getElementById('ai-context-input').value;
     const progressBar = document.getElementById('ai-progress-bar');
     const progressText = document.getElementById('ai-progress-text');
+    const aiTextarea = document.getElementById('ai-answer-textarea');
 
     generateBtn.disabled = true;
     generatingDiv.style.display = 'block';
     generatedDiv.style.display = 'none';
-
-    // Simulate progress
-    let progress = 0;
-    const progressInterval = setInterval(() => {
-        progress = Math.min(progress + 5, 90);
-        progressBar.style.width = `${progress}%`;
-        progressText.textContent = `Generating your STAR answer... ${progress}%`;
-    }, 150);
+    progressBar.style.width = '0%';
+    progressText.textContent = 'Generating your STAR answer...';
 
     try {
         console.log('Generating AI answer...', {
@@ -296,7 +343,7 @@ async function handleGenerateAIAnswer() {
             hasContext: !!contextInput
         });
 
-        const response = await fetch(`${API_BASE}/generate-answer`, {
+        const response = await fetch(`${API_BASE}/generate-answer/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -318,24 +365,39 @@ async function handleGenerateAIAnswer() {
             throw new Error(error.message || error.error || 'Failed to generate answer');
         }
 
-        const data = await response.json();
+        // Render tokens into the textarea as they arrive
+        let answer = '';
+        let streamError = null;
+        aiTextarea.value = '';
+        aiTextarea.readOnly = true;
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'token') {
+                if (!answer) {
+                    generatingDiv.style.display = 'none';
+                    generatedDiv.style.display = 'block';
+                }
+                answer += data.text;
+                aiTextarea.value = answer;
+                aiTextarea.scrollTop = aiTextarea.scrollHeight;
+            } else if (event === 'done') {
+                answer = data.answer;
+            } else if (event === 'error') {
+                streamError = data;
+            }
+        });
+
+        if (streamError) {
+            console.error('AI generation error:', streamError);
+            throw new Error(streamError.message || streamError.error || 'Failed to generate answer');
+        }
+
         console.log('AI answer received');
-        
-        clearInterval(progressInterval);
-        progressBar.style.width = '100%';
-        progressText.textContent = 'Complete!';
-        
-        setTimeout(() => {
-            generatingDiv.style.display = 'none';
-            generatedDiv.style.display = 'block';
-            
-            const aiTextarea = document.getElementById('ai-answer-textarea');
-            aiTextarea.value = data.answer;
-            state.answer = data.answer;
-            aiTextarea.readOnly = true;
-        }, 500);
+        generatingDiv.style.display = 'none';
+        generatedDiv.style.display = 'block';
+        aiTextarea.value = answer;
+        state.answer = answer;
     } catch (error) {
-        clearInterval(progressInterval);
         generatingDiv.style.display = 'none';
         alert(`Failed to generate answer: ${error.message}`);
     } finally {
@@ -371,12 +433,10 @@ async function handleEvaluate() {
     detailsDiv.style.display = 'none';
     progressDiv.style.display = 'block';
 
-    // Simulate progress
-    let progress = 0;
-    const progressInterval = setInterval(() => {
-        progress = Math.min(progress + 10, 90);
-        updateProgress(progress);
-    }, 200);
+    // Progress tracks how many evaluation sections have arrived
+    const totalSections = EVALUATION_PANELS.reduce((count, panel) => count + panel.keys.length, 0);
+    let receivedSections = 0;
+    updateProgress(0);
 
     try {
         console.log('Sending evaluation request...', {
@@ -387,7 +447,7 @@ async function handleEvaluate() {
             answerLength: state.answer.length
         });
 
-        const response = await fetch(`${API_BASE}/evaluate`, {
+        const response = await fetch(`${API_BASE}/evaluate/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -398,6 +458,7 @@ async function handleEvaluate() {
                 experienceLevel: state.experienceLevel,
                 question: state.question,
                 answer: state.answer,
+                previousRevisionId: state.revisionId || undefined,
             }),
         });
 
@@ -409,19 +470,38 @@ async function handleEvaluate() {
             throw new Error(error.message || error.error || 'Evaluation failed');
         }
 
-        const evaluationData = await response.json();
+        // Render each section as soon as the server finishes it
+        const evaluationData = {};
+        let streamError = null;
+        prepareEvaluationPanels();
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'section') {
+                evaluationData[data.name] = data.value;
+                receivedSections += 1;
+                updateProgress(Math.min(100, (receivedSections / totalSections) * 100));
+                progressDiv.style.display = 'none';
+                detailsDiv.style.display = 'block';
+                renderReadyPanels(evaluationData);
+            } else if (event === 'done') {
+                state.revisionId = data.revisionId || null;
+            } else if (event === 'error') {
+                streamError = data;
+            }
+        });
+
+        if (streamError) {
+            console.error('Evaluation error:', streamError);
+            throw new Error(streamError.message || streamError.error || 'Evaluation failed');
+        }
+
         console.log('Evaluation received:', Object.keys(evaluationData));
         state.evaluation = evaluationData;
-        clearInterval(progressInterval);
-        updateProgress(100);
-        
-        setTimeout(() => {
-            progressDiv.style.display = 'none';
-            displayEvaluation(state.evaluation);
-        }, 500);
+        progressDiv.style.display = 'none';
+        displayEvaluation(state.evaluation);
     } catch (error) {
-        clearInterval(progressInterval);
         progressDiv.style.display = 'none';
+        detailsDiv.style.display = 'none';
         placeholder.style.display = 'block';
         alert(`Evaluation failed: ${error.message}`);
     } finally {
@@ -438,42 +518,50 @@ function updateProgress(percent) {
     progressText.textContent = `Generating recommendations... - ${percent.toFixed(1)}%`;
 }
 
-// Display evaluation results
-function displayEvaluation(evaluation) {
+// Evaluation panels in display order, with the response keys each one needs
+const EVALUATION_PANELS = [
+    { keys: ['scoredAssessment'], render: ev => createScoredAssessment(ev.scoredAssessment) },
+    { keys: ['starAnalysis'], render: ev => createSTARAnalysis(ev.starAnalysis) },
+    { keys: ['rewriteSuggestions', 'guidingQuestions'], render: ev => createRewriteSuggestions(ev) },
+    { keys: ['companyCultureAlignment'], render: ev => createCultureAlignment(ev.companyCultureAlignment, state.targetCompany) },
+    { keys: ['followUpQuestions'], render: ev => createFollowUpQuestions(ev.followUpQuestions) },
+    { keys: ['alternativeFraming'], render: ev => createAlternativeFraming(ev.alternativeFraming) },
+    { keys: ['lengthTimingFeedback'], render: ev => createLengthTiming(ev.lengthTimingFeedback, ev.answerAnalysis) },
+    { keys: ['interviewReadyAssessment'], render: ev => createInterviewReady(ev.interviewReadyAssessment) }
+];
+
+// Create an empty slot for each panel so sections keep their order as they arrive
+function prepareEvaluationPanels() {
     const detailsDiv = document.getElementById('evaluation-details');
     detailsDiv.innerHTML = '';
 
-    // Scored Assessment
-    const scoredSection = createScoredAssessment(evaluation.scoredAssessment);
-    detailsDiv.appendChild(scoredSection);
-
-    // STAR Analysis
-    const starSection = createSTARAnalysis(evaluation.starAnalysis);
-    detailsDiv.appendChild(starSection);
-
-    // Rewrite Suggestions
-    const rewriteSection = createRewriteSuggestions(evaluation);
-    detailsDiv.appendChild(rewriteSection);
-
-    // Company Culture Alignment
-    const cultureSection = createCultureAlignment(evaluation.companyCultureAlignment, state.targetCompany);
-    detailsDiv.appendChild(cultureSection);
-
-    // Follow-up Questions
-    const followUpSection = createFollowUpQuestions(evaluation.followUpQuestions);
-    detailsDiv.appendChild(followUpSection);
+    EVALUATION_PANELS.forEach((panel, idx) => {
+        const slot = document.createElement('div');
+        slot.className = 'evaluation-panel';
+        slot.dataset.panel = idx;
+        detailsDiv.appendChild(slot);
+    });
+}
 
-    // Alternative Framing
-    const framingSection = createAlternativeFraming(evaluation.alternativeFraming);
-    detailsDiv.appendChild(framingSection);
+// Render every panel whose sections have all arrived and that is still empty
+function renderReadyPanels(evaluation) {
+    const detailsDiv = document.getElementById('evaluation-details');
 
-    // Length & Timing
-    const timingSection = createLengthTiming(evaluation.lengthTimingFeedback);
-    detailsDiv.appendChild(timingSection);
+    EVALUATION_PANELS.forEach((panel, idx) => {
+        const slot = detailsDiv.querySelector(`.evaluation-panel[data-panel="${idx}"]`);
+        if (!slot || slot.hasChildNodes()) return;
+        if (!panel.keys.every(key => evaluation[key] !== undefined)) return;
+        slot.appendChild(panel.render(evaluation));
+    });
+}
 
-    // Interview Ready Assessment
-    const readySection = createInterviewReady(evaluation.interviewReadyAssessment);
-    detailsDiv.appendChild(readySection);
+// Display evaluation results
+function displayEvaluation(evaluation) {
+    const detailsDiv = document.getElementById('evaluation-details');
+    if (!detailsDiv.querySelector('.evaluation-panel')) {
+        prepareEvaluationPanels();
+    }
+    renderReadyPanels(evaluation);
 
     // Download button
     const downloadBtn = document.createElement('button');
@@ -648,7 +736,7 @@ function createAlternativeFraming(framing) {
 }
 
 // Create length timing section
-function createLengthTiming(timing) {
+function createLengthTiming(timing, analysis) {
     const section = document.createElement('div');
     section.className = 'length-timing';
     section.innerHTML = '<h4>Length & Timing Feedback</h4>';
@@ -657,6 +745,16 @@ function createLengthTiming(timing) {
     p.innerHTML = `<strong>Current Length:</strong> ${timing.currentLength}`;
     section.appendChild(p);
 
+    // Measured locally by the server, see services/star_analyzer.py
+    if (analysis) {
+        const facts = document.createElement('p');
+        const sections = ['situation', 'task', 'action', 'result']
+            .map(name => `${name.charAt(0).toUpperCase() + name.slice(1)} ${analysis.sections[name].wordCount}`)
+            .join(' · ');
+        facts.innerHTML = `<strong>Words per section:</strong> ${sections}`;
+        section.appendChild(facts);
+    }
+
     const ul = document.createElement('ul');
     timing.recommendations.forEach(rec => {
         const li = document.createElement('li');